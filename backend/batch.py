@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from clients import get_embeddings
+from limits import RateLimited, limited
+from extract_embed import extract_text_from_bytes
+from parsing_summary import analyze_resume
+from preprocess import clean_text, prepare_job_description
+from resilience import DeadlineExceeded
+from scoring import local_score, reconcile_score
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+BATCH_MAX_RESUMES = int(os.getenv("BATCH_MAX_RESUMES", "500"))
+BATCH_TOP_K = int(os.getenv("BATCH_TOP_K", "10"))
+# Cohere accepts at most 96 texts per embed call
+BATCH_EMBED_SIZE = int(os.getenv("BATCH_EMBED_SIZE", "96"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
+
+async def embed_texts(texts: List[str]) -> np.ndarray:
+    """Embeds texts in batched Cohere calls; returns an (n, dim) matrix."""
+    batches = [texts[i:i + BATCH_EMBED_SIZE] for i in range(0, len(texts), BATCH_EMBED_SIZE)]
+    vectors = await asyncio.gather(*(
+        limited("cohere", lambda batch=batch: get_embeddings().aembed_documents(batch))
+        for batch in batches
+    ))
+    return np.asarray([vector for batch in vectors for vector in batch], dtype=np.float32)
+
+
+def cosine_scores(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of `matrix` against `query`."""
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return (matrix @ query) / np.maximum(norms, 1e-12)
+
+
+def _analysis_error(error: Exception) -> str:
+    """Client-safe message for an analysis that raised."""
+    if isinstance(error, RateLimited):
+        return "LLM provider is rate limiting; scored locally."
+    if isinstance(error, DeadlineExceeded):
+        return "Analysis took too long; scored locally."
+    return "Analysis failed; scored locally."
+
+
+async def rank_resumes(
+    resumes: List[Tuple[str, bytes]],
+    job_description: str,
+    top_k: int = BATCH_TOP_K,
+    extract: Callable[[bytes], Awaitable[str]] = extract_text_from_bytes,
+    analyze: Callable[[str, str], Awaitable[Dict[str, Any]]] = analyze_resume,
+) -> List[Dict[str, Any]]:
+    """
+    Ranks (filename, pdf bytes) pairs against one job description.
+    Every resume gets an embedding pre-score; only the top_k go through the
+    LLM analysis. If embedding fails, the local score is the pre-score. A
+    shortlisted resume whose analysis fails keeps its local score. Either
+    failure is reported in the entry's `error`. The result is sorted
+    best-first.
+    """
+    # 1️⃣ Extract everything in parallel (the process pool bounds real concurrency)
+    extracted = await asyncio.gather(*(extract(data) for _, data in resumes), return_exceptions=True)
+
+    entries = []
+    for (filename, _), text in zip(resumes, extracted):
+        entry = {"filename": filename, "prescore": None, "score": None, "analysis": None, "error": None}
+        if isinstance(text, Exception):
+            entry["error"] = str(text)
+        elif not text.strip():
+            entry["error"] = "No text layer found in PDF."
+        else:
+            entry["text"] = text
+        entries.append(entry)
+
+    readable = [entry for entry in entries if "text" in entry]
+    if readable:
+        # Cleaning hundreds of resumes is real CPU work; keep it off the event loop
+        cleaned = await asyncio.to_thread(lambda: [clean_text(entry["text"]) for entry in readable])
+        for entry, text in zip(readable, cleaned):
+            entry["text"] = text
+        job_description = prepare_job_description(job_description)
+
+        # 2️⃣ Batched embeddings + vectorized cosine pre-score
+        logger.info("🧮 Embedding %d resumes for batch pre-scoring", len(readable))
+        try:
+            matrix, query = await asyncio.gather(
+                embed_texts([entry["text"] for entry in readable]),
+                limited("cohere", lambda: get_embeddings().aembed_query(job_description)),
+            )
+            cosines = [float(score) for score in cosine_scores(matrix, np.asarray(query, dtype=np.float32))]
+        except Exception as e:
+            # Without embeddings the local score alone orders the shortlist
+            logger.warning("⚠️ Batch embedding failed, pre-scoring locally: %s", e)
+            cosines = [None] * len(readable)
+            for entry in readable:
+                entry["error"] = "Embedding pre-score unavailable; pre-scored locally."
+
+        # Local score with the cosine folded in: the fallback and sanity check for LLM scores
+        local_scores = await asyncio.to_thread(lambda: [
+            local_score(entry["text"], job_description, embedding_cosine=cosine)
+            for entry, cosine in zip(readable, cosines)
+        ])
+        for entry, local, cosine in zip(readable, local_scores, cosines):
+            entry["local_score"] = local
+            entry["prescore"] = round(cosine * 100, 2) if cosine is not None else local["score"]
+
+        # 3️⃣ Full LLM analysis for the shortlist only
+        shortlist = sorted(readable, key=lambda entry: entry["prescore"], reverse=True)[:top_k]
+        semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+        async def analyze_entry(entry):
+            try:
+                async with semaphore:
+                    result = await analyze(entry["text"], job_description)
+            except Exception as e:
+                # One failed analysis must not sink the batch; the local score still ranks it
+                logger.warning("⚠️ Batch analysis failed for %s: %s", entry["filename"], e)
+                result = {"error": _analysis_error(e)}
+            entry["analysis"] = result.get("analysis")
+            entry["score"], entry["score_source"] = reconcile_score(result.get("score"), entry["local_score"])
+            if "error" in result:
+                entry["error"] = " ".join(filter(None, (entry["error"], result["error"])))
+
+        await asyncio.gather(*(analyze_entry(entry) for entry in shortlist))
+
+    def rank_key(entry):
+        # LLM-scored first (by score), then pre-scored, then unreadable files
+        return (
+            entry["score"] is not None,
+            entry["score"] if entry["score"] is not None else -1,
+            entry["prescore"] if entry["prescore"] is not None else -1,
+        )
+
+    ranked = sorted(entries, key=rank_key, reverse=True)
+    for rank, entry in enumerate(ranked, start=1):
+        entry.pop("text", None)
+        entry["rank"] = rank
+    return ranked
@@ -0,0 +1,84 @@
+"""
+Import-time profile of the app. Runs `python -X importtime -c "import main"`
+in a fresh interpreter, prints the slowest top-level imports and fails when
+the total goes over a budget or a module that should load lazily is
+imported eagerly.
+
+    python -m bench.import_profile --top 15 --budget-ms 1000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy modules that only the first request (or the startup warmup) should load
+LAZY_MODULES = [
+    "pdfplumber",
+    "langchain_community.vectorstores",
+    "langchain_openai",
+    "langchain_community.embeddings",
+    "langchain_community.tools",
+    "chromadb",
+]
+
+# import time: self [us] | cumulative | imported package
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(module: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self µs, cumulative µs, depth) per import, in import order."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"import {module} failed")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15, help="slowest direct imports of the module to list")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail above this total import time (0 = no budget)")
+    args = parser.parse_args()
+
+    entries = profile(args.module)
+    total_ms = next(cumulative for name, _, cumulative, _ in reversed(entries) if name == args.module) / 1000
+    # Direct imports of the module are one level below it
+    direct: Dict[str, int] = {}
+    for name, _, cumulative, depth in entries:
+        if depth == 1:
+            direct[name] = direct.get(name, 0) + cumulative
+
+    print(f"import {args.module}: {total_ms:.0f} ms, {len(entries)} modules")
+    for name, cumulative in sorted(direct.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    imported = {name for name, *_ in entries}
+    eager = [lazy for lazy in LAZY_MODULES if any(name == lazy or name.startswith(lazy + ".") for name in imported)]
+    failed = False
+    if eager:
+        print(f"❌ Imported eagerly: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"❌ Over budget: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
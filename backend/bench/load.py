@@ -0,0 +1,186 @@
+"""
+Load driver for /analyze. Reports p50/p95/p99 latency, requests/s and
+event-loop lag at several concurrency levels.
+
+Offline run against the stub upstreams (start `python -m bench.stub_server` first):
+
+    python -m bench.load --stub http://127.0.0.1:8100 --concurrency 1,4,16 --requests 32
+
+By default the app is driven in-process through httpx's ASGI transport, so the
+reported event-loop lag is the app's own. With --url the driver talks to a
+running server instead, and the lag only describes the driver.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = [
+    os.path.join(BACKEND_DIR, "bench", "corpus", "*.pdf"),
+    os.path.join(BACKEND_DIR, "uploads", "*.pdf"),
+]
+DEFAULT_JD = (
+    "We are hiring a Backend Engineer with strong Python and FastAPI experience, "
+    "PostgreSQL, Docker and Kubernetes, CI/CD pipelines and system design skills."
+)
+
+
+def point_at_stub(stub_url: str) -> None:
+    """Routes every upstream call to the local stub server. Must run before importing main."""
+    stub_url = stub_url.rstrip("/")
+    os.environ["OPENROUTER_BASE_URL"] = f"{stub_url}/v1"
+    os.environ["CO_API_URL"] = stub_url
+    os.environ["TAVILY_API_URL"] = stub_url
+    for key in ("OPENROUTER_API_KEY", "COHERE_API_KEY", "TAVILY_API_KEY"):
+        os.environ.setdefault(key, "stub-key")
+    # Keep stub search results out of the persistent search cache
+    os.environ.setdefault("SEARCH_CACHE_DB", "")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up: a direct read of event-loop blocking."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self.samples.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def run_level(client: httpx.AsyncClient, pdfs: List[bytes], job_description: str,
+                    concurrency: int, total: int, unique_jd: bool, path: str) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+    monitor = LoopLagMonitor()
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            pdf = pdfs[index % len(pdfs)]
+            # A unique JD defeats the result cache so every request does real work
+            jd = f"{job_description} [{uuid.uuid4().hex}]" if unique_jd else job_description
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    path,
+                    files={"resume": (f"resume-{index}.pdf", pdf, "application/pdf")},
+                    data={"job_description": jd},
+                )
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 2) if elapsed else None,
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+        "mean_s": round(statistics.fmean(latencies), 3) if latencies else None,
+        "loop_lag_max_ms": round(max(monitor.samples, default=0.0) * 1000, 1),
+        "loop_lag_p99_ms": round(percentile(monitor.samples, 99) * 1000, 1),
+    }
+
+
+async def main_async(args) -> List[dict]:
+    patterns = args.corpus or DEFAULT_CORPUS
+    files = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    if not files:
+        sys.exit("No PDFs found; run `python -m bench.make_corpus` first.")
+    pdfs = [open(path, "rb").read() for path in files]
+
+    job_description = open(args.jd).read() if args.jd else DEFAULT_JD
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+    else:
+        sys.path.insert(0, BACKEND_DIR)
+        import main
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app),
+            base_url="http://bench",
+            timeout=timeout,
+        )
+
+    reports = []
+    async with client:
+        for concurrency in args.concurrency:
+            report = await run_level(
+                client, pdfs, job_description, concurrency,
+                args.requests, not args.allow_cache, args.path,
+            )
+            reports.append(report)
+            print(json.dumps(report))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /analyze")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--stub", help="Stub upstream base URL (in-process mode only), e.g. http://127.0.0.1:8100")
+    parser.add_argument("--path", default="/analyze")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        type=lambda value: [int(level) for level in value.split(",")])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--corpus", action="append", help="Glob of PDFs to upload (repeatable)")
+    parser.add_argument("--jd", help="File with the job description text")
+    parser.add_argument("--allow-cache", action="store_true", help="Reuse the same JD so cached stages can hit")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--out", help="Write the reports as JSON for later comparison")
+    args = parser.parse_args()
+
+    if args.stub:
+        point_at_stub(args.stub)
+
+    reports = asyncio.run(main_async(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Generates synthetic text-layer resume PDFs for the benchmark corpus.
+No PDF library is needed; the files are written by hand.
+
+    python -m bench.make_corpus --count 8 --out bench/corpus
+"""
+import argparse
+import os
+import random
+
+FIRST_NAMES = ["Asha", "Ben", "Chen", "Diego", "Elena", "Farah", "Gus", "Hana", "Ivan", "Jaya"]
+LAST_NAMES = ["Kumar", "Lopez", "Mensah", "Novak", "Okafor", "Patel", "Quinn", "Rossi", "Sato", "Tan"]
+SKILLS = [
+    "Python", "FastAPI", "Django", "PostgreSQL", "Docker", "Kubernetes", "AWS", "React",
+    "TypeScript", "Go", "Redis", "Kafka", "Terraform", "PyTorch", "Pandas", "GraphQL",
+]
+ROLES = ["Backend Engineer", "Data Engineer", "Full Stack Developer", "ML Engineer", "SRE"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+
+
+def resume_lines(rng: random.Random, pages: int) -> list:
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    handle = name.lower().replace(" ", ".")
+    lines = [
+        name,
+        f"{handle}@example.com | +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        f"linkedin.com/in/{handle.replace('.', '')} | github.com/{handle.replace('.', '')}",
+        "",
+        "SUMMARY",
+        f"{rng.choice(ROLES)} with {rng.randint(1, 9)} years of experience building production systems.",
+        "",
+        "SKILLS",
+        ", ".join(rng.sample(SKILLS, 8)),
+        "",
+        "EXPERIENCE",
+    ]
+    for _ in range(3 * pages):
+        start = rng.randint(2012, 2022)
+        lines += [
+            f"{rng.choice(ROLES)} - {rng.choice(COMPANIES)} ({start} - {start + rng.randint(1, 3)})",
+            f"- Built services in {rng.choice(SKILLS)} and {rng.choice(SKILLS)} serving {rng.randint(1, 50)}k users.",
+            f"- Cut p95 latency by {rng.randint(10, 60)}% by redesigning the {rng.choice(SKILLS)} layer.",
+            f"- Led a team of {rng.randint(2, 8)} engineers on the {rng.choice(SKILLS)} migration.",
+            "",
+        ]
+    lines += [
+        "EDUCATION",
+        f"B.Tech Computer Science - Example University ({rng.randint(2008, 2020)})",
+        "",
+        "PROJECTS",
+        f"Resume Analyzer - LLM scoring service in {rng.choice(SKILLS)}",
+    ]
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, lines: list, lines_per_page: int = 48) -> None:
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = []  # object bodies, 1-indexed in the file
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(None)  # pages tree, filled in once the kids are known
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    kids = []
+    for page_lines in pages:
+        text_ops = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+        for line in page_lines:
+            text_ops.append(f"({_escape(line)}) '")
+        text_ops.append("ET")
+        stream = "\n".join(text_ops)
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        kids.append(len(objects))
+
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+
+    xref_at = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode("latin-1")
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a benchmark resume corpus")
+    parser.add_argument("--count", type=int, default=8)
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus"))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    rng = random.Random(args.seed)
+
+    for index in range(args.count):
+        pages = 1 + index % 3  # mix of 1-3 page resumes
+        write_pdf(os.path.join(args.out, f"synthetic_{index:02d}.pdf"), resume_lines(rng, pages))
+
+    print(f"Wrote {args.count} synthetic resumes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Local stand-in for OpenRouter (OpenAI-compatible chat), Cohere embed and
+Tavily search, so the pipeline can be benchmarked without spending credits.
+
+    python -m bench.stub_server --port 8100 --latency 0.8 --jitter 0.4 --error-rate 0.02
+
+Point the app at it with:
+
+    OPENROUTER_BASE_URL=http://127.0.0.1:8100/v1
+    CO_API_URL=http://127.0.0.1:8100
+    TAVILY_API_URL=http://127.0.0.1:8100
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Tunables, overridable from the command line
+config = {
+    "latency": 0.5,        # mean seconds before an LLM answers
+    "jitter": 0.25,        # +/- uniform jitter on every latency
+    "error_rate": 0.0,     # fraction of calls answered with 429/500
+    "token_delay": 0.005,  # seconds between streamed chunks
+    "embed_latency": 0.1,
+    "search_latency": 0.3,
+    "embed_dim": 1024,
+}
+
+app = FastAPI(title="Resume Analyzer upstream stub")
+
+
+# --------------------------------------------------
+# Canned responses
+# --------------------------------------------------
+
+PARSED_RESUME = {
+    "name": "Jane Doe",
+    "email": "jane.doe@example.com",
+    "phone": "+1 555 010 0000",
+    "education": [{"degree": "B.Tech Computer Science", "institution": "Example University", "year": "2022"}],
+    "work_experience": [{
+        "role": "Backend Engineer",
+        "company": "Acme Corp",
+        "duration": "2022 - Present",
+        "description": "Built FastAPI services and data pipelines."
+    }],
+    "skills": ["Python", "FastAPI", "PostgreSQL", "Docker"],
+    "certifications": [],
+    "projects": [{"name": "Resume Analyzer", "description": "LLM-powered resume scoring."}],
+    "links": ["https://github.com/janedoe"],
+}
+
+ANALYSIS = {
+    "strengths": ["Solid Python backend experience", "Hands-on with FastAPI", "Containerized deployments"],
+    "improvements": ["Add Kubernetes exposure", "Quantify impact", "Show system design work"],
+    "matching_qualifications": "Python, FastAPI and SQL experience match the core requirements.",
+    "missing_requirements": "No Kubernetes or large-scale system design experience.",
+    "score": 68,
+    "final_assessment": "Shortlist for a technical screen.",
+}
+
+SUGGESTIONS = "\n".join(
+    f"## {i}. Section {i}\n- Concrete suggestion one for section {i}.\n- Concrete suggestion two for section {i}.\n"
+    for i in range(1, 7)
+)
+
+ROADMAP = "\n".join(
+    f"**{i}. Learn skill {i}**\n- **Why:** It closes a gap.\n- **How:** Build a project.\n"
+    f"- **Impact:** +5 points.\n- **Links:**\n  - [Course {i}](https://example.com/course-{i}) - a course\n"
+    for i in range(1, 5)
+)
+
+
+def canned_reply(prompt: str) -> str:
+    lowered = prompt.lower()
+    if "resume parser" in lowered:
+        return json.dumps(PARSED_RESUME)
+    if "hr recruiter" in lowered:
+        return json.dumps(ANALYSIS)
+    if "skill gaps" in lowered and "comma-separated" in lowered:
+        return "Kubernetes, System Design, CI/CD"
+    if "career mentor" in lowered:
+        return ROADMAP
+    if "resume reviewer" in lowered:
+        return SUGGESTIONS
+    return "OK"
+
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+
+async def simulate(latency: float) -> None:
+    delay = max(0.0, latency + random.uniform(-config["jitter"], config["jitter"]))
+    await asyncio.sleep(delay)
+
+
+def maybe_error():
+    if random.random() < config["error_rate"]:
+        if random.random() < 0.5:
+            return JSONResponse(
+                {"error": {"message": "Rate limited (stub)", "code": 429}},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse({"error": {"message": "Upstream error (stub)", "code": 500}}, status_code=500)
+    return None
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def fake_embedding(text: str):
+    # Deterministic per text so cosine scores are stable across runs
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    return [rng.uniform(-1, 1) for _ in range(config["embed_dim"])]
+
+
+# --------------------------------------------------
+# OpenAI-compatible chat (OpenRouter)
+# --------------------------------------------------
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = maybe_error()
+    if error is not None:
+        return error
+
+    prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+    reply = canned_reply(prompt)
+    model = body.get("model", "stub-model")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    usage = {
+        "prompt_tokens": count_tokens(prompt),
+        "completion_tokens": count_tokens(reply),
+        "total_tokens": count_tokens(prompt) + count_tokens(reply),
+    }
+
+    await simulate(config["latency"])
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    async def stream():
+        words = reply.split(" ")
+        for index, word in enumerate(words):
+            piece = word if index == 0 else " " + word
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(config["token_delay"])
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+# --------------------------------------------------
+# Cohere embed
+# --------------------------------------------------
+
+@app.post("/v1/embed")
+async def cohere_embed(request: Request):
+    body = await request.json()
+    error = maybe_error()
+    if error is not None:
+        return error
+
+    texts = body.get("texts", [])
+    await simulate(config["embed_latency"])
+    return {
+        "response_type": "embeddings_floats",
+        "id": uuid.uuid4().hex,
+        "texts": texts,
+        "embeddings": [fake_embedding(text) for text in texts],
+        "meta": {"api_version": {"version": "1"}, "billed_units": {"input_tokens": sum(map(count_tokens, texts))}},
+    }
+
+
+# --------------------------------------------------
+# Tavily search
+# --------------------------------------------------
+
+@app.post("/search")
+async def tavily_search(request: Request):
+    body = await request.json()
+    error = maybe_error()
+    if error is not None:
+        return error
+
+    query = body.get("query", "")
+    await simulate(config["search_latency"])
+    slug = hashlib.sha1(query.encode("utf-8")).hexdigest()[:8]
+    return {
+        "query": query,
+        "answer": None,
+        "images": [],
+        "response_time": config["search_latency"],
+        "results": [
+            {
+                "title": f"Resource {i} for {query[-40:]}",
+                "url": f"https://example.com/{slug}/{i}",
+                "content": "A short description of the learning resource.",
+                "score": 0.9 - i * 0.1,
+            }
+            for i in range(body.get("max_results", 5))
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub upstream server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=config["latency"])
+    parser.add_argument("--jitter", type=float, default=config["jitter"])
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"])
+    parser.add_argument("--token-delay", type=float, default=config["token_delay"])
+    parser.add_argument("--embed-latency", type=float, default=config["embed_latency"])
+    parser.add_argument("--search-latency", type=float, default=config["search_latency"])
+    args = parser.parse_args()
+
+    config.update(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        token_delay=args.token_delay,
+        embed_latency=args.embed_latency,
+        search_latency=args.search_latency,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from shared_state import SHARED_STATE_BACKEND, SHARED_STATE_DB
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+# Optional shared tier. Unset, it follows the shared state backend (the same
+# SQLite file when that is shared, in-process only otherwise); empty disables it.
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", SHARED_STATE_DB if SHARED_STATE_BACKEND == "sqlite" else "")
+RESULT_CACHE_DB_MAX_BYTES = int(os.getenv("RESULT_CACHE_DB_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Format version of what each namespace stores, part of every key. Bump a
+# namespace when the shape of its values changes, so entries written by
+# older code (e.g. still in the shared SQLite tier) are never read back.
+# Unlisted namespaces are at version 1.
+CACHE_SCHEMA_VERSIONS: Dict[str, int] = {
+    # v2: pages separated by form feeds, for page header/footer removal
+    "text": 2,
+    # v2: local parser rejoins wrapped projects, splits run-together skills
+    # and keeps the school out of the degree
+    "parsed": 2,
+}
+
+
+# --------------------------------------------------
+# Cache keys
+# --------------------------------------------------
+
+def resume_key(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def normalize_job_description(job_description: str) -> str:
+    return re.sub(r"\s+", " ", job_description).strip().casefold()
+
+
+def jd_key(job_description: str) -> str:
+    return hashlib.sha256(normalize_job_description(job_description).encode("utf-8")).hexdigest()
+
+
+def pair_key(resume_hash: str, jd_hash: str) -> str:
+    return f"{resume_hash}:{jd_hash}"
+
+
+def cache_key(namespace: str, key: str) -> str:
+    """Full key of an entry: namespace, its format version, then the key."""
+    return f"{namespace}:v{CACHE_SCHEMA_VERSIONS.get(namespace, 1)}:{key}"
+
+
+# --------------------------------------------------
+# Tiers
+# --------------------------------------------------
+
+class MemoryTier:
+    """LRU dict bounded by entry count and total serialized size."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, payload = entry
+        if expires_at <= time.time():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def set(self, key: str, payload: str, expires_at: float) -> None:
+        self.delete(key)
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, size, payload)
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """
+    On-disk tier shared by every worker on the box. Each call opens its own
+    connection, so it is safe to run from worker threads. The file is only
+    created on first use, not when the module is imported.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._created = False
+        self._create_lock = threading.Lock()
+
+    def _create(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with sqlite3.connect(self.path, timeout=5) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS result_cache_accessed ON result_cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._created:
+            with self._create_lock:
+                if not self._created:
+                    self._create()
+                    self._created = True
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM result_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE result_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0], row[1]
+
+    def set(self, key: str, payload: str, expires_at: float) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, payload, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), expires_at, now),
+            )
+            conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (now,))
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM result_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least-recently-used rows until we are back under the bound
+        for key, size in conn.execute(
+            "SELECT key, size FROM result_cache ORDER BY accessed_at ASC"
+        ).fetchall():
+            conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+
+class ResultCache:
+    """
+    Two-tier cache for pipeline stage results. Values must be JSON-serializable.
+    Keys are namespaced by stage, e.g. ("parsed", <resume hash>), and
+    versioned per namespace (see CACHE_SCHEMA_VERSIONS).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        db_path: str = RESULT_CACHE_DB,
+        db_max_bytes: int = RESULT_CACHE_DB_MAX_BYTES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.memory = MemoryTier(max_entries, max_bytes)
+        self.disk = SQLiteTier(db_path, db_max_bytes) if db_path else None
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, namespace: str, event: str) -> None:
+        counters = self.counters.setdefault(namespace, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        counters[event] += 1
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        full_key = cache_key(namespace, key)
+
+        payload = self.memory.get(full_key)
+        if payload is not None:
+            self._count(namespace, "memory_hits")
+            return json.loads(payload)
+
+        if self.disk is not None:
+            try:
+                row = await asyncio.to_thread(self.disk.get, full_key)
+            except sqlite3.Error:
+                logger.exception("⚠️ Result cache disk read failed")
+                row = None
+            if row is not None:
+                payload, expires_at = row
+                self.memory.set(full_key, payload, expires_at)
+                self._count(namespace, "disk_hits")
+                return json.loads(payload)
+
+        self._count(namespace, "misses")
+        return None
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        full_key = cache_key(namespace, key)
+        payload = json.dumps(value)
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl_seconds)
+
+        self.memory.set(full_key, payload, expires_at)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, full_key, payload, expires_at)
+            except sqlite3.Error:
+                logger.exception("⚠️ Result cache disk write failed")
+
+    async def get_or_compute(
+        self,
+        namespace: str,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        store_if: Optional[Callable[[Any], bool]] = None,
+        ttl: Optional[float] = None,
+    ) -> Any:
+        value = await self.get(namespace, key)
+        if value is not None:
+            return value
+
+        value = await compute()
+        if store_if is None or store_if(value):
+            await self.set(namespace, key, value, ttl=ttl)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.size,
+            "disk_enabled": self.disk is not None,
+            "namespaces": self.counters,
+        }
@@ -0,0 +1,146 @@
+import logging
+import os
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from metrics import llm_metrics_callback
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# --------------------------------------------------
+# Upstream configuration
+# --------------------------------------------------
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+# Cohere reads CO_API_URL on its own; Tavily's URL is a module constant in langchain_community
+TAVILY_API_URL = os.getenv("TAVILY_API_URL", "")
+
+PARSE_MODEL = os.getenv("PARSE_MODEL", "mistralai/mistral-7b-instruct")
+SUGGESTION_MODEL = os.getenv("SUGGESTION_MODEL", "google/gemma-3-27b-it:free")
+ROADMAP_MODEL = os.getenv("ROADMAP_MODEL", "deepseek/deepseek-r1-distill-llama-70b:free")
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def _http2_available() -> bool:
+    # httpx only speaks HTTP/2 when the optional `h2` package is installed
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("⚠️ h2 is not installed, falling back to HTTP/1.1 for OpenRouter")
+        return False
+    return True
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+# --------------------------------------------------
+# Registry
+# --------------------------------------------------
+
+_async_http_client: Optional[httpx.AsyncClient] = None
+_sync_http_client: Optional[httpx.Client] = None
+_llms: Dict[str, object] = {}
+_embeddings = None
+_search_tool = None
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """One keep-alive pool for every OpenRouter call in this worker."""
+    global _async_http_client
+    if _async_http_client is None or _async_http_client.is_closed:
+        _async_http_client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=_limits(),
+            timeout=_timeout(),
+        )
+    return _async_http_client
+
+
+def get_sync_http_client() -> httpx.Client:
+    # ChatOpenAI always builds a sync client too; share one instead of one per model
+    global _sync_http_client
+    if _sync_http_client is None or _sync_http_client.is_closed:
+        _sync_http_client = httpx.Client(limits=_limits(), timeout=_timeout())
+    return _sync_http_client
+
+
+def get_llm(model_name: str):
+    """Returns the shared ChatOpenAI instance for an OpenRouter model, creating it on first use."""
+    llm = _llms.get(model_name)
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+
+        llm = ChatOpenAI(
+            model_name=model_name,
+            openai_api_key=os.getenv("OPENROUTER_API_KEY"),
+            openai_api_base=OPENROUTER_BASE_URL,
+            http_async_client=get_async_http_client(),
+            http_client=get_sync_http_client(),
+            callbacks=[llm_metrics_callback()],
+            # Ask for usage on streamed responses too, so token metrics cover every call
+            stream_usage=True,
+            # 429s are retried by the limiter with backoff; SDK retries would bypass it
+            max_retries=0,
+        )
+        _llms[model_name] = llm
+    return llm
+
+
+def get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        from langchain_community.embeddings import CohereEmbeddings
+
+        _embeddings = CohereEmbeddings(
+            cohere_api_key=os.getenv("COHERE_API_KEY"),
+            user_agent="my-resume-analyzer/1.0",
+            # A single attempt per call: the limiter owns retries
+            max_retries=1
+        )
+    return _embeddings
+
+
+def get_search_tool():
+    global _search_tool
+    if _search_tool is None:
+        from langchain_community.tools.tavily_search import TavilySearchResults
+
+        if TAVILY_API_URL:
+            import langchain_community.utilities.tavily_search as tavily_api
+            tavily_api.TAVILY_API_URL = TAVILY_API_URL.rstrip("/")
+
+        _search_tool = TavilySearchResults(max_results=5)
+    return _search_tool
+
+
+async def aclose() -> None:
+    global _async_http_client, _sync_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+    if _sync_http_client is not None:
+        _sync_http_client.close()
+        _sync_http_client = None
+    _llms.clear()
@@ -34,40 +34,479 @@
 
 
 import uuid
-import pdfplumber
+import asyncio
+import hashlib
+import logging
 import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from fastapi import UploadFile
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import CohereEmbeddings
 from dotenv import load_dotenv
 
+from clients import get_embeddings
+from limits import limited
+from metrics import timed
+from preprocess import PAGE_BREAK, count_tokens, segment_sections
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger("resume-analyzer")
+
 # Chroma DB path (recommended for Render Free Tier) # or just "chroma" locally
+CHROMA_DIR = os.getenv("CHROMA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma"))
+CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "resume_chunks")
+# Embedded resumes are dropped this long after they were embedded, and the
+# oldest go first once more than CHROMA_MAX_RESUMES are stored
+CHROMA_TTL_SECONDS = float(os.getenv("CHROMA_TTL_SECONDS", str(7 * 86400)))
+CHROMA_MAX_RESUMES = int(os.getenv("CHROMA_MAX_RESUMES", "500"))
+CHROMA_PRUNE_INTERVAL_SECONDS = float(os.getenv("CHROMA_PRUNE_INTERVAL_SECONDS", "600"))
+
+# Resume chunking / retrieval for the analysis prompt.
+# RESUME_RETRIEVAL_MODE: "auto" (retrieve only when the resume exceeds the
+# budget), "always", or "off" (never embed, always send the full resume).
+RESUME_CHUNK_MAX_CHARS = int(os.getenv("RESUME_CHUNK_MAX_CHARS", "1200"))
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "1500"))
+RESUME_RETRIEVAL_K = int(os.getenv("RESUME_RETRIEVAL_K", "8"))
+RESUME_RETRIEVAL_MODE = os.getenv("RESUME_RETRIEVAL_MODE", "auto").lower()
+
+# PDF extraction limits. pdfplumber is CPU-bound, so it runs in a process pool
+# and never on the event loop.
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+# How long each warmup task keeps its worker busy, so every task lands on its own process
+WARM_WORKER_HOLD_SECONDS = 0.2
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))
+PDF_PAGES_PER_CHUNK = int(os.getenv("PDF_PAGES_PER_CHUNK", "4"))
+PDF_EXTRACT_TIMEOUT_SECONDS = float(os.getenv("PDF_EXTRACT_TIMEOUT_SECONDS", "30"))
+# Uploads are read in chunks of this size, so a rejected file is never read whole
+UPLOAD_READ_CHUNK_BYTES = int(os.getenv("UPLOAD_READ_CHUNK_BYTES", str(64 * 1024)))
+
+# The header may follow a little junk, but must sit in the first 1 KB
+PDF_MAGIC = b"%PDF-"
+_LINEARIZED_PAGES = re.compile(rb"/Linearized\b.*?/N\s+(\d+)", re.DOTALL)
+_PAGES_DICT = re.compile(rb"<<(?:(?!<<|>>).){0,512}?/Type\s*/Pages\b(?:(?!<<|>>).){0,512}?>>", re.DOTALL)
+_COUNT = re.compile(rb"/Count\s+(\d+)")
+
+_extract_pool: Optional[ProcessPoolExecutor] = None
+
+
+class PDFExtractionError(ValueError):
+    """Raised when an upload cannot be turned into resume text."""
+
+
+class PDFTooLarge(PDFExtractionError):
+    """The upload is over PDF_MAX_BYTES."""
+
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    global _extract_pool
+    if _extract_pool is None:
+        _extract_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _extract_pool
+
+
+def _kill_extract_pool() -> None:
+    """
+    Terminates the worker processes. Used when an extraction overruns its
+    timeout: a running pdfplumber call cannot be cancelled any other way.
+    Other extractions on the same pool fail and must be retried by the client.
+    """
+    global _extract_pool
+    pool, _extract_pool = _extract_pool, None
+    if pool is None:
+        return
+    for process in list(getattr(pool, "_processes", {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def warm_extract_pool() -> int:
+    """
+    Starts every extraction worker and loads pdfplumber in it, so the first
+    upload does not pay for it. One task per worker, each holding its worker
+    briefly: a worker that finished a no-op would be handed the next task
+    instead of a new process being started. Returns how many workers are up.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_extract_pool()
+    pids = await asyncio.gather(*(
+        loop.run_in_executor(pool, _warm_worker, WARM_WORKER_HOLD_SECONDS) for _ in range(PDF_EXTRACT_WORKERS)
+    ))
+    ready = len(set(pids))
+    if ready < PDF_EXTRACT_WORKERS:
+        logger.warning("⚠️ Only %d of %d PDF extraction workers started", ready, PDF_EXTRACT_WORKERS)
+    else:
+        logger.info("🔥 %d PDF extraction workers ready", ready)
+    return ready
+
+
+def shutdown_extract_pool() -> None:
+    global _extract_pool
+    pool, _extract_pool = _extract_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# --- Worker-side functions (must stay top-level so they can be pickled) ---
+
+def _open_pdf(data: bytes):
+    # Imported on first use: only the extraction workers need pdfplumber/pdfminer
+    import pdfplumber
+
+    return pdfplumber.open(BytesIO(data))
+
+
+def _warm_worker(hold_seconds: float = 0.0) -> int:
+    import pdfplumber  # noqa: F401
+
+    time.sleep(hold_seconds)
+    return os.getpid()
+
+
+def _extract_page_range(data: bytes, start: int, end: int) -> str:
+    with _open_pdf(data) as pdf:
+        return PAGE_BREAK.join(page.extract_text() or "" for page in pdf.pages[start:end])
+
+
+def _extract_first_chunk(data: bytes, chunk_size: int) -> Tuple[int, str]:
+    """Returns the page count together with the text of the first chunk."""
+    with _open_pdf(data) as pdf:
+        page_count = len(pdf.pages)
+        if page_count > PDF_MAX_PAGES:
+            return page_count, ""
+        text = PAGE_BREAK.join(page.extract_text() or "" for page in pdf.pages[:chunk_size])
+        return page_count, text
+
+
+def _extract_layout(data: bytes, max_pages: int) -> dict:
+    """
+    Layout cues for the local parser: lines set in bold or a larger font than
+    the body text (section headings), and the largest line on page one (the name).
+    """
+    headings: List[str] = []
+    title = None
+    with _open_pdf(data) as pdf:
+        pages = pdf.pages[:max_pages]
+        lines = []
+        for number, page in enumerate(pages):
+            rows = {}
+            for word in page.extract_words(extra_attrs=["size", "fontname"]):
+                rows.setdefault(round(word["top"]), []).append(word)
+            for top in sorted(rows):
+                words = rows[top]
+                lines.append((
+                    number,
+                    " ".join(word["text"] for word in words),
+                    max(word["size"] for word in words),
+                    all("bold" in word["fontname"].lower() for word in words),
+                ))
+        if not lines:
+            return {"headings": [], "title": None}
+
+        sizes = sorted(size for _, _, size, _ in lines)
+        body_size = sizes[len(sizes) // 2]
+        first_page = [line for line in lines if line[0] == 0]
+        largest = max(first_page, key=lambda line: line[2], default=None)
+        if largest and largest[2] > body_size * 1.15:
+            title = largest[1]
+        for _, text, size, bold in lines:
+            if len(text) <= 40 and not text.endswith(".") and (bold or size > body_size * 1.1):
+                headings.append(text)
+    return {"headings": headings, "title": title}
+
+
+# --- Preflight: cheap byte-level checks before any pdfplumber work ---
+
+def declared_page_count(data: bytes) -> Optional[int]:
+    """
+    Page count without parsing the PDF: the linearization dictionary at the
+    start of the file states it, otherwise the root /Pages node's /Count does.
+    None when neither is visible (e.g. the page tree sits in a compressed
+    object stream).
+    """
+    linearized = _LINEARIZED_PAGES.search(data[:1024])
+    if linearized:
+        return int(linearized.group(1))
+    counts = [int(count.group(1)) for pages in _PAGES_DICT.finditer(data) for count in _COUNT.finditer(pages.group())]
+    return max(counts, default=None)
+
+
+def preflight_pdf(data: bytes) -> None:
+    """Rejects uploads that extraction would fail on or waste time with."""
+    if len(data) > PDF_MAX_BYTES:
+        raise PDFTooLarge(f"PDF is {len(data)} bytes; the limit is {PDF_MAX_BYTES}.")
+    if PDF_MAGIC not in data[:1024]:
+        raise PDFExtractionError("File is not a PDF.")
+
+    page_count = declared_page_count(data)
+    if page_count is not None and page_count > PDF_MAX_PAGES:
+        raise PDFExtractionError(f"PDF has {page_count} pages; the limit is {PDF_MAX_PAGES}.")
+
+    # Fonts can only hide inside object streams; without either, nothing can
+    # draw text and the file is a scan
+    if b"/Font" not in data and b"/ObjStm" not in data and b"/Image" in data:
+        raise PDFExtractionError("PDF has no text layer (scanned image?); upload a text-based PDF.")
+
+
+async def read_pdf_upload(file: UploadFile, max_bytes: int = PDF_MAX_BYTES) -> bytes:
+    """
+    Reads an upload that Starlette's form parser has already received
+    (spooled to a temp file past UPLOAD_SPOOL_MAX_BYTES), chunk by chunk. A
+    file that is not a PDF is rejected on the first chunk and an oversized
+    one as soon as it passes `max_bytes`, before the chunks are joined into
+    one bytes object. The body size while it is still arriving is capped
+    by UploadLimitMiddleware, not here.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise PDFTooLarge(f"PDF is {file.size} bytes; the limit is {max_bytes}.")
+
+    await file.seek(0)
+    first = await file.read(UPLOAD_READ_CHUNK_BYTES)
+    if PDF_MAGIC not in first[:1024]:
+        raise PDFExtractionError("File is not a PDF.")
+    linearized = _LINEARIZED_PAGES.search(first[:1024])
+    if linearized and int(linearized.group(1)) > PDF_MAX_PAGES:
+        raise PDFExtractionError(f"PDF has {linearized.group(1).decode()} pages; the limit is {PDF_MAX_PAGES}.")
+
+    chunks, size = [first], len(first)
+    while True:
+        chunk = await file.read(UPLOAD_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise PDFTooLarge(f"PDF is over the {max_bytes} byte limit.")
+        chunks.append(chunk)
+
+    data = b"".join(chunks)
+    preflight_pdf(data)
+    return data
+
+
+async def _extract_pdf_bytes(data: bytes) -> str:
+    loop = asyncio.get_running_loop()
+    pool = _get_extract_pool()
+
+    page_count, first_text = await loop.run_in_executor(
+        pool, _extract_first_chunk, data, PDF_PAGES_PER_CHUNK
+    )
+    if page_count > PDF_MAX_PAGES:
+        raise PDFExtractionError(f"PDF has {page_count} pages; the limit is {PDF_MAX_PAGES}.")
+
+    if page_count <= PDF_PAGES_PER_CHUNK:
+        return first_text
+
+    # Remaining pages are split into ranges and extracted in parallel
+    ranges = [
+        (start, min(start + PDF_PAGES_PER_CHUNK, page_count))
+        for start in range(PDF_PAGES_PER_CHUNK, page_count, PDF_PAGES_PER_CHUNK)
+    ]
+    rest = await asyncio.gather(*(
+        loop.run_in_executor(pool, _extract_page_range, data, start, end)
+        for start, end in ranges
+    ))
+    return PAGE_BREAK.join([first_text, *rest])
 
-# Load the Cohere embedding model once
-embedding_model = CohereEmbeddings(
-    cohere_api_key=os.getenv("COHERE_API_KEY"),
-    user_agent="my-resume-analyzer/1.0"
-)
 
 # ✅ PDF Text Extraction
-async def extract_text(file: UploadFile) -> str:
+async def extract_text_from_bytes(data: bytes) -> str:
+    preflight_pdf(data)
+
+    try:
+        with timed("pdf_extraction"):
+            text = await asyncio.wait_for(_extract_pdf_bytes(data), timeout=PDF_EXTRACT_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.error("⏳ PDF extraction exceeded %.0fs, killing extraction workers", PDF_EXTRACT_TIMEOUT_SECONDS)
+        _kill_extract_pool()
+        raise PDFExtractionError("PDF extraction timed out.")
+    except PDFExtractionError:
+        raise
+    except Exception as e:
+        raise PDFExtractionError(f"Failed to parse PDF: {e}")
+
+    if not text.strip():
+        raise PDFExtractionError("PDF has no text layer (scanned image?); upload a text-based PDF.")
+    return text
+
+
+async def extract_layout(data: bytes) -> dict:
+    """Best-effort layout cues; an empty result just means regex-only parsing."""
+    loop = asyncio.get_running_loop()
     try:
-        file.file.seek(0)
-        with pdfplumber.open(file.file) as pdf:
-            return "\n".join(page.extract_text() or "" for page in pdf.pages)
+        with timed("layout_extraction"):
+            return await asyncio.wait_for(
+                loop.run_in_executor(_get_extract_pool(), _extract_layout, data, PDF_MAX_PAGES),
+                timeout=PDF_EXTRACT_TIMEOUT_SECONDS
+            )
     except Exception as e:
-        raise ValueError(f"Failed to parse PDF: {e}")
+        logger.warning("⚠️ Layout extraction failed: %s", e)
+        return {}
+
+
+async def extract_text(file: UploadFile) -> str:
+    return await extract_text_from_bytes(await read_pdf_upload(file))
+
+# --- Section-aware chunking ---
+
+def chunk_resume(text: str) -> List[Tuple[str, str]]:
+    """
+    Splits resume text into (section, chunk) pairs. Chunks never cross a
+    section heading; long sections are split on line boundaries so no chunk
+    exceeds RESUME_CHUNK_MAX_CHARS.
+    """
+    sections = segment_sections(text)
+
+    chunks: List[Tuple[str, str]] = []
+    for section, lines in sections:
+        current: List[str] = []
+        size = 0
+        for line in lines:
+            if current and size + len(line) > RESUME_CHUNK_MAX_CHARS:
+                chunks.append((section, "\n".join(current)))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        if current:
+            chunks.append((section, "\n".join(current)))
+    return chunks
+
+
+# --- Persistent vector store ---
+
+_vectordb: Optional["Chroma"] = None
+_pruned_at = 0.0
+
+
+def get_vectordb() -> "Chroma":
+    global _vectordb
+    if _vectordb is None:
+        from langchain_community.vectorstores import Chroma
+
+        _vectordb = Chroma(
+            collection_name=CHROMA_COLLECTION,
+            embedding_function=get_embeddings(),
+            persist_directory=CHROMA_DIR,
+        )
+    return _vectordb
+
+
+def resume_fingerprint(resume_text: str) -> str:
+    return hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+
+
+def prune_vectordb(vectordb) -> int:
+    """
+    Deletes the chunks of resumes embedded more than CHROMA_TTL_SECONDS ago,
+    then of the oldest resumes beyond CHROMA_MAX_RESUMES. Chunks stored
+    without a timestamp count as expired. Returns the resumes dropped.
+    """
+    stored = vectordb.get(include=["metadatas"])
+    chunks: Dict[str, List[str]] = {}
+    embedded_at: Dict[str, float] = {}
+    for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]):
+        resume_id = (metadata or {}).get("resume_id", chunk_id.split(":")[0])
+        chunks.setdefault(resume_id, []).append(chunk_id)
+        embedded_at[resume_id] = min(
+            embedded_at.get(resume_id, float("inf")), float((metadata or {}).get("embedded_at", 0))
+        )
+
+    cutoff = time.time() - CHROMA_TTL_SECONDS
+    by_age = sorted(embedded_at, key=embedded_at.get)
+    expired = [resume_id for resume_id in by_age if embedded_at[resume_id] < cutoff]
+    live = [resume_id for resume_id in by_age if embedded_at[resume_id] >= cutoff]
+    dropped = expired + live[:max(0, len(live) - CHROMA_MAX_RESUMES)]
+
+    if dropped:
+        vectordb.delete(ids=[chunk_id for resume_id in dropped for chunk_id in chunks[resume_id]])
+        logger.info("🧹 Dropped %d embedded resumes from Chroma", len(dropped))
+    return len(dropped)
+
 
 # ✅ Embedding Function
-async def embed_resume(resume_text: str):
+async def embed_resume(resume_text: str) -> str:
+    """
+    Chunks the resume and stores the chunks in the shared Chroma collection.
+    Chunks are keyed by a hash of the text, so a resume that was already
+    embedded costs no Cohere call. Every CHROMA_PRUNE_INTERVAL_SECONDS a new
+    embedding also prunes expired and surplus resumes. Returns the resume
+    fingerprint.
+    """
+    global _pruned_at
+    resume_id = resume_fingerprint(resume_text)
+    vectordb = get_vectordb()
+
     try:
-        vectordb = Chroma.from_texts(
-            [resume_text],
-            embedding=embedding_model,
+        existing = await asyncio.to_thread(
+            vectordb.get, where={"resume_id": resume_id}, limit=1, include=[]
         )
-        return vectordb
+        if existing["ids"]:
+            return resume_id
+
+        chunks = chunk_resume(resume_text)
+        embedded_at = time.time()
+        with timed("embedding"):
+            await limited("cohere", lambda: vectordb.aadd_texts(
+                texts=[chunk for _, chunk in chunks],
+                metadatas=[
+                    {"resume_id": resume_id, "section": section, "position": position, "embedded_at": embedded_at}
+                    for position, (section, _) in enumerate(chunks)
+                ],
+                ids=[f"{resume_id}:{position}" for position in range(len(chunks))],
+            ))
     except Exception as e:
         raise RuntimeError(f"Failed to create embedding: {e}")
+
+    if not _pruned_at or time.monotonic() - _pruned_at >= CHROMA_PRUNE_INTERVAL_SECONDS:
+        _pruned_at = time.monotonic()
+        try:
+            await asyncio.to_thread(prune_vectordb, vectordb)
+        except Exception as e:
+            logger.warning("⚠️ Chroma pruning failed: %s", e)
+    return resume_id
+
+
+async def select_resume_context(resume_text: str, job_description: str) -> str:
+    """
+    Returns the part of the resume that goes into the analysis prompt.
+    Short resumes are sent whole without touching the embedding API; longer
+    ones are reduced to the chunks most relevant to the job description,
+    kept in their original order.
+    """
+    if RESUME_RETRIEVAL_MODE == "off":
+        return resume_text
+    if RESUME_RETRIEVAL_MODE == "auto" and count_tokens(resume_text) <= RESUME_TOKEN_BUDGET:
+        return resume_text
+
+    resume_id = await embed_resume(resume_text)
+    with timed("retrieval"):
+        documents = await limited("cohere", lambda: get_vectordb().asimilarity_search(
+            job_description,
+            k=RESUME_RETRIEVAL_K,
+            filter={"resume_id": resume_id},
+        ))
+
+    selected = []
+    used = 0
+    for document in documents:
+        cost = count_tokens(document.page_content)
+        if selected and used + cost > RESUME_TOKEN_BUDGET:
+            continue
+        selected.append(document)
+        used += cost
+
+    if not selected:
+        return resume_text
+
+    selected.sort(key=lambda document: document.metadata.get("position", 0))
+    logger.info(
+        "🔎 Retrieved %d resume chunks (~%d tokens) for analysis",
+        len(selected), used
+    )
+    return "\n\n".join(document.page_content for document in selected)
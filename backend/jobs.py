@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from shared_state import SharedState, SharedStateError, shared_state
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "20"))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_UPLOAD_DIR = os.getenv(
+    "JOB_UPLOAD_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "jobs")
+)
+
+# runner(resume_data, job_description, on_stage) -> final result
+JobRunner = Callable[[bytes, str, Callable[[str, Any], None]], Awaitable[Dict[str, Any]]]
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when the backlog is at capacity."""
+
+
+class JobQueue:
+    """
+    Bounded in-process queue of analysis jobs served by a fixed pool of
+    worker tasks. Uploads are written to disk while a job waits, so queued
+    jobs do not pin request bodies in memory.
+
+    Each job runs in the worker that accepted it. With a shared `state`,
+    its record is published there on every change, so any worker can
+    answer a status request.
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        workers: int = JOB_WORKERS,
+        max_queue: int = JOB_QUEUE_MAX,
+        upload_dir: str = JOB_UPLOAD_DIR,
+        ttl_seconds: float = JOB_RESULT_TTL_SECONDS,
+        state: SharedState = shared_state,
+    ):
+        self.runner = runner
+        self.state = state if state.shared else None
+        self.workers = workers
+        self.upload_dir = upload_dir
+        self.ttl_seconds = ttl_seconds
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        os.makedirs(self.upload_dir, exist_ok=True)
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._work(), name=f"job-worker-{index}"))
+        logger.info("🧵 Started %d job workers (queue size %d)", self.workers, self._queue.maxsize)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def submit(self, resume_data: bytes, job_description: str) -> Dict[str, Any]:
+        self._prune()
+        if self._queue.full():
+            raise QueueFull()
+
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.upload_dir, f"{job_id}.pdf")
+        await asyncio.to_thread(_write_file, path, resume_data)
+
+        now = time.time()
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "stages": {},
+            "result": None,
+            "error": None,
+        }
+        try:
+            self._queue.put_nowait((job_id, path, job_description))
+        except asyncio.QueueFull:
+            # Another request took the last slot after our check
+            await asyncio.to_thread(_remove_file, path)
+            raise QueueFull()
+
+        self.jobs[job_id] = job
+        await self._publish(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        if job is not None or self.state is None:
+            return job
+        try:
+            return await self.state.get(f"job:{job_id}")
+        except SharedStateError as e:
+            logger.warning("⚠️ Could not read job %s from shared state: %s", job_id, e)
+            return None
+
+    async def _publish(self, job: Dict[str, Any]) -> None:
+        if self.state is None:
+            return
+        try:
+            # Rewritten on every change, so a finished job expires ttl_seconds after it ended, like the local record
+            await self.state.set(f"job:{job['id']}", job, ttl=self.ttl_seconds)
+        except (SharedStateError, TypeError, ValueError) as e:
+            logger.warning("⚠️ Could not publish job %s: %s", job["id"], e)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def _work(self) -> None:
+        while True:
+            job_id, path, job_description = await self._queue.get()
+            job = self.jobs.get(job_id)
+            try:
+                if job is not None:
+                    await self._run(job, path, job_description)
+            finally:
+                await asyncio.to_thread(_remove_file, path)
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any], path: str, job_description: str) -> None:
+        job["status"] = "running"
+        job["updated_at"] = time.time()
+        await self._publish(job)
+        publishing: Set[asyncio.Task] = set()
+        # Stage snapshots are written one at a time, in order, so a stale one never lands last
+        publish_lock = asyncio.Lock()
+
+        async def publish_in_order() -> None:
+            async with publish_lock:
+                await self._publish(job)
+
+        def on_stage(name: str, result: Any) -> None:
+            job["stages"][name] = result
+            job["updated_at"] = time.time()
+            if self.state is not None:
+                task = asyncio.create_task(publish_in_order())
+                publishing.add(task)
+                task.add_done_callback(publishing.discard)
+
+        try:
+            resume_data = await asyncio.to_thread(_read_file, path)
+            job["result"] = await self.runner(resume_data, job_description, on_stage)
+            job["status"] = "done"
+        except asyncio.CancelledError:
+            job["status"] = "failed"
+            job["error"] = "Job cancelled during shutdown."
+            raise
+        except Exception as e:
+            # HTTPException-style errors carry a client-safe message
+            if hasattr(e, "status_code"):
+                job["error"] = getattr(e, "detail", str(e))
+            else:
+                logger.exception("🔥 Job %s failed", job["id"])
+                job["error"] = "Internal server error while analyzing resume."
+            job["status"] = "failed"
+        finally:
+            job["updated_at"] = time.time()
+            await asyncio.gather(*publishing)
+            await self._publish(job)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job["status"] in ("done", "failed") and job["updated_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
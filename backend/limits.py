@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from dotenv import load_dotenv
+
+from shared_state import SharedState, SharedStateError, shared_state
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_CAP_SECONDS = float(os.getenv("BACKOFF_CAP_SECONDS", "20"))
+# With a shared state backend, rpm/tpm are budgets for all workers together,
+# counted per window of this length
+SHARED_RATE_WINDOW_SECONDS = float(os.getenv("SHARED_RATE_WINDOW_SECONDS", "10"))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+# max in-flight calls, requests/minute, tokens/minute (0 = unlimited)
+UPSTREAM_LIMITS: Dict[str, Dict[str, int]] = {
+    "openrouter": {
+        "max_inflight": _env_int("OPENROUTER_MAX_INFLIGHT", 8),
+        "rpm": _env_int("OPENROUTER_RPM", 60),
+        "tpm": _env_int("OPENROUTER_TPM", 0),
+    },
+    "cohere": {
+        "max_inflight": _env_int("COHERE_MAX_INFLIGHT", 4),
+        "rpm": _env_int("COHERE_RPM", 100),
+        "tpm": 0,
+    },
+    "tavily": {
+        "max_inflight": _env_int("TAVILY_MAX_INFLIGHT", 4),
+        "rpm": _env_int("TAVILY_RPM", 60),
+        "tpm": 0,
+    },
+}
+
+# Which request a queued call belongs to, for fair queuing
+_request_id: ContextVar[str] = ContextVar("limiter_request_id", default="anonymous")
+
+
+@contextmanager
+def request_scope(request_id: str):
+    token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+# --------------------------------------------------
+# Building blocks
+# --------------------------------------------------
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        # Created on first use and per event loop: buckets are built at import
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # Oversized requests would otherwise wait forever
+        amount = min(amount, self.capacity)
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class SharedRateWindow:
+    """
+    Rate budget shared by every worker: usage is counted per fixed window
+    in the shared state, and a caller that would overdraw the current
+    window waits for the next one. Each worker still paces itself with its
+    own TokenBucket; this only stops N workers from spending N budgets.
+    """
+
+    def __init__(self, state: SharedState, key: str, per_minute: int, window_seconds: float = SHARED_RATE_WINDOW_SECONDS):
+        self.state = state
+        self.key = key
+        self.window_seconds = window_seconds
+        self.limit = max(1.0, per_minute * window_seconds / 60.0)
+        self.waits = 0
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        amount = min(amount, self.limit)
+        while True:
+            now = time.time()
+            window = int(now // self.window_seconds)
+            try:
+                used = await self.state.incr(f"rate:{self.key}:{window}", amount, ttl=2 * self.window_seconds)
+            except SharedStateError as e:
+                # Fail open: the local bucket still applies
+                logger.warning("⚠️ Shared rate window for %s unavailable: %s", self.key, e)
+                return
+            if used <= self.limit:
+                return
+            self.waits += 1
+            # Jitter so the workers that were turned away do not all return at once
+            await asyncio.sleep((window + 1) * self.window_seconds - now + random.uniform(0, 0.1 * self.window_seconds))
+
+
+class RateLimited(Exception):
+    """The upstream kept answering 429 after every retry."""
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Reads Retry-After (seconds or HTTP date) from an SDK/httpx error, if present."""
+    # openai/httpx errors carry the response; cohere's ApiError carries the headers itself
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in (429, 503) or type(error).__name__ in ("RateLimitError", "TooManyRequestsError")
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+# --------------------------------------------------
+# Limiter
+# --------------------------------------------------
+
+class UpstreamLimiter:
+    """
+    Caps in-flight calls to one upstream and paces them with request and
+    token buckets. Waiting calls are queued per request and served
+    round-robin, so one request fanning out many calls cannot starve others.
+    """
+
+    def __init__(self, name: str, max_inflight: int, rpm: int = 0, tpm: int = 0, state: SharedState = shared_state):
+        self.name = name
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        # In-flight caps stay per worker; request and token rates are shared across workers
+        self.shared_requests = SharedRateWindow(state, f"{name}:requests", rpm) if rpm > 0 and state.shared else None
+        self.shared_tokens = SharedRateWindow(state, f"{name}:tokens", tpm) if tpm > 0 and state.shared else None
+        self.paused_until = 0.0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    async def _acquire_slot(self) -> None:
+        if self.inflight < self.max_inflight and not self._queues:
+            self.inflight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(_request_id.get(), deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just as we were cancelled
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        self.inflight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.inflight < self.max_inflight and self._queues:
+            request_id, waiters = self._queues.popitem(last=False)
+            future = waiters.popleft()
+            if waiters:
+                # Back of the line: the next grant goes to another request
+                self._queues[request_id] = waiters
+            if future.cancelled():
+                continue
+            self.inflight += 1
+            future.set_result(None)
+
+    def pause(self, seconds: float) -> None:
+        """Holds every call to this upstream, e.g. after a 429 with Retry-After."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def _pace(self, tokens: int) -> None:
+        """Waits out a pause and takes request/token budget, before any slot is held."""
+        wait = self.paused_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if self.requests is not None:
+            await self.requests.acquire()
+        if self.tokens is not None and tokens:
+            await self.tokens.acquire(tokens)
+        if self.shared_requests is not None:
+            await self.shared_requests.acquire()
+        if self.shared_tokens is not None and tokens:
+            await self.shared_tokens.acquire(tokens)
+
+    async def call(self, func: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        """
+        Runs `func()` under the limiter, retrying rate-limit errors with
+        jittered exponential backoff that honors Retry-After. Rate budget is
+        taken first, so a call waiting on the buckets never holds one of
+        the in-flight slots.
+        """
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            await self._pace(tokens)
+            await self._acquire_slot()
+            try:
+                return await func()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == RATE_LIMIT_MAX_RETRIES:
+                    if is_rate_limited(e):
+                        raise RateLimited(f"{self.name} still rate limited after {attempt + 1} attempts") from e
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is not None:
+                    self.pause(delay)
+                else:
+                    delay = backoff_delay(attempt)
+                logger.warning("🚦 %s rate limited, retrying in %.1fs", self.name, delay)
+            finally:
+                self._release_slot()
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": self.inflight,
+            "queued": sum(len(waiters) for waiters in self._queues.values()),
+            "paused_for": max(0.0, round(self.paused_until - time.monotonic(), 2)),
+            "shared_window_waits": sum(
+                window.waits for window in (self.shared_requests, self.shared_tokens) if window is not None
+            ),
+        }
+
+
+limiters: Dict[str, UpstreamLimiter] = {
+    name: UpstreamLimiter(name, **config) for name, config in UPSTREAM_LIMITS.items()
+}
+
+
+async def limited(upstream: str, func: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+    return await limiters[upstream].call(func, tokens=tokens)
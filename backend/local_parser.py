@@ -0,0 +1,369 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from preprocess import SECTION_HEADING
+from skills import get_skill_index
+
+# --------------------------------------------------
+# Patterns
+# --------------------------------------------------
+
+EMAIL = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE = re.compile(r"(?<![\w/])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{2,4}\)[\s.-]?)?\d{2,5}(?:[\s.-]?\d{2,5}){1,4}(?![\w/])")
+URL = re.compile(
+    r"(?:https?://|www\.)[^\s|,;]+"
+    r"|(?:linkedin\.com|github\.com|gitlab\.com|behance\.net|dribbble\.com|medium\.com)/[^\s|,;]+",
+    re.IGNORECASE,
+)
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+DATE_RANGE = re.compile(
+    rf"(?:{_MONTH}\s+)?(?:19|20)\d{{2}}\s*(?:-|–|—|to)\s*"
+    rf"(?:(?:{_MONTH}\s+)?(?:19|20)\d{{2}}|present|current|now|today)",
+    re.IGNORECASE,
+)
+YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+YEAR_WITH_MONTH = re.compile(rf"(?:{_MONTH}\s+)?\b(?:19|20)\d{{2}}\b", re.IGNORECASE)
+DEGREE = re.compile(
+    r"\b(?:b\.?\s?tech|m\.?\s?tech|b\.?\s?e\b|m\.?\s?e\b|b\.?\s?sc|m\.?\s?sc|b\.?\s?a\b|m\.?\s?a\b|"
+    r"b\.?\s?s\b|m\.?\s?s\b|mba|bca|mca|ph\.?\s?d|bachelor|master|doctor|diploma|associate|high school)",
+    re.IGNORECASE,
+)
+INSTITUTION = re.compile(r"\b(?:university|college|institute|school|academy|iit|nit|polytechnic)\b", re.IGNORECASE)
+BULLET = re.compile(r"^[-•*▪●◦‣–]\s*")
+NAME = re.compile(r"^[A-Z][A-Za-z'’.-]+(?:\s+[A-Z][A-Za-z'’.-]+){1,3}$")
+# "Role - Company", "Role | Company", "Role at Company", "Role, Company"
+ENTRY_SEPARATORS = re.compile(r"\s+(?:-|–|—|\|)\s+|\s+at\s+|,\s+")
+# "Name - what it does", "Name: what it does"
+PROJECT_SEPARATOR = re.compile(r"\s+[-–—|]\s+|:\s+")
+# Longer list items are usually sentences or several items run together
+MAX_ITEM_WORDS = 4
+MAX_NAME_WORDS = 10
+
+# Layout headings that the regex does not know, mapped by keyword
+SECTION_KEYWORDS = [
+    ("experience", ("experience", "employment", "work history", "career")),
+    ("education", ("education", "academic", "qualification")),
+    ("skills", ("skill", "technolog", "tools", "tech stack", "competenc")),
+    ("projects", ("project",)),
+    ("certifications", ("certif", "licen")),
+]
+SECTION_ALIASES = {
+    "employment": "experience", "employment history": "experience",
+    "project": "projects", "certification": "certifications",
+}
+
+
+# --------------------------------------------------
+# Sections
+# --------------------------------------------------
+
+def _section_name(line: str, layout_headings: set) -> Optional[str]:
+    match = SECTION_HEADING.match(line)
+    if match:
+        name = match.group(1).lower()
+        return SECTION_ALIASES.get(name, name)
+    if line.lower() in layout_headings and len(line) <= 40:
+        lowered = line.lower()
+        for name, keywords in SECTION_KEYWORDS:
+            if any(keyword in lowered for keyword in keywords):
+                return name
+        return "other"
+    return None
+
+
+def split_sections(text: str, layout: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
+    """
+    Groups lines under canonical section names. Headings come from the
+    section regex plus, when available, the bold / large-font lines that
+    pdfplumber reported for the PDF.
+    """
+    layout_headings = {heading.lower() for heading in (layout or {}).get("headings", [])}
+    # The name is set in the largest font too, but it opens the header, not a section
+    layout_headings.discard(((layout or {}).get("title") or "").lower())
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        name = _section_name(line, layout_headings)
+        if name:
+            current = name
+            sections.setdefault(current, [])
+        else:
+            sections[current].append(line)
+    return sections
+
+
+# --------------------------------------------------
+# Field extractors: each returns (value, confidence 0..1)
+# --------------------------------------------------
+
+def _email(text: str) -> Tuple[Optional[str], float]:
+    emails = EMAIL.findall(text)
+    if emails:
+        return emails[0], 1.0 if len(set(emails)) == 1 else 0.9
+    # No "@" anywhere: the resume really has no email
+    return None, 0.9 if "@" not in text else 0.3
+
+
+def _phone(header: str, text: str) -> Tuple[Optional[str], float]:
+    for source, confidence in ((header, 0.95), (text, 0.75)):
+        for match in PHONE.finditer(source):
+            candidate = match.group().strip()
+            digits = re.sub(r"\D", "", candidate)
+            # Year ranges ("2019 - 2021") and short numbers are not phones
+            if 7 <= len(digits) <= 15 and not DATE_RANGE.search(candidate):
+                return candidate, confidence
+    # Missing or written in a format the pattern does not know
+    return None, 0.3
+
+
+def _links(text: str) -> Tuple[List[str], float]:
+    links = []
+    for match in URL.findall(text):
+        link = match.rstrip(".)")
+        if link not in links:
+            links.append(link)
+    # Bare handles ("github: janedoe") and hyperlinked text have no URL in the text
+    return links, 0.95 if links else 0.3
+
+
+def _name(header: List[str], layout: Optional[Dict[str, Any]]) -> Tuple[Optional[str], float]:
+    title = (layout or {}).get("title")
+    if title and NAME.match(title):
+        # The largest text on the first page is almost always the name
+        return title, 0.95
+    for position, line in enumerate(header[:4]):
+        if NAME.match(line) and not EMAIL.search(line):
+            return line, 0.85 if position == 0 else 0.6
+    return None, 0.0
+
+
+def _split_merged(item: str) -> List[str]:
+    """
+    Splits items that lost their separator in extraction ("C++ HTML",
+    "JS Strong Communication") at known skills; words between two skills
+    stay with the one that follows.
+    """
+    words = item.split()
+    matches = get_skill_index().scan(item)
+    if len(matches) < 2 and (len(words) < 3 or not matches):
+        return [item]
+    cuts = {match.start for match in matches[:1] if match.start > 0}
+    cuts.update(previous.end for previous in matches[:-1])
+    if item[matches[-1].end:].strip():
+        cuts.add(matches[-1].end)
+    bounds = [0, *sorted(cuts), len(item)]
+    return [item[a:b].strip() for a, b in zip(bounds, bounds[1:]) if item[a:b].strip()]
+
+
+def _split_items(lines: List[str]) -> Tuple[List[str], bool]:
+    """Returns (items, whether any of them had to be split or look run together)."""
+    items: List[str] = []
+    doubtful = False
+    for line in lines:
+        line = BULLET.sub("", line)
+        # "Languages: Python, Go" -> the part after the category label
+        if ":" in line and len(line.split(":", 1)[0]) <= 30:
+            line = line.split(":", 1)[1]
+        for item in re.split(r"\s*[,|;•·]\s*", line):
+            item = item.strip(" .")
+            if not item:
+                continue
+            pieces = _split_merged(item)
+            doubtful = doubtful or len(pieces) > 1
+            for piece in pieces:
+                doubtful = doubtful or len(piece.split()) > MAX_ITEM_WORDS
+                if piece not in items and len(piece) <= 50:
+                    items.append(piece)
+    return items, doubtful
+
+
+def _skills(sections: Dict[str, List[str]]) -> Tuple[List[str], float]:
+    lines = sections.get("skills")
+    if not lines:
+        return [], 0.0
+    skills, doubtful = _split_items(lines)
+    if len(skills) < 3:
+        return skills, 0.4
+    return skills, 0.6 if doubtful else 0.9
+
+
+def _education(sections: Dict[str, List[str]]) -> Tuple[List[Dict[str, str]], float]:
+    lines = sections.get("education")
+    if not lines:
+        return [], 0.2
+
+    entries: List[Dict[str, str]] = []
+    guessed = False
+    for line in lines:
+        line = BULLET.sub("", line)
+        degree = DEGREE.search(line)
+        institution = INSTITUTION.search(line)
+        if not degree and not institution:
+            continue
+        years = YEAR.findall(line)
+        body = YEAR_WITH_MONTH.sub("", DATE_RANGE.sub("", line))
+        body = re.sub(r"\(\s*\)", "", body).strip(" ,|-–()")
+        parts = [part.strip() for part in ENTRY_SEPARATORS.split(body) if part.strip()]
+        entry = {"degree": "", "institution": "", "year": years[-1] if years else ""}
+        school = ""
+        for part in parts:
+            if INSTITUTION.search(part) and not entry["institution"]:
+                entry["institution"] = part
+                continue
+            named = DEGREE.search(part)
+            if named and named.start() > 0 and not school:
+                # "Mumbai University B.E in ..." with no separator: the words
+                # before the degree name the school (possibly misspelt)
+                school, part = part[:named.start()].strip(" ,"), part[named.start():]
+                guessed = True
+            if not entry["degree"]:
+                entry["degree"] = part
+        # Degree and institution on separate lines: merge into the previous entry
+        if entries and (not entry["degree"] or not entry["institution"]):
+            previous = entries[-1]
+            if not previous["institution"] and entry["institution"]:
+                previous["institution"] = entry["institution"]
+                previous["year"] = previous["year"] or entry["year"]
+                continue
+            if not previous["degree"] and entry["degree"]:
+                previous["degree"] = entry["degree"]
+                previous["institution"] = ", ".join(filter(None, (previous["institution"], school)))
+                previous["year"] = previous["year"] or entry["year"]
+                continue
+        entry["institution"] = ", ".join(filter(None, (entry["institution"], school)))
+        entries.append(entry)
+
+    complete = entries and all(entry["degree"] and entry["institution"] for entry in entries)
+    if not complete:
+        return entries, 0.3
+    too_long = any(len(entry["degree"].split()) > MAX_NAME_WORDS for entry in entries)
+    return entries, 0.5 if guessed or too_long else 0.85
+
+
+def _experience(sections: Dict[str, List[str]]) -> Tuple[List[Dict[str, str]], float]:
+    lines = sections.get("experience")
+    if not lines:
+        return [], 0.2
+
+    entries: List[Dict[str, Any]] = []
+    pending_title: Optional[str] = None
+    for line in lines:
+        dates = DATE_RANGE.search(line)
+        if dates and not BULLET.match(line):
+            title = (line[:dates.start()] + line[dates.end():]).strip(" ()|,-–—")
+            title = re.sub(r"\(\s*\)", "", title).strip(" ()|,-–—")
+            if not title and pending_title:
+                # Title on the line above the dates
+                title = pending_title
+                if entries and entries[-1]["_lines"] and entries[-1]["_lines"][-1] == pending_title:
+                    entries[-1]["_lines"].pop()
+            parts = [part.strip() for part in ENTRY_SEPARATORS.split(title, maxsplit=1) if part.strip()]
+            if len(parts) == 1 and pending_title and pending_title != title:
+                # Company on its own line above "Role | dates"
+                parts.append(pending_title)
+                if entries and entries[-1]["_lines"] and entries[-1]["_lines"][-1] == pending_title:
+                    entries[-1]["_lines"].pop()
+            entries.append({
+                "role": parts[0] if parts else "",
+                "company": parts[1] if len(parts) > 1 else "",
+                "duration": dates.group(),
+                "_lines": [],
+            })
+            pending_title = None
+        elif entries:
+            entries[-1]["_lines"].append(BULLET.sub("", line))
+            # A short unbulleted line may be the next entry's company/title
+            pending_title = line if not BULLET.match(line) and len(line) <= 40 and not line.endswith(".") else None
+        else:
+            pending_title = line
+
+    result = [
+        {
+            "role": entry["role"],
+            "company": entry["company"],
+            "duration": entry["duration"],
+            "description": " ".join(entry["_lines"]),
+        }
+        for entry in entries
+    ]
+    complete = result and all(entry["role"] and entry["company"] for entry in result)
+    return result, 0.8 if complete else 0.3
+
+
+def _wraps(line: str) -> bool:
+    """A long line without closing punctuation continues on the next one."""
+    return len(line) >= 60 and not line.rstrip().endswith((".", "!", "?", ")"))
+
+
+def _project_title(line: str) -> Tuple[str, str]:
+    split = PROJECT_SEPARATOR.search(line)
+    if not split:
+        return line, ""
+    end, rest = split.start(), split.end()
+    # "Alumni Website: Alum-Connect: Developed ..." - a short subtitle is part of the name
+    following = PROJECT_SEPARATOR.search(line, rest)
+    if following and len(line[rest:following.start()].split()) <= 2:
+        end, rest = following.start(), following.end()
+    return line[:end].strip(), line[rest:].strip()
+
+
+def _projects(sections: Dict[str, List[str]]) -> Tuple[List[Dict[str, str]], float]:
+    lines = sections.get("projects")
+    if not lines:
+        # No section, or it did not survive extraction: let the LLM look
+        return [], 0.3
+    projects: List[Dict[str, str]] = []
+    previous = ""
+    for line in lines:
+        continues = BULLET.match(line) or line[:1].islower() or _wraps(previous)
+        previous = line
+        if continues and projects:
+            projects[-1]["description"] = f"{projects[-1]['description']} {BULLET.sub('', line)}".strip()
+            continue
+        name, description = _project_title(line)
+        projects.append({"name": name, "description": description})
+    unclear = any(
+        not project["description"] or len(project["name"].split()) > MAX_NAME_WORDS
+        for project in projects
+    )
+    return projects, 0.5 if unclear else 0.8
+
+
+def _certifications(sections: Dict[str, List[str]]) -> Tuple[List[str], float]:
+    lines = sections.get("certifications")
+    if not lines:
+        return [], 0.3
+    certifications = [BULLET.sub("", line) for line in lines]
+    too_long = any(len(item.split()) > 2 * MAX_NAME_WORDS for item in certifications)
+    return certifications, 0.5 if too_long else 0.85
+
+
+# --------------------------------------------------
+# Entry point
+# --------------------------------------------------
+
+def local_parse(text: str, layout: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Rule-based resume parser. Returns data in the parse_resume schema plus a
+    confidence per field; callers send only low-confidence fields to the LLM.
+    """
+    sections = split_sections(text, layout)
+    header = sections.get("header", [])
+
+    extracted = {
+        "name": _name(header, layout),
+        "email": _email(text),
+        "phone": _phone("\n".join(header), text),
+        "education": _education(sections),
+        "work_experience": _experience(sections),
+        "skills": _skills(sections),
+        "certifications": _certifications(sections),
+        "projects": _projects(sections),
+        "links": _links(text),
+    }
+    data = {field: value for field, (value, _) in extracted.items()}
+    confidence = {field: score for field, (_, score) in extracted.items()}
+    return data, confidence
@@ -1,8 +1,10 @@
+import asyncio
 import json
-import re
 import logging
+import uuid
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional
 
 from fastapi import (
     FastAPI,
@@ -13,11 +15,36 @@ from fastapi import (
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
-
-from extract_embed import extract_text
+from fastapi.responses import Response, StreamingResponse
+
+from extract_embed import (
+    PDFExtractionError,
+    PDFTooLarge,
+    extract_layout,
+    extract_text_from_bytes,
+    read_pdf_upload,
+    shutdown_extract_pool,
+)
 from parsing_summary import parse_resume, analyze_resume
+from structured import StructuredOutputError
+from preprocess import prepare_job_description, prepare_resume
 from suggestion import suggest_resume_improvements
 from roadmap import generate_roadmap
+from pipeline import Stage, run_stages
+from cache import ResultCache, cache_key, resume_key, jd_key, pair_key
+from singleflight import SingleFlight
+from jobs import JobQueue, QueueFull
+from batch import BATCH_MAX_RESUMES, BATCH_TOP_K, rank_resumes
+from sessions import RESUME_SESSION_TTL_SECONDS, ResumeStore
+from search_cache import search_cache
+from shared_state import shared_state
+from scoring import local_score, reconcile_score
+from uploads import UploadLimitMiddleware, configure_spooling
+from warmup import WARMUP_ENABLED, warm_up
+import clients
+from resilience import DeadlineExceeded, request_deadline
+from limits import RateLimited, limiters, request_scope
+from metrics import SERVER_TIMING_ENABLED, render_metrics, server_timing_header, start_request_timings
 
 # --------------------------------------------------
 # Setup
@@ -28,7 +55,35 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("resume-analyzer")
 
-app = FastAPI(title="Resume Analyzer API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_queue.start()
+    # In the background, so the server accepts requests while workers and clients start
+    warming = asyncio.create_task(warm_up()) if WARMUP_ENABLED else None
+    yield
+    if warming is not None:
+        warming.cancel()
+    for task in _warmups:
+        task.cancel()
+    await job_queue.stop()
+    shutdown_extract_pool()
+    await clients.aclose()
+
+
+app = FastAPI(title="Resume Analyzer API", lifespan=lifespan)
+
+result_cache = ResultCache()
+inflight = SingleFlight(shared_state)
+# Resume-only stages are shared between a session warm-up and the requests that follow it
+resume_flights = SingleFlight(shared_state)
+resume_store = ResumeStore()
+_warmups = set()
+
+# Caps request bodies while they stream in, before FastAPI parses the form
+app.add_middleware(UploadLimitMiddleware)
+# ... and spill uploaded files past UPLOAD_SPOOL_MAX_BYTES to disk
+configure_spooling()
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,56 +94,203 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def server_timing_middleware(request, call_next):
+    timings = start_request_timings()
+    response = await call_next(request)
+    if SERVER_TIMING_ENABLED and timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
 # --------------------------------------------------
 # Utilities
 # --------------------------------------------------
 
-def extract_json_from_text(text: str) -> Dict[str, Any]:
+async def parse_resume_or_fail(resume_text: str, resume_data: bytes, full_text: Optional[str] = None) -> Dict[str, Any]:
     """
-    Robust JSON extractor for LLM output.
-    Supports:
-    - clean JSON
-    - JSON wrapped in text
-    - markdown-fenced JSON
+    Parses the resume into validated JSON, locally where possible (reading
+    the PDF's layout cues only if the text alone is not enough), with the LLM
+    filling in the rest. Invalid fields are
+    re-asked inside parse_resume; only an unrecoverable answer fails the request.
     """
+    try:
+        return await parse_resume(
+            resume_text, load_layout=lambda: extract_layout(resume_data), full_text=full_text
+        )
+    except StructuredOutputError as e:
+        logger.error("❌ Resume parsing failed: %s", e)
+        logger.error("RAW LLM OUTPUT:\n%s", e.raw_output)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to parse resume into structured JSON."
+        )
 
-    # Remove markdown fences
-    text = re.sub(r"```json|```", "", text, flags=re.IGNORECASE).strip()
 
-    # Try direct parse first
+async def read_resume(resume: UploadFile) -> bytes:
+    """Reads a resume upload in bounded chunks; bad uploads fail before extraction."""
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
+        return await read_pdf_upload(resume)
+    except PDFTooLarge as e:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, str(e))
+    except PDFExtractionError as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+
+
+# --------------------------------------------------
+# Pipeline
+# --------------------------------------------------
+
+def _resume_stage(namespace: str, resume_hash: str, compute):
+    """A stage that depends on the resume alone: cached on its hash, computed once at a time."""
+    return resume_flights.do(
+        cache_key(namespace, resume_hash),
+        lambda: result_cache.get_or_compute(namespace, resume_hash, compute)
+    )
 
-    # Try object
-    obj_match = re.search(r"\{[\s\S]*?\}", text)
-    if obj_match:
-        return json.loads(obj_match.group())
 
-    raise ValueError("No valid JSON found in LLM output")
+def _extract_stage(resume_hash: str, resume_data: bytes):
+    return _resume_stage("text", resume_hash, lambda: extract_text_from_bytes(resume_data))
 
 
-async def parse_resume_with_retry(resume_text: str, retries: int = 1) -> Dict[str, Any]:
+def _parse_stage(resume_hash: str, resume_data: bytes, prepared):
+    return _resume_stage(
+        "parsed", resume_hash,
+        lambda: parse_resume_or_fail(prepared.for_stage("parse"), resume_data, prepared.text)
+    )
+
+
+def _suggestions_stage(resume_hash: str, prepared, on_token=None):
+    return _resume_stage(
+        "suggestions", resume_hash,
+        lambda: suggest_resume_improvements(
+            prepared.for_stage("suggestions"),
+            on_token=_stage_tokens(on_token, "suggestions")
+        )
+    )
+
+
+def _analysis_succeeded(analysis: Dict[str, Any]) -> bool:
+    return "error" not in analysis
+
+
+def _stage_tokens(on_token, stage: str):
+    if on_token is None:
+        return None
+    return lambda text: on_token(stage, text)
+
+
+async def run_analysis(
+    resume_data: bytes,
+    job_description: str,
+    resume_hash: Optional[str] = None,
+    on_stage: Optional[Callable[[str, Any], None]] = None,
+    on_token: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, Any]:
     """
-    Calls parse_resume LLM and enforces JSON contract with retry.
+    Runs the full pipeline for one resume/JD pair. Every stage goes through
+    the result cache: extraction, parse and suggestions are keyed on the PDF
+    hash alone, analysis and roadmap on the PDF + JD pair.
+
+    `on_stage(name, result)` fires as each stage finishes; `on_token(stage, text)`
+    receives streamed tokens of the markdown stages (cache hits stream nothing).
     """
-    last_error = None
+    # The request id lets the upstream limiters queue calls fairly across requests
+    with request_deadline(), request_scope(uuid.uuid4().hex):
+        return await _run_analysis(resume_data, job_description, resume_hash, on_stage, on_token)
+
+
+async def _run_analysis(resume_data, job_description, resume_hash, on_stage, on_token) -> Dict[str, Any]:
+    resume_hash = resume_hash or resume_key(resume_data)
+    both = pair_key(resume_hash, jd_key(job_description))
+
+    # 1️⃣ Extract resume text
+    resume_text = await _extract_stage(resume_hash, resume_data)
+    logger.info("📄 Extracted resume text (%d chars)", len(resume_text))
+
+    # Cleaned once, then trimmed to each stage's token budget
+    prepared = await asyncio.to_thread(prepare_resume, resume_text)
+    jd_text = prepare_job_description(job_description)
+
+    # 2️⃣ Parse, analyze and suggest run concurrently; the roadmap
+    # waits for the parsed resume and the analysis. The local prescore
+    # finishes almost at once and backs up / sanity-checks the LLM score.
+    logger.info("🧠 Running parse / analysis / suggestions concurrently")
+    results, timings = await run_stages([
+        Stage("prescore", lambda: asyncio.to_thread(local_score, prepared.text, jd_text)),
+        Stage("parse", lambda: _parse_stage(resume_hash, resume_data, prepared)),
+        Stage("analysis", lambda: result_cache.get_or_compute(
+            "analysis", both,
+            lambda: analyze_resume(prepared.for_stage("analysis"), jd_text),
+            store_if=_analysis_succeeded
+        )),
+        Stage("suggestions", lambda: _suggestions_stage(resume_hash, prepared, on_token)),
+        Stage(
+            "roadmap",
+            lambda parsed, analysis, prescore: result_cache.get_or_compute(
+                "roadmap", both,
+                lambda: generate_roadmap(
+                    parsed,
+                    analysis.get("analysis"),
+                    jd_text,
+                    reconcile_score(analysis.get("score"), prescore)[0],
+                    on_token=_stage_tokens(on_token, "roadmap"),
+                    resume_text=prepared.text
+                ),
+                store_if=lambda _: _analysis_succeeded(analysis)
+            ),
+            deps=("parse", "analysis", "prescore"),
+        ),
+    ], on_complete=on_stage)
+
+    logger.info(
+        "⏱️ Stage timings: %s",
+        ", ".join(f"{name}={seconds:.2f}s" for name, seconds in timings.items())
+    )
 
-    for attempt in range(retries + 1):
-        raw_output = await parse_resume(resume_text)
+    score, score_source = reconcile_score(results["analysis"].get("score"), results["prescore"])
+    return {
+        "parsed": results["parse"],
+        "analysis": results["analysis"].get("analysis"),
+        "score": score,
+        "score_source": score_source,
+        "local_score": results["prescore"],
+        "suggestions": results["suggestions"],
+        "roadmap": results["roadmap"],
+    }
 
-        try:
-            return extract_json_from_text(raw_output)
-        except Exception as e:
-            logger.error("❌ Resume parsing failed (attempt %d)", attempt + 1)
-            logger.error("RAW LLM OUTPUT:\n%s", raw_output)
-            last_error = e
-
-    raise HTTPException(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        detail="Failed to parse resume into structured JSON."
-    )
+
+async def warm_resume(resume_hash: str, resume_data: bytes) -> None:
+    """
+    Parses a freshly uploaded resume and drafts its suggestions in the
+    background, so /analyze/{resume_id} only has the JD stages left to run.
+    Failures are only logged; the next analysis simply retries the stage.
+    """
+    try:
+        with request_deadline(), request_scope(uuid.uuid4().hex):
+            resume_text = await _extract_stage(resume_hash, resume_data)
+            prepared = await asyncio.to_thread(prepare_resume, resume_text)
+            await asyncio.gather(
+                _parse_stage(resume_hash, resume_data, prepared),
+                _suggestions_stage(resume_hash, prepared),
+            )
+        logger.info("🔥 Resume %s warmed up", resume_hash[:12])
+    except Exception as e:
+        logger.warning("⚠️ Warm-up of resume %s failed: %s", resume_hash[:12], e)
+
+
+async def run_job(resume_data: bytes, job_description: str, on_stage) -> Dict[str, Any]:
+    try:
+        return await run_analysis(resume_data, job_description, on_stage=on_stage)
+    except PDFExtractionError as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+    except DeadlineExceeded:
+        raise HTTPException(status.HTTP_504_GATEWAY_TIMEOUT, "Analysis took too long.")
+    except RateLimited:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Upstream APIs are rate limiting us.")
+
+
+job_queue = JobQueue(run_job)
 
 
 # --------------------------------------------------
@@ -100,6 +302,51 @@ async def health_check():
     return {"status": "Resume Analyzer API running"}
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        **result_cache.stats(),
+        "singleflight": inflight.stats(),
+        "search": search_cache.stats(),
+        "shared_state": shared_state.stats(),
+    }
+
+
+@app.get("/limits/stats")
+async def limits_stats():
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+async def analyze_or_fail(resume_data: bytes, job_description: str, resume_hash: str) -> Dict[str, Any]:
+    """Runs the pipeline for /analyze-style routes and maps failures to HTTP errors."""
+    # Identical submissions arriving together share one pipeline run
+    flight_key = cache_key("response", pair_key(resume_hash, jd_key(job_description)))
+
+    try:
+        return await inflight.do(
+            flight_key,
+            lambda: run_analysis(resume_data, job_description, resume_hash)
+        )
+    except PDFExtractionError as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+    except DeadlineExceeded as e:
+        logger.error("⏳ /analyze ran out of time: %s", e)
+        raise HTTPException(status.HTTP_504_GATEWAY_TIMEOUT, "Analysis took too long, please retry.")
+    except RateLimited as e:
+        logger.error("🚦 /analyze gave up on a rate-limited upstream: %s", e)
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            "Upstream APIs are busy, please retry shortly.",
+            headers={"Retry-After": "30"}
+        )
+
+
 @app.post("/analyze")
 async def analyze_resume_endpoint(
     resume: UploadFile = File(...),
@@ -111,43 +358,12 @@ async def analyze_resume_endpoint(
         raise HTTPException(400, "Resume file missing")
 
     try:
-        # 1️⃣ Extract resume text
-        resume_text = await extract_text(resume)
-        logger.info("📄 Extracted text from %s", resume.filename)
-
-        # 2️⃣ Parse resume → structured JSON (with retry)
-        logger.info("🧠 Parsing resume with LLM")
-        parsed_resume = await parse_resume_with_retry(resume_text, retries=1)
-
-        # 3️⃣ Analyze vs job description
-        logger.info("📊 Analyzing resume vs JD")
-        analysis = await analyze_resume(resume_text, job_description)
-
-        score = analysis.get("score")
-        analysis_text = analysis.get("analysis")
-
-        # 4️⃣ Suggestions
-        logger.info("💡 Generating improvement suggestions")
-        suggestions = await suggest_resume_improvements(resume_text)
-
-        # 5️⃣ Roadmap
-        logger.info("🛣️ Generating learning roadmap")
-        roadmap = await generate_roadmap(
-            parsed_resume,
-            analysis_text,
-            job_description,
-            score
-        )
+        resume_data = await read_resume(resume)
+        logger.info("📄 Received %s (%d bytes)", resume.filename, len(resume_data))
 
+        response = await analyze_or_fail(resume_data, job_description, resume_key(resume_data))
         logger.info("✅ Analysis completed successfully")
-
-        return {
-            "parsed": parsed_resume,
-            "analysis": analysis_text,
-            "score": score,
-            "suggestions": suggestions,
-            "roadmap": roadmap,
-        }
+        return response
 
     except HTTPException:
         raise
@@ -157,3 +373,211 @@ async def analyze_resume_endpoint(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error while analyzing resume."
         )
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/analyze/stream")
+async def analyze_resume_stream_endpoint(
+    resume: UploadFile = File(...),
+    job_description: str = Form(...)
+):
+    """
+    Server-Sent Events variant of /analyze. Emits:
+    - `stage`: {"stage", "result"} as soon as each stage finishes
+    - `token`: {"stage", "text"} for suggestions / roadmap as tokens arrive
+    - `done`:  the same payload /analyze returns
+    - `error`: {"status", "detail"} if the pipeline fails
+    """
+    logger.info("📥 /analyze/stream request received")
+
+    if not resume.filename:
+        raise HTTPException(400, "Resume file missing")
+
+    resume_data = await read_resume(resume)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            response = await run_analysis(
+                resume_data,
+                job_description,
+                on_stage=lambda name, result: events.put_nowait(
+                    ("stage", {"stage": name, "result": result})
+                ),
+                on_token=lambda name, text: events.put_nowait(
+                    ("token", {"stage": name, "text": text})
+                ),
+            )
+            events.put_nowait(("done", response))
+        except PDFExtractionError as e:
+            events.put_nowait(("error", {"status": 422, "detail": str(e)}))
+        except DeadlineExceeded:
+            events.put_nowait(("error", {"status": 504, "detail": "Analysis took too long, please retry."}))
+        except RateLimited:
+            events.put_nowait(("error", {"status": 503, "detail": "Upstream APIs are busy, please retry shortly."}))
+        except HTTPException as e:
+            events.put_nowait(("error", {"status": e.status_code, "detail": e.detail}))
+        except Exception:
+            logger.exception("🔥 Unexpected error in /analyze/stream")
+            events.put_nowait(("error", {
+                "status": 500,
+                "detail": "Internal server error while analyzing resume."
+            }))
+
+    async def event_stream():
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                event, data = await events.get()
+                yield _sse(event, data)
+                if event in ("done", "error"):
+                    break
+        finally:
+            # Client went away: stop spending tokens on a stream nobody reads
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/resumes", status_code=status.HTTP_201_CREATED)
+async def upload_resume_endpoint(resume: UploadFile = File(...)):
+    """
+    Stores a resume and returns a handle for /analyze/{resume_id}. Text
+    extraction runs right away so a bad PDF is rejected here; parsing and
+    suggestions are prepared in the background.
+    """
+    logger.info("📥 /resumes request received")
+
+    if not resume.filename:
+        raise HTTPException(400, "Resume file missing")
+
+    resume_data = await read_resume(resume)
+    resume_id = await resume_store.put(resume_data)
+    try:
+        await _extract_stage(resume_id, resume_data)
+    except PDFExtractionError as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+
+    task = asyncio.create_task(warm_resume(resume_id, resume_data))
+    _warmups.add(task)
+    task.add_done_callback(_warmups.discard)
+
+    return {
+        "resume_id": resume_id,
+        "expires_in": int(RESUME_SESSION_TTL_SECONDS),
+        "analyze_url": f"/analyze/{resume_id}",
+    }
+
+
+@app.post("/analyze/{resume_id}")
+async def analyze_stored_resume_endpoint(resume_id: str, job_description: str = Form(...)):
+    """
+    /analyze for a resume uploaded through /resumes. Extraction, parse and
+    suggestions come from the cache; only the analysis and roadmap run for
+    the new JD, and Tavily is only queried for skill gaps not seen before.
+    """
+    logger.info("📥 /analyze/%s request received", resume_id[:12])
+
+    resume_data = await resume_store.get(resume_id)
+    if resume_data is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Unknown or expired resume id, upload it again.")
+
+    try:
+        response = await analyze_or_fail(resume_data, job_description, resume_id)
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("🔥 Unexpected error in /analyze/%s", resume_id[:12])
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while analyzing resume."
+        )
+
+    logger.info("✅ Analysis completed successfully")
+    return {**response, "resume_id": resume_id}
+
+
+@app.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_job_endpoint(
+    resume: UploadFile = File(...),
+    job_description: str = Form(...)
+):
+    logger.info("📥 /jobs request received")
+
+    if not resume.filename:
+        raise HTTPException(400, "Resume file missing")
+
+    resume_data = await read_resume(resume)
+    try:
+        job = await job_queue.submit(resume_data, job_description)
+    except QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Analysis queue is full, retry shortly.",
+            headers={"Retry-After": "30"},
+        )
+
+    return {"job_id": job["id"], "status": job["status"], "status_url": f"/jobs/{job['id']}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Unknown or expired job id")
+    return {**job, "queue_depth": job_queue.depth()}
+
+
+@app.post("/batch/rank")
+async def batch_rank_endpoint(
+    resumes: List[UploadFile] = File(...),
+    job_description: str = Form(...),
+    top_k: int = Form(BATCH_TOP_K)
+):
+    """
+    Ranks many resumes against one job description. All resumes get an
+    embedding pre-score; only the best `top_k` are analyzed by the LLM.
+    """
+    logger.info("📥 /batch/rank request received (%d resumes)", len(resumes))
+
+    if len(resumes) > BATCH_MAX_RESUMES:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"At most {BATCH_MAX_RESUMES} resumes per batch."
+        )
+
+    # A rejected upload is kept as its error and reported in that file's entry
+    files = []
+    for i, resume in enumerate(resumes):
+        try:
+            data = await read_pdf_upload(resume)
+        except PDFExtractionError as e:
+            data = e
+        files.append((resume.filename or f"resume-{i}", data))
+
+    async def cached_extract(data) -> str:
+        if isinstance(data, PDFExtractionError):
+            raise data
+        return await _extract_stage(resume_key(data), data)
+
+    top_k = min(max(0, top_k), len(files))
+    try:
+        # One fair-queuing slot for the whole batch, so it cannot crowd out /analyze
+        with request_scope(uuid.uuid4().hex):
+            ranked = await rank_resumes(files, job_description, top_k=top_k, extract=cached_extract)
+    except Exception:
+        logger.exception("🔥 Unexpected error in /batch/rank")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while ranking resumes."
+        )
+
+    return {"count": len(ranked), "top_k": top_k, "results": ranked}
@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# USD per 1M tokens, e.g. {"mistralai/mistral-7b-instruct": [0.028, 0.054]}; unlisted models count as free
+LLM_PRICES: Dict[str, Any] = json.loads(os.getenv("LLM_PRICES", "{}"))
+
+# LLM calls on free-tier models routinely take tens of seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+
+_metrics_lock = threading.Lock()
+
+
+class _LazyMetric:
+    """
+    A Prometheus metric created on its first `labels()` call, so importing
+    this module (and with it every pipeline module) does not load
+    prometheus_client.
+    """
+
+    def __init__(self, kind: str, name: str, documentation: str, labelnames, **kwargs):
+        self._args = (name, documentation, labelnames)
+        self._kind, self._kwargs = kind, kwargs
+        self._metric = None
+
+    def labels(self, **labels):
+        if self._metric is None:
+            # Stages record from worker threads too; a metric may only be registered once
+            with _metrics_lock:
+                if self._metric is None:
+                    import prometheus_client
+
+                    self._metric = getattr(prometheus_client, self._kind)(*self._args, **self._kwargs)
+        return self._metric.labels(**labels)
+
+
+STAGE_SECONDS = _LazyMetric(
+    "Histogram",
+    "resume_stage_seconds",
+    "Wall time of a pipeline stage or sub-step",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_CALL_SECONDS = _LazyMetric(
+    "Histogram",
+    "resume_llm_call_seconds",
+    "Latency of a single LLM call",
+    ["stage", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_CALLS = _LazyMetric(
+    "Counter",
+    "resume_llm_calls_total",
+    "LLM calls by outcome",
+    ["stage", "model", "outcome"],
+)
+LLM_TOKENS = _LazyMetric(
+    "Counter",
+    "resume_llm_tokens_total",
+    "Tokens reported by the provider",
+    ["stage", "model", "kind"],
+)
+LLM_COST = _LazyMetric(
+    "Counter",
+    "resume_llm_cost_usd_total",
+    "Estimated spend from token counts and LLM_PRICES",
+    ["stage", "model"],
+)
+PROMPT_TOKENS = _LazyMetric(
+    "Counter",
+    "resume_prompt_input_tokens_total",
+    "Resume tokens before preprocessing (raw) and actually sent (sent), per stage",
+    ["stage", "kind"],
+)
+PARSE_FIELD_SOURCES = _LazyMetric(
+    "Counter",
+    "resume_parse_fields_total",
+    "Parsed resume fields by who filled them (local parser or LLM)",
+    ["field", "source"],
+)
+
+# Per-request stage durations for the Server-Timing header
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        # Repeated steps (one Tavily query per gap) add up
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def render_metrics():
+    """Returns (body, content type) for the /metrics route."""
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        # gunicorn/uvicorn with several workers: merge every worker's samples
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class LLMMetricsCallback:
+    """
+    Times every chat-model call and counts the tokens the provider reports.
+    The stage label comes from the `stage` key in the run's metadata, e.g.
+    chain.ainvoke(inputs, config={"metadata": {"stage": "parse"}}).
+    llm_metrics_callback() mixes it into langchain's BaseCallbackHandler.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        self._runs[run_id] = {
+            "start": time.perf_counter(),
+            "stage": metadata.get("stage", "unknown"),
+            "model": metadata.get("ls_model_name", "unknown"),
+        }
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+
+        elapsed = time.perf_counter() - run["start"]
+        LLM_CALL_SECONDS.labels(stage=run["stage"], model=run["model"]).observe(elapsed)
+        LLM_CALLS.labels(stage=run["stage"], model=run["model"], outcome="ok").inc()
+
+        prompt_tokens, completion_tokens = _token_usage(response)
+        if prompt_tokens:
+            LLM_TOKENS.labels(stage=run["stage"], model=run["model"], kind="prompt").inc(prompt_tokens)
+        if completion_tokens:
+            LLM_TOKENS.labels(stage=run["stage"], model=run["model"], kind="completion").inc(completion_tokens)
+
+        prompt_price, completion_price = LLM_PRICES.get(run["model"], (0, 0))
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+        if cost:
+            LLM_COST.labels(stage=run["stage"], model=run["model"]).inc(cost)
+
+        logger.info(
+            "🤖 LLM %s (%s): %.2fs, %s prompt / %s completion tokens",
+            run["stage"], run["model"], elapsed, prompt_tokens, completion_tokens
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        LLM_CALL_SECONDS.labels(stage=run["stage"], model=run["model"]).observe(
+            time.perf_counter() - run["start"]
+        )
+        LLM_CALLS.labels(stage=run["stage"], model=run["model"], outcome="error").inc()
+
+
+def _token_usage(response) -> tuple:
+    # Newer langchain puts usage on the message; older versions in llm_output
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+_llm_metrics_callback: Optional[LLMMetricsCallback] = None
+
+
+def llm_metrics_callback() -> LLMMetricsCallback:
+    """The shared callback handler; langchain_core is imported with the first LLM client."""
+    global _llm_metrics_callback
+    if _llm_metrics_callback is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        handler = type("LLMMetricsHandler", (LLMMetricsCallback, BaseCallbackHandler), {})
+        _llm_metrics_callback = handler()
+    return _llm_metrics_callback
@@ -1,67 +1,111 @@
+import logging
 import os
-import re
-import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
 from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+from local_parser import local_parse
+from metrics import PARSE_FIELD_SOURCES
+from structured import ParsedResume, ResumeAnalysis, StructuredOutputError, run_structured, validate_fields
 
-# Your custom module for creating the vector store
-from extract_embed import embed_resume
+# Your custom module for retrieving the relevant parts of the resume
+from extract_embed import select_resume_context
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Initialize the Language Model
-llm = ChatOpenAI(
-    model_name="mistralai/mistral-7b-instruct",
-    openai_api_key=os.getenv("OPENROUTER_API_KEY"),
-    openai_api_base="https://openrouter.ai/api/v1"
-)
+logger = logging.getLogger("resume-analyzer")
+
+LOCAL_PARSER_ENABLED = os.getenv("LOCAL_PARSER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Fields the local parser is less sure about than this go to the LLM
+PARSE_CONFIDENCE_THRESHOLD = float(os.getenv("PARSE_CONFIDENCE_THRESHOLD", "0.7"))
 
 
-async def parse_resume(text: str) -> str:
+# Key descriptions for the parse prompt; only the keys the LLM must fill are listed
+PARSE_FIELDS = {
+    "name": "- name",
+    "email": "- email",
+    "phone": "- phone",
+    "education": "- education (list of objects with 'degree', 'institution', 'year')",
+    "work_experience": "- work_experience (list of objects with 'role', 'company', 'duration', 'description')",
+    "skills": "- skills (list of strings)",
+    "certifications": "- certifications (list of strings, if any)",
+    "projects": "- projects (list of objects with 'name', 'description')",
+    "links": "- links (list of strings for LinkedIn, GitHub, Portfolio etc.)",
+}
+
+parse_prompt = PromptTemplate.from_template(
     """
-    Asynchronously parses resume text to extract structured data using an LLM.
-    Uses LCEL for the chain and .ainvoke() for the non-blocking call.
+    You are a resume parser. Extract structured data from the following resume text.
+    Return ONLY a single, valid JSON object with the following keys:
+    {fields}
+
+    Do not include any explanatory text, markdown formatting, or anything before or after the JSON object.
+
+    Resume:
+    {resume_text}
     """
-    prompt = PromptTemplate.from_template(
-        """
-        You are a resume parser. Extract structured data from the following resume text.
-        Return ONLY a single, valid JSON object with the following keys:
-        - name
-        - email
-        - phone
-        - education (list of objects with 'degree', 'institution', 'year')
-        - work_experience (list of objects with 'role', 'company', 'duration', 'description')
-        - skills (list of strings)
-        - certifications (list of strings, if any)
-        - projects (list of objects with 'name', 'description')
-        - links (list of strings for LinkedIn, GitHub, Portfolio etc.)
-
-        Do not include any explanatory text, markdown formatting, or anything before or after the JSON object.
-
-        Resume:
-        {resume_text}
-        """
-    )
+)
 
-    chain = prompt | llm | StrOutputParser()
-    parsed_data_content = await chain.ainvoke({"resume_text": text})
-    return parsed_data_content
 
+def _confident_fields(text: str, layout: Optional[dict]) -> Dict[str, Any]:
+    local, confidence = local_parse(text, layout)
+    confident = {
+        field: value for field, value in local.items()
+        if confidence.get(field, 0.0) >= PARSE_CONFIDENCE_THRESHOLD
+    }
+    checked, invalid = validate_fields(ParsedResume, confident)
+    logger.info("🧩 Local parse confidence%s: %s", " (with layout)" if layout else "", confidence)
+    # Validation fills defaults for absent fields; keep only what the parser vouched for
+    return {field: checked[field] for field in confident if field in checked and field not in invalid}
 
-async def analyze_resume(text: str, job_description: str) -> dict:
+
+async def parse_resume(
+    text: str,
+    load_layout: Optional[Callable[[], Awaitable[dict]]] = None,
+    full_text: Optional[str] = None,
+) -> dict:
     """
-    Asynchronously analyzes a resume against a job description using a RAG pipeline.
-    Uses a modern LCEL-based chain for retrieval and analysis.
+    Parses resume text into the ParsedResume schema. The local rule-based
+    parser runs first, on the text alone and then, if some fields are still
+    uncertain, with the PDF's layout cues from `load_layout()`. Only the
+    fields it is not confident about are asked from the LLM, so a
+    well-formatted resume needs no LLM call at all.
+    `full_text` is the resume before it was cut to the prompt budget; the
+    local parser reads it so trimmed sections are not taken as missing.
+    Raises StructuredOutputError if the LLM answer cannot be repaired.
     """
-    vectordb = await embed_resume(text)
-    retriever = vectordb.as_retriever()
+    known: Dict[str, Any] = {}
+    if LOCAL_PARSER_ENABLED:
+        local_text = full_text or text
+        known = _confident_fields(local_text, None)
+        if len(known) < len(PARSE_FIELDS) and load_layout is not None:
+            layout = await load_layout()
+            if layout:
+                known = {**_confident_fields(local_text, layout), **known}
+
+    missing = [field for field in PARSE_FIELDS if field not in known]
+    for field in PARSE_FIELDS:
+        PARSE_FIELD_SOURCES.labels(field=field, source="llm" if field in missing else "local").inc()
+
+    if not missing:
+        logger.info("⚡ Resume parsed locally, skipping the LLM")
+        return ParsedResume.model_validate(known).model_dump()
+
+    logger.info("🧠 Asking the LLM for: %s", ", ".join(missing))
+    return await run_structured(
+        "parse",
+        parse_prompt,
+        {"fields": "\n".join(PARSE_FIELDS[field] for field in missing), "resume_text": text},
+        ParsedResume,
+        base=known,
+        fields=missing if known else None,
+    )
 
-    template = """
+
+analysis_prompt = PromptTemplate.from_template("""
     You are an expert HR recruiter. You are evaluating a candidate's resume against a job description. Your goal is to fairly assess how well the candidate matches the job and suggest improvements.
 
     Please analyze the **resume** and **job description** provided below and return a **single valid JSON object** with the following keys and values:
@@ -95,43 +139,27 @@ async def analyze_resume(text: str, job_description: str) -> dict:
 
     Job Description:
     {job_description}
-    """
+    """)
 
-    prompt = PromptTemplate.from_template(template)
-
-    chain = (
-        {"resume": RunnablePassthrough(), "job_description": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
 
-    raw_text_output = await chain.ainvoke({
-        "resume": text,
-        "job_description": job_description
-    })
+async def analyze_resume(text: str, job_description: str) -> dict:
+    """
+    Asynchronously analyzes a resume against a job description using a RAG pipeline.
+    Only the resume chunks relevant to the job description are sent, unless
+    the whole resume already fits the token budget.
+    """
+    resume_context = await select_resume_context(text, job_description)
 
     try:
-        match = re.search(r"\{.*\}", raw_text_output, re.DOTALL)
-        if not match:
-            raise json.JSONDecodeError("No JSON object found in LLM output.", raw_text_output, 0)
-
-        clean_json_string = match.group(0)
-        analysis_dict = json.loads(clean_json_string)
-
-        return {
-            "analysis": {
-                "strengths": analysis_dict.get("strengths", []),
-                "improvements": analysis_dict.get("improvements", []),
-                "matching_qualifications": analysis_dict.get("matching_qualifications", ""),
-                "missing_requirements": analysis_dict.get("missing_requirements", ""),
-                "final_assessment": analysis_dict.get("final_assessment", "")
-            },
-            "score": analysis_dict.get("score", 0)
-        }
-
-    except json.JSONDecodeError:
+        analysis_dict = await run_structured("analysis", analysis_prompt, {
+            "resume": resume_context,
+            "job_description": job_description
+        }, ResumeAnalysis)
+    except StructuredOutputError as e:
         return {
             "error": "Failed to parse structured analysis from LLM.",
-            "raw_output": raw_text_output
+            "raw_output": e.raw_output
         }
+
+    score = analysis_dict.pop("score")
+    return {"analysis": analysis_dict, "score": score}
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from metrics import record_stage
+
+logger = logging.getLogger("resume-analyzer")
+
+
+@dataclass
+class Stage:
+    """
+    A single step of the analysis pipeline.
+    `func` receives the results of `deps` as positional arguments, in order.
+    """
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    deps: Tuple[str, ...] = field(default_factory=tuple)
+
+
+def _check_graph(stages: Sequence[Stage]) -> None:
+    names = {stage.name for stage in stages}
+    if len(names) != len(stages):
+        raise ValueError("Duplicate stage names in pipeline")
+
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in names:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+    # Kahn's algorithm, only to reject cycles before anything is scheduled
+    remaining = {stage.name: set(stage.deps) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Cycle between pipeline stages: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+async def run_stages(
+    stages: List[Stage],
+    on_complete: Optional[Callable[[str, Any], None]] = None
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Runs every stage as soon as its dependencies are done, so independent
+    stages overlap. If any stage fails, the others are cancelled and the
+    error of the stage that failed first is re-raised.
+    `on_complete(name, result)` is called as each stage finishes, before the
+    rest of the pipeline is done.
+
+    Returns (results by stage name, wall-clock seconds by stage name).
+    """
+    _check_graph(stages)
+
+    tasks: Dict[str, asyncio.Task] = {}
+    timings: Dict[str, float] = {}
+    # Stage names in the order they failed; several can fail before we wake up
+    failed: List[str] = []
+
+    async def run(stage: Stage) -> Any:
+        try:
+            args = [await tasks[dep] for dep in stage.deps]
+            start = time.perf_counter()
+            try:
+                result = await stage.func(*args)
+            finally:
+                timings[stage.name] = time.perf_counter() - start
+                record_stage(stage.name, timings[stage.name])
+        except Exception:
+            failed.append(stage.name)
+            raise
+        if on_complete is not None:
+            on_complete(stage.name, result)
+        return result
+
+    # Dependencies are awaited inside each task, so creation order does not matter
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(run(stage), name=f"stage:{stage.name}")
+
+    try:
+        done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+    except asyncio.CancelledError:
+        await _cancel_all(tasks.values())
+        raise
+
+    if pending:
+        # Something failed: stop the siblings before surfacing the error
+        await _cancel_all(pending)
+
+    if failed:
+        logger.error("❌ Stage '%s' failed", failed[0])
+        # Retrieve every failure so asyncio does not log the later ones as lost
+        errors = [tasks[name].exception() for name in failed]
+        raise errors[0]
+
+    results = {name: task.result() for name, task in tasks.items()}
+    return results, timings
+
+
+async def _cancel_all(tasks) -> None:
+    tasks = [task for task in tasks if not task.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,289 @@
+import json
+import logging
+import os
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from metrics import PROMPT_TOKENS
+from resilience import STAGE_MODELS
+from skills import get_skill_index
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# Tokens of resume text a prompt may carry, per model; models not listed get
+# the default. A stage uses the smallest budget among its fallback models so
+# whichever model answers, the prompt fits.
+RESUME_PROMPT_TOKEN_BUDGET = int(os.getenv("RESUME_PROMPT_TOKEN_BUDGET", "3000"))
+MODEL_TOKEN_BUDGETS: Dict[str, int] = json.loads(os.getenv("MODEL_TOKEN_BUDGETS", "{}"))
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "1000"))
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+
+# Lines at least this long are dropped when they repeat verbatim
+DEDUPE_MIN_CHARS = 25
+# Page furniture is looked for in this many lines at the top and bottom of each page
+FURNITURE_LINES = 2
+
+# pdfplumber separates pages with a form feed (see extract_embed)
+PAGE_BREAK = "\f"
+
+SECTION_HEADING = re.compile(
+    r"^(?:professional\s+|technical\s+|work\s+|relevant\s+|key\s+)?"
+    r"(summary|objective|profile|about me|education|experience|employment(?: history)?|"
+    r"projects?|skills|certifications?|achievements|awards|publications|languages|"
+    r"interests|volunteering|volunteer experience|leadership|activities|courses?|coursework|"
+    r"extra-?\s*curricular(?:\s+activities)?)"
+    r"\s*:?\s*$",
+    re.IGNORECASE,
+)
+
+# Sections kept first when a resume has to be cut down (lower = more important)
+SECTION_PRIORITY = {
+    "header": 0, "skills": 1, "experience": 2, "employment": 2, "employment history": 2,
+    "projects": 3, "project": 3, "education": 4, "summary": 5, "profile": 5,
+    "objective": 5, "about me": 5, "certifications": 6, "certification": 6,
+}
+DEFAULT_SECTION_PRIORITY = 7
+
+# Second halves of hyphenated compounds; a line break after "data-" before
+# one of these keeps the hyphen ("data-driven", not "datadriven")
+COMPOUND_PARTS = {
+    "based", "driven", "powered", "oriented", "focused", "facing", "aware", "friendly",
+    "time", "end", "level", "scale", "stack", "side", "source", "term", "world", "commerce",
+}
+
+_INVISIBLE = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\u2060\ufeff"))
+_PAGE_NUMBER = re.compile(r"^(?:page\s*)?#(?:\s*(?:of|/)\s*#)?$")
+
+
+# --------------------------------------------------
+# Token counting
+# --------------------------------------------------
+
+_encoder = None
+_encoder_failed = False
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with tiktoken. Falls back to ~4 characters per token when
+    the encoding cannot be loaded (it is downloaded once, then cached).
+    """
+    global _encoder, _encoder_failed
+    if _encoder is None and not _encoder_failed:
+        try:
+            import tiktoken
+
+            _encoder = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            _encoder_failed = True
+            logger.warning("⚠️ tiktoken encoding unavailable (%s), estimating tokens from length", e)
+    if _encoder is None:
+        return len(text) // 4 + 1
+    return len(_encoder.encode(text, disallowed_special=()))
+
+
+# --------------------------------------------------
+# Cleaning
+# --------------------------------------------------
+
+def normalize_line(line: str) -> str:
+    line = unicodedata.normalize("NFKC", line).translate(_INVISIBLE)
+    return " ".join(line.split())
+
+
+def _furniture_key(line: str) -> str:
+    return re.sub(r"\d+", "#", line.lower())
+
+
+def _strip_page_furniture(pages: List[List[str]]) -> List[List[str]]:
+    """Drops headers/footers repeated across pages and bare page numbers."""
+    if len(pages) > 1:
+        counts = Counter()
+        for lines in pages:
+            edges = lines[:FURNITURE_LINES] + lines[-FURNITURE_LINES:]
+            counts.update({_furniture_key(line) for line in edges})
+        threshold = max(2, (len(pages) + 1) // 2)
+        repeated = {key for key, count in counts.items() if count >= threshold}
+    else:
+        repeated = set()
+
+    cleaned = []
+    for lines in pages:
+        edge = set(range(FURNITURE_LINES)) | set(range(len(lines) - FURNITURE_LINES, len(lines)))
+        cleaned.append([
+            line for i, line in enumerate(lines)
+            if not _PAGE_NUMBER.match(_furniture_key(line))
+            and not (i in edge and _furniture_key(line) in repeated)
+        ])
+    return cleaned
+
+
+def _is_skill(word: str) -> bool:
+    matches = get_skill_index().scan(word)
+    return len(matches) == 1 and matches[0].end - matches[0].start == len(word)
+
+
+def _keeps_hyphen(first: str, second: str) -> bool:
+    """A real compound split at its hyphen: "React-" + "based", "data-" + "driven"."""
+    return (
+        first[:1].isupper()
+        or second.lower() in COMPOUND_PARTS
+        or _is_skill(first)
+        or _is_skill(second)
+    )
+
+
+def _dehyphenate(lines: List[str]) -> List[str]:
+    """
+    Rejoins words split across lines: "develop-" + "ment ..." -> "development ...".
+    Compounds keep their hyphen ("React-" + "based" -> "React-based").
+    """
+    out: List[str] = []
+    for line in lines:
+        first = re.search(r"([A-Za-z0-9+#.]*[a-z])-$", out[-1]) if out else None
+        if first and line[:1].islower():
+            second = re.match(r"[a-z]+", line).group()
+            keep = _keeps_hyphen(first.group(1), second)
+            out[-1] = (out[-1] if keep else out[-1][:-1]) + line
+        else:
+            out.append(line)
+    return out
+
+
+def _dedupe(lines: List[str]) -> List[str]:
+    seen = set()
+    out = []
+    for line in lines:
+        key = line.lower()
+        if len(line) >= DEDUPE_MIN_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        out.append(line)
+    return out
+
+
+def clean_text(text: str) -> str:
+    """
+    Normalizes pdfplumber output: unicode and whitespace normalization,
+    repeated page headers/footers and page numbers removed, hyphenated line
+    breaks rejoined and long duplicate lines dropped.
+    """
+    pages = [
+        [line for line in (normalize_line(raw) for raw in page.splitlines()) if line]
+        for page in text.split(PAGE_BREAK)
+    ]
+    lines = [line for page in _strip_page_furniture(pages) for line in page]
+    return "\n".join(_dedupe(_dehyphenate(lines)))
+
+
+def segment_sections(text: str) -> List[Tuple[str, List[str]]]:
+    """Splits text into (section, lines); everything before the first heading is "header"."""
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        match = SECTION_HEADING.match(stripped)
+        if match:
+            sections.append((match.group(1).lower(), [stripped]))
+        else:
+            sections[-1][1].append(stripped)
+    return [(name, lines) for name, lines in sections if lines]
+
+
+def trim_to_budget(text: str, budget: int) -> str:
+    """
+    Cuts text down to `budget` tokens. Sections are filled in SECTION_PRIORITY
+    order (contact header, skills, experience, projects, education, summary,
+    certifications, then the rest), each line by line until its next line
+    does not fit; a later, shorter section can still use what is left. The
+    original order is preserved.
+    """
+    if count_tokens(text) <= budget:
+        return text
+
+    sections = segment_sections(text)
+    order = sorted(range(len(sections)), key=lambda i: SECTION_PRIORITY.get(sections[i][0], DEFAULT_SECTION_PRIORITY))
+    kept: Dict[int, List[str]] = {}
+    used = 0
+    for i in order:
+        for line in sections[i][1]:
+            cost = count_tokens(line) + 1
+            if used + cost > budget:
+                break
+            kept.setdefault(i, []).append(line)
+            used += cost
+
+    if not kept:
+        # A single enormous line; fall back to cutting characters
+        return text[:budget * 4]
+    return "\n".join(line for i in sorted(kept) for line in kept[i])
+
+
+# --------------------------------------------------
+# Per-stage budgets
+# --------------------------------------------------
+
+def stage_budget(stage: str) -> int:
+    models = STAGE_MODELS.get(stage) or []
+    return min(
+        (MODEL_TOKEN_BUDGETS.get(model, RESUME_PROMPT_TOKEN_BUDGET) for model in models),
+        default=RESUME_PROMPT_TOKEN_BUDGET,
+    )
+
+
+@dataclass
+class PreparedResume:
+    """Cleaned resume text plus what it cost before cleaning, for savings reporting."""
+    raw_tokens: int
+    text: str
+    tokens: int
+    _by_stage: Dict[str, str] = field(default_factory=dict)
+
+    def for_stage(self, stage: str) -> str:
+        if stage not in self._by_stage:
+            text = trim_to_budget(self.text, stage_budget(stage))
+            sent = count_tokens(text) if text is not self.text else self.tokens
+            PROMPT_TOKENS.labels(stage=stage, kind="raw").inc(self.raw_tokens)
+            PROMPT_TOKENS.labels(stage=stage, kind="sent").inc(sent)
+            logger.info("✂️ %s: resume %d -> %d tokens", stage, self.raw_tokens, sent)
+            self._by_stage[stage] = text
+        return self._by_stage[stage]
+
+
+def prepare_resume(raw_text: str) -> PreparedResume:
+    """CPU-bound; call through asyncio.to_thread from request handlers."""
+    text = clean_text(raw_text)
+    return PreparedResume(raw_tokens=count_tokens(raw_text), text=text, tokens=count_tokens(text))
+
+
+def prepare_job_description(job_description: str, budget: Optional[int] = None) -> str:
+    lines = [line for line in (normalize_line(raw) for raw in job_description.splitlines()) if line]
+    text = "\n".join(_dedupe(lines))
+    budget = budget or JD_TOKEN_BUDGET
+    if count_tokens(text) <= budget:
+        return text
+
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept) if kept else text[:budget * 4]
+
+
+def compact_json(data) -> str:
+    """JSON for prompts: no indentation and no empty fields."""
+    if isinstance(data, dict):
+        data = {key: value for key, value in data.items() if value not in (None, "", [], {})}
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
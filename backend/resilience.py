@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from clients import PARSE_MODEL, ROADMAP_MODEL, SUGGESTION_MODEL, get_llm
+from limits import limited
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "45"))
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Until a model has enough samples for a p95, hedge after this many seconds
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("HEDGE_DEFAULT_DELAY_SECONDS", "10"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "1"))
+HEDGE_MIN_SAMPLES = 20
+# Completion size assumed when charging a call against the tokens/minute bucket
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "800"))
+
+
+def _models(env_name: str, primary: str, default_fallbacks: str) -> List[str]:
+    fallbacks = [m.strip() for m in os.getenv(env_name, default_fallbacks).split(",") if m.strip()]
+    return [primary] + [m for m in fallbacks if m != primary]
+
+
+# Ordered model list per stage: primary first, then fallbacks
+STAGE_MODELS: Dict[str, List[str]] = {
+    "parse": _models("PARSE_FALLBACK_MODELS", PARSE_MODEL, "meta-llama/llama-3.1-8b-instruct"),
+    "analysis": _models("ANALYSIS_FALLBACK_MODELS", PARSE_MODEL, "meta-llama/llama-3.1-8b-instruct"),
+    "suggestions": _models("SUGGESTION_FALLBACK_MODELS", SUGGESTION_MODEL, "mistralai/mistral-7b-instruct"),
+    "skill_gaps": _models("ROADMAP_FALLBACK_MODELS", ROADMAP_MODEL, "mistralai/mistral-7b-instruct"),
+    "roadmap": _models("ROADMAP_FALLBACK_MODELS", ROADMAP_MODEL, "mistralai/mistral-7b-instruct"),
+}
+
+# Share of the remaining request deadline a stage may use. parse/analysis
+# sit in front of the roadmap on the critical path, so they must leave room
+# for it; suggestions and the final roadmap may use whatever is left.
+STAGE_DEADLINE_SHARE: Dict[str, float] = {
+    "parse": 0.4,
+    "analysis": 0.4,
+    "suggestions": 1.0,
+    "skill_gaps": 0.3,
+    "roadmap": 1.0,
+}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage has no time left in the request deadline."""
+
+
+# --------------------------------------------------
+# Request deadline
+# --------------------------------------------------
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: float = REQUEST_DEADLINE_SECONDS):
+    """Sets an absolute deadline for everything awaited inside the block (and tasks it spawns)."""
+    current = _deadline.get()
+    deadline = time.monotonic() + seconds
+    # A nested deadline can only tighten the outer one
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def stage_timeout(stage: str) -> float:
+    """Per-call timeout: the call cap, tightened by the stage's share of the remaining deadline."""
+    left = remaining()
+    if left is None:
+        return LLM_CALL_TIMEOUT_SECONDS
+    if left <= 0:
+        raise DeadlineExceeded(f"No time left for stage '{stage}'")
+    return min(LLM_CALL_TIMEOUT_SECONDS, left * STAGE_DEADLINE_SHARE.get(stage, 1.0))
+
+
+# --------------------------------------------------
+# Per-model latency tracking (drives the hedge delay)
+# --------------------------------------------------
+
+_latencies: Dict[str, Deque[float]] = {}
+
+
+def record_latency(model: str, seconds: float) -> None:
+    _latencies.setdefault(model, deque(maxlen=200)).append(seconds)
+
+
+def hedge_delay(model: str) -> float:
+    samples = _latencies.get(model)
+    if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_SECONDS
+    ordered = sorted(samples)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    return max(HEDGE_MIN_DELAY_SECONDS, p95)
+
+
+# --------------------------------------------------
+# Hedged, fallback-aware LLM calls
+# --------------------------------------------------
+
+async def _attempt(stage: str, model: str, run: Callable[[Any], Awaitable[Any]], timeout: float, tokens: int) -> Any:
+    start = time.perf_counter()
+    try:
+        # The timeout covers time spent queued in the limiter as well
+        result = await asyncio.wait_for(
+            limited("openrouter", lambda: run(get_llm(model)), tokens=tokens),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.warning("⏳ %s: %s timed out after %.1fs", stage, model, timeout)
+        raise
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning("⚠️ %s: %s failed: %s", stage, model, e)
+        raise
+    record_latency(model, time.perf_counter() - start)
+    return result
+
+
+async def _hedged(stage: str, primary: str, backup: Optional[str], run, timeout: float, tokens: int, launched: List[str]):
+    """
+    Runs `primary`; if it has not answered by its p95 latency, also fires
+    `backup`. The first success wins and the loser is cancelled. Every model
+    started is appended to `launched`. Returns (result, winning model).
+    """
+    primary_task = asyncio.create_task(_attempt(stage, primary, run, timeout, tokens))
+    tasks = {primary_task: primary}
+
+    try:
+        delay = hedge_delay(primary)
+        if backup is not None and delay < timeout:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if not done:
+                logger.info("🪝 %s: %s slower than %.1fs, hedging with %s", stage, primary, delay, backup)
+                backup_task = asyncio.create_task(_attempt(stage, backup, run, timeout - delay, tokens))
+                tasks[backup_task] = backup
+                launched.append(backup)
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), tasks[task]
+                error = task.exception()
+        raise error
+    finally:
+        # Cancel the loser, or everything if we were cancelled ourselves
+        unfinished = [task for task in tasks if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+
+
+async def call_llm(
+    stage: str,
+    run: Callable[[Any], Awaitable[Any]],
+    hedge: bool = True,
+    can_fallback: Callable[[], bool] = lambda: True,
+    tokens: int = 0,
+) -> Any:
+    """
+    Calls `run(llm)` for the stage's models in order until one succeeds.
+
+    Every attempt is bounded by stage_timeout(). With `hedge`, a slow primary
+    is raced against the next model in the list. Streaming callers pass
+    hedge=False and a `can_fallback` that turns False once tokens were emitted.
+    `tokens` is the estimated cost charged to the OpenRouter tokens/minute bucket.
+    """
+    models = STAGE_MODELS.get(stage) or [PARSE_MODEL]
+    last_error: Optional[BaseException] = None
+    index = 0
+
+    while index < len(models):
+        timeout = stage_timeout(stage)
+        primary = models[index]
+        backup = models[index + 1] if hedge and HEDGE_ENABLED and index + 1 < len(models) else None
+        launched = [primary]
+
+        try:
+            result, winner = await _hedged(stage, primary, backup, run, timeout, tokens, launched)
+        except Exception as e:
+            last_error = e
+            if not can_fallback():
+                raise
+            index += len(launched)
+            continue
+
+        if winner != models[0]:
+            logger.info("🔁 %s answered by fallback model %s", stage, winner)
+        return result
+
+    if isinstance(last_error, asyncio.TimeoutError):
+        raise DeadlineExceeded(f"All models timed out for stage '{stage}'")
+    raise last_error
+
+
+def estimate_call_tokens(prompt, inputs: Dict[str, Any]) -> int:
+    """Rough prompt + completion size (4 chars per token) for rate limiting."""
+    chars = len(getattr(prompt, "template", "")) + sum(len(str(value)) for value in inputs.values())
+    return chars // 4 + LLM_COMPLETION_TOKENS_ESTIMATE
+
+
+async def run_prompt(
+    stage: str,
+    prompt,
+    inputs: Dict[str, Any],
+    on_token: Optional[Callable[[str], None]] = None,
+    response_format: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+) -> str:
+    """
+    Runs `prompt | llm | StrOutputParser()` for the stage with deadline,
+    hedging and fallback applied. With `on_token`, the output is streamed;
+    a fallback then only happens if the failing model emitted nothing yet.
+    `response_format(model)` picks the OpenAI response_format to request from
+    whichever model ends up serving the call.
+    """
+    from langchain_core.output_parsers import StrOutputParser
+
+    config = {"metadata": {"stage": stage}}
+    tokens = estimate_call_tokens(prompt, inputs)
+
+    def chain(llm):
+        output_format = response_format(llm.model_name) if response_format else None
+        if output_format:
+            llm = llm.bind(response_format=output_format)
+        return prompt | llm | StrOutputParser()
+
+    if on_token is None:
+        return await call_llm(
+            stage,
+            lambda llm: chain(llm).ainvoke(inputs, config=config),
+            tokens=tokens
+        )
+
+    parts: List[str] = []
+
+    async def stream(llm) -> str:
+        async for text in chain(llm).astream(inputs, config=config):
+            if text:
+                parts.append(text)
+                on_token(text)
+        return "".join(parts)
+
+    return await call_llm(stage, stream, hedge=False, can_fallback=lambda: not parts, tokens=tokens)
@@ -1,24 +1,29 @@
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
+import asyncio
+import logging
 import os
-import json
+
+from clients import get_search_tool
+from limits import limited
+from resilience import run_prompt
+from metrics import timed
+from preprocess import compact_json
+from search_cache import dedupe_results, search_cache
+from skills import find_skill_gaps
 
 # Load environment variables
 load_dotenv()
 
-# Initialize LLM
-llm = ChatOpenAI(
-    model_name="deepseek/deepseek-r1-distill-llama-70b:free",
-    openai_api_key=os.getenv("OPENROUTER_API_KEY"),
-    openai_api_base="https://openrouter.ai/api/v1"
-)
+logger = logging.getLogger("resume-analyzer")
 
-search_tool = TavilySearchResults(max_results=5)
+# Tavily fan-out limits: at most N searches in flight, each capped at T seconds
+TAVILY_MAX_CONCURRENCY = int(os.getenv("TAVILY_MAX_CONCURRENCY", "3"))
+TAVILY_TIMEOUT_SECONDS = float(os.getenv("TAVILY_TIMEOUT_SECONDS", "8"))
+# Ask the LLM for gaps when the skill taxonomy finds none in the JD
+SKILL_GAP_LLM_FALLBACK = os.getenv("SKILL_GAP_LLM_FALLBACK", "true").lower() in ("1", "true", "yes")
 
-# STEP 1: Extract Skill Gaps
+# STEP 1: Extract Skill Gaps (LLM fallback for skills.find_skill_gaps)
 extract_gap_prompt = PromptTemplate.from_template("""
 You are an expert career advisor.
 
@@ -67,36 +72,92 @@ For each step, use this markdown format:
 Only include high-impact, personalized steps. The roadmap must be realistic, motivating, and highly actionable.
 """)
 
-async def generate_roadmap(parsed_data, analysis, job_description, current_score):
-    # Step 1: Extract relevant skill gaps
-    gap_chain = extract_gap_prompt | llm | StrOutputParser()
-    skill_gaps_text = gap_chain.invoke({
+async def search_learning_resources(gap: str, semaphore: asyncio.Semaphore) -> list:
+    """
+    Runs one Tavily query for a skill gap. A slow or failing search returns
+    no links instead of stalling the roadmap.
+    """
+    search_query = f"best online courses, tutorials, or projects to learn {gap}"
+
+    async with semaphore:
+        logger.info("🌐 Searching resources for: %s", gap)
+        try:
+            with timed("tavily_search"):
+                results = await asyncio.wait_for(
+                    limited("tavily", lambda: get_search_tool().ainvoke(search_query)),
+                    timeout=TAVILY_TIMEOUT_SECONDS
+                )
+        except asyncio.TimeoutError:
+            logger.warning("⏳ Tavily search timed out for: %s", gap)
+            return []
+        except Exception:
+            logger.exception("⚠️ Tavily search failed for: %s", gap)
+            return []
+
+    # Tavily returns an error string instead of a list on some failures
+    return results if isinstance(results, list) else []
+
+
+async def extract_skill_gaps(resume_text, analysis, job_description):
+    """
+    Skill gaps from the taxonomy index: deterministic, so the same resume
+    and JD always give the same list. The LLM is only asked when the JD
+    mentions no skill the taxonomy knows.
+    """
+    gaps = await asyncio.to_thread(find_skill_gaps, resume_text, job_description)
+    if gaps is not None or not SKILL_GAP_LLM_FALLBACK:
+        return gaps or []
+
+    logger.info("🔍 No taxonomy skills in the JD, asking the LLM for gaps")
+    skill_gaps_text = await run_prompt("skill_gaps", extract_gap_prompt, {
         "analysis": analysis,
         "job_description": job_description
     })
+    return [gap.strip() for gap in skill_gaps_text.split(",") if gap.strip()]
 
-    print(f"🔍 Skill gaps found: {skill_gaps_text}")
 
-    # Step 2: Use Tavily to find learning resources for each gap
-    all_links = []
-    for gap in skill_gaps_text.split(","):
-        search_query = f"best online courses, tutorials, or projects to learn {gap.strip()}"
-        print(f"🌐 Searching resources for: {gap.strip()}")
-        results = search_tool.invoke(search_query)
-        all_links.extend(results)
+def format_links(gaps, results_per_gap):
+    """One markdown line per link, grouped by gap, with each URL listed once."""
+    lines = []
+    for gap, results in zip(gaps, dedupe_results(results_per_gap)):
+        for result in results:
+            title = result["title"] or result["url"]
+            summary = f" – {result['snippet']}" if result["snippet"] else ""
+            lines.append(f"- ({gap}) [{title}]({result['url']}){summary}")
+    return "\n".join(lines)
 
-    formatted_links = "\n".join([f"- {link}" for link in all_links])
 
-    # Step 3: Generate dynamic, high-quality roadmap
-    roadmap_chain = roadmap_prompt | llm
+async def generate_roadmap(parsed_data, analysis, job_description, current_score, on_token=None, resume_text=None):
+    # Step 1: Extract relevant skill gaps
+    with timed("skill_gaps"):
+        gaps = await extract_skill_gaps(
+            resume_text if resume_text is not None else compact_json(parsed_data),
+            analysis,
+            job_description
+        )
+    skill_gaps_text = ", ".join(gaps)
+
+    logger.info("🔍 Skill gaps found: %s", skill_gaps_text)
+
+    # Step 2: Find learning resources for all gaps at once; Tavily is only
+    # queried for skills the search cache does not have yet
+    semaphore = asyncio.Semaphore(TAVILY_MAX_CONCURRENCY)
+    search_results = await asyncio.gather(*(
+        search_cache.lookup(gap, lambda gap=gap: search_learning_resources(gap, semaphore))
+        for gap in gaps
+    ))
+    formatted_links = format_links(gaps, search_results)
 
-    result = roadmap_chain.invoke({
-        "parsed_data": json.dumps(parsed_data, indent=2),
+    # Step 3: Generate dynamic, high-quality roadmap
+    roadmap_inputs = {
+        # Compact and without empty fields: indentation alone is a large share of the tokens
+        "parsed_data": compact_json(parsed_data),
         "analysis": analysis,
         "job_description": job_description,
         "current_score": current_score,
         "skill_gaps": skill_gaps_text,
         "links": formatted_links
-    })
+    }
 
-    return result.content
+    with timed("roadmap_generation"):
+        return await run_prompt("roadmap", roadmap_prompt, roadmap_inputs, on_token=on_token)
@@ -0,0 +1,168 @@
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from skills import get_skill_index, jd_skill_weights
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# Share of each component in the local score; components that are not
+# available (no known skills in the JD, no embedding) are left out and the
+# rest renormalized
+LOCAL_SCORE_WEIGHTS: Dict[str, float] = json.loads(
+    os.getenv("LOCAL_SCORE_WEIGHTS", '{"skills": 0.5, "lexical": 0.3, "embedding": 0.2}')
+)
+# An LLM score further than this from the local score is pulled back to the edge
+LOCAL_SCORE_MAX_DEVIATION = float(os.getenv("LOCAL_SCORE_MAX_DEVIATION", "35"))
+
+# BM25 parameters; a resume has no corpus, so length is normalized against a typical resume
+BM25_K1 = 1.2
+BM25_B = 0.75
+TYPICAL_RESUME_TERMS = 350
+# Cohere cosines between a resume and a JD fall roughly in this range
+EMBEDDING_COSINE_RANGE = (0.15, 0.65)
+
+_TERM = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does
+for from had has have having he her his how i if in into is it its just may me more most must my
+no not of on or our out over own same she should so some such than that the their them then there
+these they this those through to too under up very was we were what when where which while who
+why will with would you your able ability etc using use used work working experience years year
+strong knowledge good excellent skills skill team role job candidate ideal looking responsibilities
+requirements required preferred plus including include includes well new
+""".split())
+
+
+def tokenize(text: str) -> Counter:
+    return Counter(term for term in _TERM.findall(text.lower()) if term not in STOPWORDS and len(term) > 1)
+
+
+# --------------------------------------------------
+# Features: computed once per text, so scoring a resume against a new JD
+# (or a new JD against many resumes) only does the vector math
+# --------------------------------------------------
+
+@dataclass(frozen=True)
+class ResumeFeatures:
+    terms: Dict[str, int]
+    length: int
+    skills: frozenset
+
+
+@dataclass(frozen=True)
+class JDFeatures:
+    terms: Tuple[str, ...]
+    term_weights: np.ndarray
+    skills: Tuple[str, ...]
+    skill_weights: np.ndarray
+
+
+@lru_cache(maxsize=256)
+def resume_features(text: str) -> ResumeFeatures:
+    terms = tokenize(text)
+    return ResumeFeatures(
+        terms=dict(terms),
+        length=sum(terms.values()),
+        skills=frozenset(get_skill_index().skills(text)),
+    )
+
+
+@lru_cache(maxsize=256)
+def jd_features(job_description: str) -> JDFeatures:
+    terms = tokenize(job_description)
+    weights = jd_skill_weights(job_description)
+    names = tuple(sorted(terms))
+    skills = tuple(sorted(weights))
+    return JDFeatures(
+        terms=names,
+        # Sublinear: a term repeated five times matters more, not five times more
+        term_weights=np.array([1.0 + math.log(terms[term]) for term in names], dtype=np.float64),
+        skills=skills,
+        skill_weights=np.array([weights[skill] for skill in skills], dtype=np.float64),
+    )
+
+
+# --------------------------------------------------
+# Scoring
+# --------------------------------------------------
+
+def _lexical(resume: ResumeFeatures, jd: JDFeatures) -> Optional[float]:
+    """
+    BM25 of the JD's terms against the resume, divided by the best possible
+    BM25 (every term saturated), so 0..1.
+    """
+    if not jd.terms:
+        return None
+    tf = np.array([resume.terms.get(term, 0) for term in jd.terms], dtype=np.float64)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * resume.length / TYPICAL_RESUME_TERMS)
+    saturation = tf * (BM25_K1 + 1) / (tf + norm)
+    return float(jd.term_weights @ saturation / (jd.term_weights.sum() * (BM25_K1 + 1)))
+
+
+def _skill_coverage(resume: ResumeFeatures, jd: JDFeatures) -> Optional[float]:
+    """Weighted share of the JD's taxonomy skills the resume mentions."""
+    if not jd.skills:
+        return None
+    covered = np.array([skill in resume.skills for skill in jd.skills], dtype=np.float64)
+    return float(jd.skill_weights @ covered / jd.skill_weights.sum())
+
+
+def _embedding(cosine: Optional[float]) -> Optional[float]:
+    if cosine is None:
+        return None
+    low, high = EMBEDDING_COSINE_RANGE
+    return float(np.clip((cosine - low) / (high - low), 0.0, 1.0))
+
+
+def local_score(resume_text: str, job_description: str, embedding_cosine: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Deterministic 0-100 match score from skill coverage, BM25 term overlap
+    and, when the caller has one, the resume/JD embedding cosine. Features
+    are cached per text, so repeat calls cost microseconds.
+    """
+    resume = resume_features(resume_text)
+    jd = jd_features(job_description)
+    components = {
+        "skills": _skill_coverage(resume, jd),
+        "lexical": _lexical(resume, jd),
+        "embedding": _embedding(embedding_cosine),
+    }
+    available = {name: value for name, value in components.items() if value is not None and LOCAL_SCORE_WEIGHTS.get(name)}
+    total_weight = sum(LOCAL_SCORE_WEIGHTS[name] for name in available)
+    combined = sum(LOCAL_SCORE_WEIGHTS[name] * value for name, value in available.items()) / total_weight if total_weight else 0.0
+
+    return {
+        "score": round(100 * combined),
+        "breakdown": {name: None if value is None else round(value, 3) for name, value in components.items()},
+        "matched_skills": [skill for skill in jd.skills if skill in resume.skills],
+        "missing_skills": [skill for skill in jd.skills if skill not in resume.skills],
+    }
+
+
+def reconcile_score(llm_score: Optional[int], local: Dict[str, Any]) -> Tuple[int, str]:
+    """
+    The score to report: the LLM's when it is plausible, clamped to within
+    LOCAL_SCORE_MAX_DEVIATION of the local score when it is not, and the
+    local score when the LLM gave none. Returns (score, source).
+    """
+    if llm_score is None:
+        return local["score"], "local"
+    low = max(0, local["score"] - LOCAL_SCORE_MAX_DEVIATION)
+    high = min(100, local["score"] + LOCAL_SCORE_MAX_DEVIATION)
+    if low <= llm_score <= high:
+        return llm_score, "llm"
+    clamped = round(min(max(llm_score, low), high))
+    logger.warning("📏 LLM score %s is implausible next to local score %s, clamped to %s", llm_score, local["score"], clamped)
+    return clamped, "llm_clamped"
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+
+from cache import ResultCache
+from shared_state import SharedState, SharedStateError, shared_state
+from singleflight import SingleFlight
+from skills import get_skill_index
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# Entries older than this are refetched; older than SEARCH_CACHE_MAX_AGE_SECONDS
+# they are evicted. In between they are still served in offline mode.
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(7 * 86400)))
+SEARCH_CACHE_MAX_AGE_SECONDS = float(os.getenv("SEARCH_CACHE_MAX_AGE_SECONDS", str(90 * 86400)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2048"))
+SEARCH_CACHE_DB = os.getenv(
+    "SEARCH_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma", "search_cache.sqlite3")
+)
+SEARCH_CACHE_DB_MAX_BYTES = int(os.getenv("SEARCH_CACHE_DB_MAX_BYTES", str(64 * 1024 * 1024)))
+# Entries hit this often are refreshed in the background once they turn stale
+# (or within the last fifth of their TTL), so popular skills never wait on Tavily
+SEARCH_REFRESH_MIN_HITS = int(os.getenv("SEARCH_REFRESH_MIN_HITS", "3"))
+# Serve only from the cache and never call Tavily (tests, outages)
+SEARCH_OFFLINE = os.getenv("SEARCH_OFFLINE", "false").lower() in ("1", "true", "yes")
+SEARCH_SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", "200"))
+# How long one worker may hold a skill's background refresh
+SEARCH_REFRESH_LEASE_SECONDS = float(os.getenv("SEARCH_REFRESH_LEASE_SECONDS", "60"))
+
+_TRACKING_PARAMS = re.compile(r"^(?:utm_\w+|ref|ref_src|source|fbclid|gclid)$", re.IGNORECASE)
+
+
+# --------------------------------------------------
+# Normalization
+# --------------------------------------------------
+
+def normalize_skill(skill: str) -> str:
+    """
+    Cache key for a skill gap: aliases resolve to the taxonomy's canonical
+    name ("k8s" and "Kubernetes" share an entry), then case and spacing are
+    folded.
+    """
+    cleaned = " ".join(skill.split()).strip(" .,;:")
+    matches = get_skill_index().scan(cleaned)
+    if len(matches) == 1 and matches[0].end - matches[0].start == len(cleaned):
+        cleaned = matches[0].skill
+    return cleaned.casefold()
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+
+def trim_results(results: List[Any]) -> List[Dict[str, str]]:
+    """Keeps only title, url and a short snippet of each Tavily result."""
+    trimmed = []
+    for result in results:
+        if not isinstance(result, dict) or not result.get("url"):
+            continue
+        snippet = " ".join(str(result.get("content") or "").split())
+        if len(snippet) > SEARCH_SNIPPET_CHARS:
+            snippet = snippet[:SEARCH_SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+        trimmed.append({
+            "title": " ".join(str(result.get("title") or "").split()),
+            "url": result["url"],
+            "snippet": snippet,
+        })
+    return trimmed
+
+
+def dedupe_results(results_per_gap: List[List[Dict[str, str]]]) -> List[List[Dict[str, str]]]:
+    """Drops links already listed under an earlier gap."""
+    seen = set()
+    deduped = []
+    for results in results_per_gap:
+        kept = []
+        for result in results:
+            key = normalize_url(result["url"])
+            if key not in seen:
+                seen.add(key)
+                kept.append(result)
+        deduped.append(kept)
+    return deduped
+
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+
+class SearchCache:
+    """
+    Search results per normalized skill, in the same two-tier LRU/TTL
+    store as the result cache (SQLite on disk, so entries survive restarts).
+    Concurrent misses for the same skill share one Tavily call, and a
+    background refresh runs in one worker at a time.
+    """
+
+    def __init__(self, offline: bool = SEARCH_OFFLINE, state: SharedState = shared_state):
+        self.offline = offline
+        self.state = state if state.shared else None
+        self.store = ResultCache(
+            max_entries=SEARCH_CACHE_MAX_ENTRIES,
+            max_bytes=SEARCH_CACHE_MAX_ENTRIES * 4096,
+            ttl_seconds=SEARCH_CACHE_MAX_AGE_SECONDS,
+            db_path=SEARCH_CACHE_DB,
+            db_max_bytes=SEARCH_CACHE_DB_MAX_BYTES,
+        )
+        self.hits: Dict[str, int] = {}
+        self._flights = SingleFlight()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[List[Any]]]) -> List[Dict[str, str]]:
+        results = trim_results(await fetch())
+        # Empty means Tavily failed or timed out; try again next time
+        if results:
+            await self.store.set("search", key, {"fetched_at": time.time(), "results": results})
+        return results
+
+    async def _refresh_once(self, key: str, fetch: Callable[[], Awaitable[List[Any]]]) -> None:
+        if self.state is None:
+            await self._flights.do(key, lambda: self._fetch(key, fetch))
+            return
+        lease = f"search-refresh:{key}"
+        try:
+            token = await self.state.acquire_lease(lease, SEARCH_REFRESH_LEASE_SECONDS)
+        except SharedStateError as e:
+            logger.warning("⚠️ Search refresh lease unavailable: %s", e)
+            return
+        if token is None:
+            # Another worker is refreshing this skill; its result lands in the shared cache
+            return
+        try:
+            await self._flights.do(key, lambda: self._fetch(key, fetch))
+        finally:
+            try:
+                await self.state.release_lease(lease, token)
+            except SharedStateError:
+                pass
+
+    def _refresh(self, key: str, fetch: Callable[[], Awaitable[List[Any]]]) -> None:
+        if key in self._refreshing:
+            return
+        logger.info("🔄 Refreshing search results for: %s", key)
+        task = asyncio.create_task(self._refresh_once(key, fetch))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    def _count_hit(self, key: str) -> None:
+        self.hits[key] = self.hits.get(key, 0) + 1
+        if len(self.hits) > SEARCH_CACHE_MAX_ENTRIES:
+            # Forget the long tail; only the popular skills matter for refreshes
+            popular = sorted(self.hits, key=self.hits.get, reverse=True)[:SEARCH_CACHE_MAX_ENTRIES // 2]
+            self.hits = {skill: self.hits[skill] for skill in popular}
+
+    async def lookup(self, skill: str, fetch: Callable[[], Awaitable[List[Any]]]) -> List[Dict[str, str]]:
+        """Cached results for `skill`; `fetch()` runs the actual search on a miss."""
+        key = normalize_skill(skill)
+        entry = await self.store.get("search", key)
+
+        if entry is not None:
+            self._count_hit(key)
+            age = time.time() - entry["fetched_at"]
+            if self.offline:
+                return entry["results"]
+            if age >= SEARCH_CACHE_TTL_SECONDS and self.hits[key] < SEARCH_REFRESH_MIN_HITS:
+                # Stale and not popular: refetch inline, keep the old links if that fails
+                return await self._flights.do(key, lambda: self._fetch(key, fetch)) or entry["results"]
+            if age >= SEARCH_CACHE_TTL_SECONDS * 0.8 and self.hits[key] >= SEARCH_REFRESH_MIN_HITS:
+                self._refresh(key, fetch)
+            return entry["results"]
+
+        if self.offline:
+            logger.info("📴 Offline search mode, no cached results for: %s", key)
+            return []
+        return await self._flights.do(key, lambda: self._fetch(key, fetch))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.store.stats(),
+            "offline": self.offline,
+            "refreshing": len(self._refreshing),
+            "popular": sorted(self.hits, key=self.hits.get, reverse=True)[:10],
+        }
+
+
+search_cache = SearchCache()
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from cache import resume_key
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+RESUME_SESSION_TTL_SECONDS = float(os.getenv("RESUME_SESSION_TTL_SECONDS", "86400"))
+RESUME_SESSION_DIR = os.getenv("RESUME_SESSION_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "uploads", "resumes"
+)
+
+# Resume ids are the SHA-256 of the PDF (see cache.resume_key)
+_RESUME_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ResumeStore:
+    """
+    Uploaded resumes kept on disk under their content hash, so the handle
+    doubles as the result-cache key for every resume-only stage. Uploading
+    the same PDF twice returns the same id. A resume expires `ttl_seconds`
+    after it was last used; every worker on the box shares the directory.
+    """
+
+    def __init__(self, directory: str = RESUME_SESSION_DIR, ttl_seconds: float = RESUME_SESSION_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, resume_id: str) -> str:
+        return os.path.join(self.directory, f"{resume_id}.pdf")
+
+    async def put(self, resume_data: bytes) -> str:
+        resume_id = resume_key(resume_data)
+        await asyncio.to_thread(self._write, resume_id, resume_data)
+        return resume_id
+
+    async def get(self, resume_id: str) -> Optional[bytes]:
+        if not _RESUME_ID.match(resume_id):
+            return None
+        return await asyncio.to_thread(self._read, resume_id)
+
+    def _write(self, resume_id: str, resume_data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._prune()
+        path = self._path(resume_id)
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        # Write then rename, so a concurrent reader never sees half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(resume_data)
+        os.replace(tmp_path, path)
+
+    def _read(self, resume_id: str) -> Optional[bytes]:
+        path = self._path(resume_id)
+        try:
+            if os.path.getmtime(path) < time.time() - self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith(".pdf") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,321 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# "memory" keeps state private to the process; "sqlite" shares it between every
+# worker on the box. Defaults to sqlite when uvicorn/gunicorn run several workers.
+SHARED_STATE_BACKEND = (
+    os.getenv("SHARED_STATE_BACKEND")
+    or ("sqlite" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "memory")
+).lower()
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "chroma", "shared_state.sqlite3"
+)
+# Expired keys are swept at most this often (they are ignored on read either way)
+SHARED_STATE_SWEEP_SECONDS = float(os.getenv("SHARED_STATE_SWEEP_SECONDS", "60"))
+
+
+class SharedStateError(Exception):
+    """The shared-state backend failed (e.g. the SQLite file is locked or unwritable)."""
+
+
+class SharedState:
+    """
+    Small key/value store for state every worker must agree on: cached
+    values, counters and leases. Values must be JSON-serializable; every
+    operation is atomic and any key can carry a TTL in seconds.
+
+    Backends implement the synchronous `_get`, `_set`, `_add`, `_replace`,
+    `_delete` and `_incr` over JSON text; the async methods are what the app
+    calls. Values are encoded on the event loop, so a caller may keep
+    mutating what it stored, and both backends hand back copies.
+    """
+
+    name = "base"
+    # Whether other processes see this state; callers skip cross-worker
+    # coordination when they would only be talking to themselves
+    shared = False
+
+    def __init__(self):
+        self.ops = 0
+        self.errors = 0
+
+    async def _run(self, method, *args):
+        self.ops += 1
+        return method(*args)
+
+    async def get(self, key: str) -> Optional[Any]:
+        payload = await self._run(self._get, key)
+        return None if payload is None else json.loads(payload)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._run(self._set, key, json.dumps(value), ttl)
+
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Sets `key` only if it does not exist yet. Returns whether it did."""
+        return await self._run(self._add, key, json.dumps(value), ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._delete, key, None)
+
+    async def incr(self, key: str, amount: float = 1, ttl: Optional[float] = None) -> float:
+        """
+        Adds `amount` to a counter and returns the new total. A missing or
+        expired counter starts from zero and gets `ttl`; later increments
+        keep the original expiry.
+        """
+        return await self._run(self._incr, key, amount, ttl)
+
+    # --------------------------------------------------
+    # Leases: a key owned by one holder until released or expired
+    # --------------------------------------------------
+
+    async def acquire_lease(self, name: str, ttl: float) -> Optional[str]:
+        """Returns a token if the lease was free, None if someone else holds it."""
+        token = uuid.uuid4().hex
+        return token if await self.add(f"lease:{name}", token, ttl) else None
+
+    async def renew_lease(self, name: str, token: str, ttl: float) -> bool:
+        payload = json.dumps(token)
+        return await self._run(self._replace, f"lease:{name}", payload, payload, ttl)
+
+    async def release_lease(self, name: str, token: str) -> None:
+        await self._run(self._delete, f"lease:{name}", json.dumps(token))
+
+    async def lease_held(self, name: str) -> bool:
+        return await self._run(self._get, f"lease:{name}") is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "shared": self.shared, "ops": self.ops, "errors": self.errors}
+
+
+# --------------------------------------------------
+# Backends
+# --------------------------------------------------
+
+class MemoryState(SharedState):
+    """
+    Process-local backend. Every operation runs on the event loop without
+    awaiting, which makes it atomic within the process.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._entries: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._swept_at = time.monotonic()
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl is not None else None
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            return None
+        return payload
+
+    def _sweep(self) -> None:
+        if time.monotonic() - self._swept_at < SHARED_STATE_SWEEP_SECONDS:
+            return
+        self._swept_at = time.monotonic()
+        now = time.time()
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at is not None and expires_at <= now]:
+            del self._entries[key]
+
+    def _get(self, key: str) -> Optional[str]:
+        return self._live(key)
+
+    def _set(self, key: str, payload: str, ttl: Optional[float]) -> None:
+        self._sweep()
+        self._entries[key] = (payload, self._expires_at(ttl))
+
+    def _add(self, key: str, payload: str, ttl: Optional[float]) -> bool:
+        if self._live(key) is not None:
+            return False
+        self._set(key, payload, ttl)
+        return True
+
+    def _replace(self, key: str, expected: str, payload: str, ttl: Optional[float]) -> bool:
+        if self._live(key) != expected:
+            return False
+        self._entries[key] = (payload, self._expires_at(ttl))
+        return True
+
+    def _delete(self, key: str, expected: Optional[str]) -> None:
+        if expected is None or self._live(key) == expected:
+            self._entries.pop(key, None)
+
+    def _incr(self, key: str, amount: float, ttl: Optional[float]) -> float:
+        current = self._live(key)
+        if current is None:
+            self._set(key, json.dumps(amount), ttl)
+            return amount
+        total = json.loads(current) + amount
+        self._entries[key] = (json.dumps(total), self._entries[key][1])
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "keys": len(self._entries)}
+
+
+class SQLiteState(SharedState):
+    """
+    Backend in a SQLite file in WAL mode, shared by every worker on the box.
+    Read-modify-write operations run inside BEGIN IMMEDIATE, which takes the
+    write lock up front, so they are atomic across processes. Calls run in
+    worker threads with a connection each, like the result cache's disk tier.
+    """
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str = SHARED_STATE_DB):
+        super().__init__()
+        self.path = path
+        self._swept_at = 0.0
+        self._created = False
+        self._create_lock = threading.Lock()
+
+    def _create(self) -> None:
+        # On first use, not at import: the module-level instance is built when the app loads
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with sqlite3.connect(self.path, timeout=5) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS shared_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS shared_state_expires ON shared_state (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._created:
+            with self._create_lock:
+                if not self._created:
+                    self._create()
+                    self._created = True
+        # Autocommit; transactions are opened explicitly where they matter
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def _run(self, method, *args):
+        self.ops += 1
+        try:
+            return await asyncio.to_thread(method, *args)
+        except (sqlite3.Error, OSError) as e:
+            self.errors += 1
+            raise SharedStateError(str(e)) from e
+
+    def _transaction(self, conn: sqlite3.Connection, work):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work()
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _read(self, conn: sqlite3.Connection, key: str) -> Tuple[Optional[str], Optional[float]]:
+        row = conn.execute("SELECT value, expires_at FROM shared_state WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None, None
+        return row[0], row[1]
+
+    def _write(self, conn: sqlite3.Connection, key: str, payload: str, expires_at: Optional[float]) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, payload, expires_at),
+        )
+
+    def _sweep(self, conn: sqlite3.Connection) -> None:
+        if time.monotonic() - self._swept_at < SHARED_STATE_SWEEP_SECONDS:
+            return
+        self._swept_at = time.monotonic()
+        conn.execute("DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),))
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            return self._read(conn, key)[0]
+
+    def _set(self, key: str, payload: str, ttl: Optional[float]) -> None:
+        with self._connect() as conn:
+            self._write(conn, key, payload, time.time() + ttl if ttl is not None else None)
+            self._sweep(conn)
+
+    def _add(self, key: str, payload: str, ttl: Optional[float]) -> bool:
+        def work() -> bool:
+            if self._read(conn, key)[0] is not None:
+                return False
+            self._write(conn, key, payload, time.time() + ttl if ttl is not None else None)
+            return True
+
+        with self._connect() as conn:
+            return self._transaction(conn, work)
+
+    def _replace(self, key: str, expected: str, payload: str, ttl: Optional[float]) -> bool:
+        def work() -> bool:
+            if self._read(conn, key)[0] != expected:
+                return False
+            self._write(conn, key, payload, time.time() + ttl if ttl is not None else None)
+            return True
+
+        with self._connect() as conn:
+            return self._transaction(conn, work)
+
+    def _delete(self, key: str, expected: Optional[str]) -> None:
+        def work() -> None:
+            if expected is None or self._read(conn, key)[0] == expected:
+                conn.execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+        with self._connect() as conn:
+            self._transaction(conn, work)
+
+    def _incr(self, key: str, amount: float, ttl: Optional[float]) -> float:
+        def work() -> float:
+            current, expires_at = self._read(conn, key)
+            if current is None:
+                total, expires_at = amount, time.time() + ttl if ttl is not None else None
+            else:
+                total = json.loads(current) + amount
+            self._write(conn, key, json.dumps(total), expires_at)
+            return total
+
+        with self._connect() as conn:
+            return self._transaction(conn, work)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "path": self.path}
+
+
+def create_shared_state(backend: str = SHARED_STATE_BACKEND) -> SharedState:
+    if backend == "sqlite":
+        return SQLiteState()
+    if backend != "memory":
+        logger.warning("⚠️ Unknown SHARED_STATE_BACKEND %r, using memory", backend)
+    return MemoryState()
+
+
+shared_state = create_shared_state()
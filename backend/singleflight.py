@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from limits import RateLimited
+from resilience import DeadlineExceeded, remaining
+from shared_state import SharedState, SharedStateError
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# Cross-worker flights: how long a worker may hold a key (past the request
+# deadline, so a live leader never loses it), how often the others check on
+# it, and how long its result stays readable for them
+SHARED_FLIGHT_LEASE_SECONDS = float(os.getenv("SHARED_FLIGHT_LEASE_SECONDS", "150"))
+SHARED_FLIGHT_POLL_SECONDS = float(os.getenv("SHARED_FLIGHT_POLL_SECONDS", "0.2"))
+SHARED_FLIGHT_RESULT_TTL_SECONDS = float(os.getenv("SHARED_FLIGHT_RESULT_TTL_SECONDS", "30"))
+
+# Published instead of a result when the leader failed
+_FAILURE = "__flight_failure__"
+# Errors that keep their type when re-raised in the waiting workers
+_SHARED_ERRORS = {cls.__name__: cls for cls in (RateLimited, DeadlineExceeded)}
+
+
+class SharedFlightError(Exception):
+    """The worker that ran a shared flight failed; raised in the workers waiting on it."""
+
+
+def _failure(error: Exception) -> Dict[str, Any]:
+    return {_FAILURE: {
+        "type": type(error).__name__,
+        "message": str(error),
+        "status_code": getattr(error, "status_code", None),
+        "detail": getattr(error, "detail", None),
+    }}
+
+
+def _raise_failure(failure: Dict[str, Any]) -> None:
+    if failure["status_code"] is not None:
+        raise HTTPException(failure["status_code"], failure["detail"])
+    raise _SHARED_ERRORS.get(failure["type"], SharedFlightError)(failure["message"])
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key: the first caller starts
+    the work, later callers await the same task.
+
+    The shared task is detached from the callers. A caller that is cancelled
+    (e.g. the client disconnected) only stops waiting; the work keeps running
+    for the others, and its result still lands in the result cache. Errors are
+    re-raised to every waiter, and the key is released as soon as the task
+    finishes so the next call after a failure starts fresh.
+
+    With a shared `state`, the same holds across workers: one worker takes
+    a lease on the key and runs the work, the others poll for its result
+    (which must be JSON-serializable). If the leader fails, its error is
+    published instead and raised in the waiting workers, so a failure is
+    not recomputed once per worker; a leader that dies without publishing
+    is taken over by the next worker to notice. Followers stop waiting at
+    their own request deadline.
+    """
+
+    def __init__(self, state: Optional[SharedState] = None):
+        self.state = state if state is not None and state.shared else None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+        self.coalesced_remote = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            work = func() if self.state is None else self._lead_or_follow(key, func)
+            task = asyncio.create_task(work, name=f"singleflight:{key[:16]}")
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self.coalesced += 1
+            logger.info("🔗 Joining in-flight analysis %s", key[:16])
+
+        return await asyncio.shield(task)
+
+    async def _lead_or_follow(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        lease, result_key = f"flight:{key}", f"flight-result:{key}"
+        waited = False
+        while True:
+            try:
+                token = await self.state.acquire_lease(lease, SHARED_FLIGHT_LEASE_SECONDS)
+            except SharedStateError as e:
+                logger.warning("⚠️ Shared flight unavailable, running locally: %s", e)
+                return await func()
+
+            if token is not None:
+                try:
+                    try:
+                        result = await func()
+                    except Exception as e:
+                        await self._publish(result_key, _failure(e))
+                        raise
+                    await self._publish(result_key, result)
+                    return result
+                finally:
+                    try:
+                        await self.state.release_lease(lease, token)
+                    except SharedStateError as e:
+                        logger.warning("⚠️ Could not release flight lease (expires on its own): %s", e)
+
+            if not waited:
+                waited = True
+                self.coalesced_remote += 1
+                logger.info("🔗 Joining analysis %s running in another worker", key[:16])
+            try:
+                # The leader publishes before it releases, so check once more after the lease is gone
+                while await self.state.lease_held(lease):
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        raise DeadlineExceeded("No time left waiting for another worker's analysis")
+                    poll = SHARED_FLIGHT_POLL_SECONDS
+                    await asyncio.sleep(poll if left is None else min(poll, left))
+                result = await self.state.get(result_key)
+            except SharedStateError as e:
+                logger.warning("⚠️ Lost track of the shared flight, running locally: %s", e)
+                return await func()
+            if isinstance(result, dict) and _FAILURE in result:
+                _raise_failure(result[_FAILURE])
+            if result is not None:
+                return result
+            # The leader died without publishing; whoever takes the lease next runs it again
+
+    async def _publish(self, result_key: str, result: Any) -> None:
+        try:
+            await self.state.set(result_key, result, ttl=SHARED_FLIGHT_RESULT_TTL_SECONDS)
+        except (SharedStateError, TypeError, ValueError) as e:
+            logger.warning("⚠️ Could not share flight result: %s", e)
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "coalesced_remote": self.coalesced_remote,
+        }
@@ -0,0 +1,166 @@
+import json
+import logging
+import math
+import os
+import re
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+SKILL_TAXONOMY_PATH = os.getenv("SKILL_TAXONOMY_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "skill_taxonomy.json"
+)
+SKILL_GAP_LIMIT = int(os.getenv("SKILL_GAP_LIMIT", "3"))
+
+# JD lines that mark a skill as required or as a nice-to-have
+REQUIRED_CUES = re.compile(r"\b(?:required|requirements?|must|strong|proficien\w*|expert\w*|essential)\b", re.IGNORECASE)
+OPTIONAL_CUES = re.compile(r"\b(?:nice to have|preferred|bonus|plus|familiarity|exposure)\b", re.IGNORECASE)
+
+
+class SkillMatch(NamedTuple):
+    start: int
+    end: int
+    skill: str
+
+
+class SkillIndex:
+    """
+    Aho-Corasick automaton over every skill name and alias in the taxonomy.
+    scan() finds all of them in one linear pass over the text, keeping only
+    whole-word matches and preferring the longest one ("react native" over "react").
+    """
+
+    def __init__(self, taxonomy: Dict[str, dict]):
+        self.taxonomy = taxonomy
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+
+        for skill, entry in taxonomy.items():
+            terms = list(entry.get("aliases", []))
+            if entry.get("match_name", True):
+                terms.append(skill)
+            for term in terms:
+                self._add(" ".join(term.lower().split()), skill)
+        self._build()
+
+    def _add(self, term: str, skill: str) -> None:
+        state = 0
+        for ch in term:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(term), skill))
+
+    def _build(self) -> None:
+        # Breadth-first, so every failure target is finished before it is used;
+        # depth-1 states fail to the root (already their default)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> List[SkillMatch]:
+        lowered = text.lower()
+        candidates: List[SkillMatch] = []
+        state = 0
+        for i, ch in enumerate(lowered):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, skill in self._out[state]:
+                start = i - length + 1
+                # Whole words only: "java" must not match inside "javascript"
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                if i + 1 < len(lowered) and lowered[i + 1].isalnum():
+                    continue
+                candidates.append(SkillMatch(start, i + 1, skill))
+
+        candidates.sort(key=lambda match: (match.start, -(match.end - match.start)))
+        matches: List[SkillMatch] = []
+        covered = 0
+        for match in candidates:
+            if match.start >= covered:
+                matches.append(match)
+                covered = match.end
+        return matches
+
+    def skills(self, text: str) -> Dict[str, int]:
+        """Canonical skill -> number of mentions."""
+        counts: Dict[str, int] = {}
+        for match in self.scan(text):
+            counts[match.skill] = counts.get(match.skill, 0) + 1
+        return counts
+
+
+_index: Optional[SkillIndex] = None
+
+
+def get_skill_index() -> SkillIndex:
+    global _index
+    if _index is None:
+        with open(SKILL_TAXONOMY_PATH, encoding="utf-8") as f:
+            _index = SkillIndex(json.load(f))
+        logger.info("🗂️ Skill index built from %d skills", len(_index.taxonomy))
+    return _index
+
+
+def _line_weight(text: str, position: int) -> float:
+    start = text.rfind("\n", 0, position) + 1
+    end = text.find("\n", position)
+    line = text[start:end if end != -1 else len(text)]
+    if OPTIONAL_CUES.search(line):
+        return 0.6
+    if REQUIRED_CUES.search(line):
+        return 1.5
+    return 1.0
+
+
+def jd_skill_weights(job_description: str) -> Dict[str, float]:
+    """
+    Weight of every taxonomy skill the JD asks for: taxonomy weight x how
+    strongly the JD asks (required / plain / nice-to-have, best mention wins)
+    x a log bonus for repeated mentions.
+    """
+    index = get_skill_index()
+    emphasis: Dict[str, float] = {}
+    mentions: Dict[str, int] = {}
+    for match in index.scan(job_description):
+        emphasis[match.skill] = max(emphasis.get(match.skill, 0.0), _line_weight(job_description, match.start))
+        mentions[match.skill] = mentions.get(match.skill, 0) + 1
+    return {
+        skill: index.taxonomy[skill].get("weight", 1.0) * emphasis[skill] * (1 + math.log(mentions[skill]))
+        for skill in emphasis
+    }
+
+
+def find_skill_gaps(resume_text: str, job_description: str, limit: int = SKILL_GAP_LIMIT) -> Optional[List[str]]:
+    """
+    JD skills missing from the resume, heaviest first (ties by name so the
+    list is stable for identical inputs). None when the JD names no skill
+    the taxonomy knows, i.e. the index cannot tell.
+    """
+    wanted = jd_skill_weights(job_description)
+    if not wanted:
+        return None
+    have = get_skill_index().skills(resume_text)
+    missing = [(weight, skill) for skill, weight in wanted.items() if skill not in have]
+    missing.sort(key=lambda item: (-item[0], item[1]))
+    return [skill for _, skill in missing[:limit]]
@@ -0,0 +1,340 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from dotenv import load_dotenv
+from langchain_core.prompts import PromptTemplate
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+from resilience import run_prompt
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# Models that honor OpenAI-style `json_schema` structured outputs on OpenRouter.
+# Every other model is asked for plain JSON mode, which OpenRouter drops for
+# providers that do not support it.
+JSON_SCHEMA_MODELS = {
+    m.strip() for m in os.getenv("JSON_SCHEMA_MODELS", "").split(",") if m.strip()
+}
+JSON_MODE_ENABLED = os.getenv("JSON_MODE_ENABLED", "true").lower() in ("1", "true", "yes")
+# How many times to re-ask for fields that were missing or invalid
+STRUCTURED_REASKS = int(os.getenv("STRUCTURED_REASKS", "1"))
+
+
+class StructuredOutputError(ValueError):
+    """The LLM output could not be turned into the expected JSON object."""
+
+    def __init__(self, message: str, raw_output: str = ""):
+        super().__init__(message)
+        self.raw_output = raw_output
+
+
+# --------------------------------------------------
+# Schemas
+# --------------------------------------------------
+
+def _split_list(value: Any) -> Any:
+    # Small models sometimes answer "Python, SQL" where a list was asked for
+    if isinstance(value, str):
+        separator = "\n" if "\n" in value else ","
+        return [item.strip(" -•*\t") for item in value.split(separator) if item.strip(" -•*\t")]
+    return value
+
+
+class _Lenient(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True, extra="ignore")
+
+
+class Education(_Lenient):
+    degree: str = ""
+    institution: str = ""
+    year: str = ""
+
+
+class WorkExperience(_Lenient):
+    role: str = ""
+    company: str = ""
+    duration: str = ""
+    description: str = ""
+
+
+class Project(_Lenient):
+    name: str = ""
+    description: str = ""
+
+
+class ParsedResume(_Lenient):
+    name: Optional[str]
+    email: Optional[str]
+    phone: Optional[str]
+    education: List[Education]
+    work_experience: List[WorkExperience]
+    skills: List[str]
+    certifications: List[str] = Field(default_factory=list)
+    projects: List[Project] = Field(default_factory=list)
+    links: List[str] = Field(default_factory=list)
+
+    @field_validator("skills", "certifications", "links", mode="before")
+    @classmethod
+    def _lists(cls, value: Any) -> Any:
+        return _split_list(value)
+
+
+class ResumeAnalysis(_Lenient):
+    strengths: List[str]
+    improvements: List[str]
+    matching_qualifications: str
+    missing_requirements: str
+    score: int = Field(ge=0, le=100)
+    final_assessment: str
+
+    @field_validator("strengths", "improvements", mode="before")
+    @classmethod
+    def _lists(cls, value: Any) -> Any:
+        return _split_list(value)
+
+    @field_validator("score", mode="before")
+    @classmethod
+    def _round_score(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            # "72", "72/100", "72%"
+            value = value.strip().split("/")[0].rstrip("%").strip()
+        try:
+            return round(float(value))
+        except (TypeError, ValueError):
+            return value
+
+
+# --------------------------------------------------
+# Balanced-brace extraction and repair
+# --------------------------------------------------
+
+def _closers(stack: List[str]) -> str:
+    return "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+
+
+def _drop_trailing_commas(text: str) -> str:
+    out = []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[i + 1:].lstrip()
+            if not rest or rest[0] in "}]":
+                continue
+        out.append(ch)
+    return "".join(out)
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(_drop_trailing_commas(text))
+    except json.JSONDecodeError:
+        return None
+
+
+def _repair_truncated(text: str, commas: List[Tuple[int, Tuple[str, ...]]],
+                      stack: List[str], in_string: bool) -> Optional[Any]:
+    """
+    Closes a JSON object cut off mid-way (max_tokens, dropped stream). First
+    tries to keep everything, then falls back to the last complete member.
+    """
+    tail = text + ('"' if in_string else "")
+    if tail.rstrip().endswith(":"):
+        tail += " null"
+    result = _loads(tail + _closers(stack))
+    if result is not None:
+        return result
+
+    for position, snapshot in reversed(commas):
+        result = _loads(text[:position] + _closers(list(snapshot)))
+        if result is not None:
+            return result
+    return None
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """
+    Returns the first JSON object in `text`. One pass over the characters
+    tracks string and bracket state, so nested objects, braces inside
+    strings, surrounding prose and markdown fences are all handled. Trailing
+    commas are dropped and a truncated object is closed.
+    """
+    start = text.find("{")
+    while start != -1:
+        stack: List[str] = []
+        commas: List[Tuple[int, Tuple[str, ...]]] = []
+        in_string = escaped = False
+
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                stack.append(ch)
+            elif ch in "}]":
+                if stack:
+                    stack.pop()
+                if not stack:
+                    result = _loads(text[start:i + 1])
+                    if isinstance(result, dict):
+                        return result
+                    break
+            elif ch == ",":
+                commas.append((i - start, tuple(stack)))
+        else:
+            result = _repair_truncated(text[start:], commas, stack, in_string)
+            if isinstance(result, dict):
+                return result
+
+        # Not valid JSON (e.g. "{placeholder}" in prose); try the next object
+        start = text.find("{", start + 1)
+
+    raise StructuredOutputError("No valid JSON object found in LLM output.", text)
+
+
+# --------------------------------------------------
+# Validation and targeted re-asks
+# --------------------------------------------------
+
+def validate_fields(schema: Type[BaseModel], data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Validates `data` field by field. Returns (valid fields, {failed field: reason}),
+    so one bad field does not throw away the rest of the answer.
+    """
+    try:
+        return schema.model_validate(data).model_dump(), {}
+    except ValidationError as e:
+        failed: Dict[str, str] = {}
+        for error in e.errors():
+            field = str(error["loc"][0]) if error["loc"] else "__root__"
+            failed.setdefault(field, error["msg"])
+
+    valid = {key: value for key, value in data.items() if key in schema.model_fields and key not in failed}
+    return valid, failed
+
+
+reask_prompt = PromptTemplate.from_template(
+    """
+    You were given this task:
+
+    {task}
+
+    Your previous answer had missing or invalid values for these keys:
+    {problems}
+
+    Return ONLY a single valid JSON object containing just these keys, following this JSON schema:
+    {schema}
+    """
+)
+
+
+def _field_schema(schema: Type[BaseModel], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """JSON schema of `schema` restricted to `fields` (all fields when None)."""
+    full = schema.model_json_schema()
+    if fields is None:
+        return full
+    properties = {name: full["properties"][name] for name in fields if name in full["properties"]}
+    subset = {"type": "object", "properties": properties, "required": list(properties)}
+    if "$defs" in full:
+        subset["$defs"] = full["$defs"]
+    return subset
+
+
+def response_format_for(schema: Type[BaseModel], fields: Optional[List[str]] = None):
+    """Maps a model name to the `response_format` to request from it."""
+    json_schema = {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": _field_schema(schema, fields)},
+    }
+
+    def pick(model: str) -> Optional[Dict[str, Any]]:
+        if model in JSON_SCHEMA_MODELS:
+            return json_schema
+        if JSON_MODE_ENABLED:
+            return {"type": "json_object"}
+        return None
+
+    return pick
+
+
+async def run_structured(
+    stage: str,
+    prompt,
+    inputs: Dict[str, Any],
+    schema: Type[BaseModel],
+    base: Optional[Dict[str, Any]] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs `prompt` and returns its answer validated against `schema`.
+
+    JSON mode / a JSON schema is requested where the model supports it.
+    With `fields`, the LLM only supplies those fields and everything else
+    comes from `base` (values already known, e.g. from the local parser).
+    Fields that are missing or invalid are re-asked on their own instead of
+    repeating the whole call; fields with defaults fall back to them if the
+    re-ask fails too. Raises StructuredOutputError if required fields are
+    still missing.
+    """
+    wanted = set(fields or schema.model_fields)
+    response_format = response_format_for(schema, fields)
+    raw_output = await run_prompt(stage, prompt, inputs, response_format=response_format)
+
+    try:
+        data = extract_json(raw_output)
+    except StructuredOutputError:
+        data = {}
+    result, failed = validate_fields(
+        schema, {**(base or {}), **{key: value for key, value in data.items() if key in wanted}}
+    )
+
+    for _ in range(STRUCTURED_REASKS):
+        if not failed:
+            break
+        logger.warning("🩹 %s: re-asking for %s", stage, ", ".join(sorted(failed)))
+        retry_output = await run_prompt(stage, reask_prompt, {
+            "task": prompt.format(**inputs),
+            "problems": "\n".join(f"- {field}: {reason}" for field, reason in failed.items()),
+            "schema": json.dumps(_field_schema(schema, list(failed))),
+        }, response_format=response_format_for(schema, list(failed)))
+        try:
+            patch = extract_json(retry_output)
+        except StructuredOutputError:
+            continue
+        fixed, failed = validate_fields(schema, {**result, **{k: v for k, v in patch.items() if k in failed}})
+        result = fixed
+
+    if failed:
+        # Whatever is still wrong but optional takes its default
+        defaults = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in schema.model_fields.items()
+            if name in failed and not field.is_required()
+        }
+        result, failed = validate_fields(schema, {**result, **defaults})
+        if failed:
+            logger.error("❌ %s: invalid fields after re-ask: %s", stage, failed)
+            raise StructuredOutputError(
+                f"Invalid fields in {stage} output: {', '.join(sorted(failed))}", raw_output
+            )
+
+    return result
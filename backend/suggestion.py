@@ -1,18 +1,11 @@
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
-import os
 
-load_dotenv()
+from resilience import run_prompt
 
-llm = ChatOpenAI(
-    model_name="google/gemma-3-27b-it:free",
-    openai_api_key=os.getenv("OPENROUTER_API_KEY"),
-    openai_api_base="https://openrouter.ai/api/v1"
-)
+load_dotenv()
 
-async def suggest_resume_improvements(resume_text):
-    prompt = PromptTemplate.from_template("""
+suggestion_prompt = PromptTemplate.from_template("""
     You are a professional resume reviewer.
     
     Here is a candidate's resume content:
@@ -58,7 +51,8 @@ async def suggest_resume_improvements(resume_text):
 - Return only the structured **Markdown content** as output.
 """)
 
-    chain = prompt | llm
 
-    result = await chain.ainvoke({"resume_text": resume_text})
-    return result.content 
\ No newline at end of file
+async def suggest_resume_improvements(resume_text, on_token=None):
+    # Streams tokens to on_token when given; always returns the full markdown
+    return await run_prompt("suggestions", suggestion_prompt, {"resume_text": resume_text}, on_token=on_token)
+ 
\ No newline at end of file
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# The backend is a flat set of modules run from backend/, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Upstream clients refuse to build without keys; tests never reach the network
+for name in ("OPENROUTER_API_KEY", "COHERE_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(name, "test-key")
+
+# Keep the search cache in memory instead of writing SQLite into the repo
+os.environ.setdefault("SEARCH_CACHE_DB", "")
@@ -0,0 +1,154 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import batch
+import clients
+import main
+from limits import RateLimited
+from pdf_helpers import make_pdf
+
+VOCABULARY = ["python", "fastapi", "kubernetes", "java", "excel"]
+
+
+class FakeEmbeddings:
+    """Bag-of-words vectors over a tiny vocabulary."""
+
+    @staticmethod
+    def vector(text):
+        words = text.lower().split()
+        return [float(words.count(term)) for term in VOCABULARY]
+
+    async def aembed_documents(self, texts):
+        return [self.vector(text) for text in texts]
+
+    async def aembed_query(self, text):
+        return self.vector(text)
+
+
+@pytest.fixture(autouse=True)
+def embeddings(monkeypatch):
+    monkeypatch.setattr(clients, "_embeddings", FakeEmbeddings())
+
+
+def test_cosine_scores():
+    matrix = np.array([[1, 0], [0, 1], [1, 1], [0, 0]], dtype=np.float32)
+    scores = batch.cosine_scores(matrix, np.array([1, 0], dtype=np.float32))
+    assert np.allclose(scores, [1, 0, 2 ** -0.5, 0])
+
+
+def test_only_the_shortlist_is_analyzed_and_ranking_is_best_first():
+    resumes = {
+        "python.pdf": "python fastapi kubernetes",
+        "half.pdf": "python excel",
+        "java.pdf": "java excel",
+        "scan.pdf": "",
+        "broken.pdf": None,
+    }
+    analyzed = []
+
+    async def extract(data):
+        text = resumes[data.decode()]
+        if text is None:
+            raise ValueError("Failed to parse PDF: broken")
+        return text
+
+    async def analyze(text, job_description):
+        analyzed.append(text)
+        return {"analysis": "ok", "score": 90 if "kubernetes" in text else 60}
+
+    ranked = asyncio.run(batch.rank_resumes(
+        [(name, name.encode()) for name in resumes],
+        "python fastapi kubernetes",
+        top_k=2,
+        extract=extract,
+        analyze=analyze,
+    ))
+
+    assert sorted(analyzed) == ["python excel", "python fastapi kubernetes"]
+    assert [entry["filename"] for entry in ranked[:3]] == ["python.pdf", "half.pdf", "java.pdf"]
+    assert [entry["rank"] for entry in ranked] == [1, 2, 3, 4, 5]
+    assert ranked[2]["score"] is None and ranked[2]["prescore"] is not None
+    assert all(entry["local_score"]["score"] is not None for entry in ranked[:3])
+    assert [entry.get("score_source") for entry in ranked[:3]] == ["llm", "llm", None]
+    errors = {entry["filename"]: entry["error"] for entry in ranked[3:]}
+    assert errors == {"scan.pdf": "No text layer found in PDF.", "broken.pdf": "Failed to parse PDF: broken"}
+    assert all("text" not in entry for entry in ranked)
+
+
+def test_a_failed_analysis_keeps_the_local_score():
+    resumes = {"a.pdf": "python fastapi kubernetes", "b.pdf": "python fastapi", "c.pdf": "python"}
+
+    async def extract(data):
+        return resumes[data.decode()]
+
+    async def analyze(text, job_description):
+        if text == "python fastapi kubernetes":
+            raise RateLimited("openrouter still rate limited")
+        if text == "python fastapi":
+            raise ConnectionError("reset by peer")
+        return {"analysis": "ok", "score": 50}
+
+    ranked = asyncio.run(batch.rank_resumes(
+        [(name, name.encode()) for name in resumes],
+        "python fastapi kubernetes",
+        top_k=3,
+        extract=extract,
+        analyze=analyze,
+    ))
+
+    by_name = {entry["filename"]: entry for entry in ranked}
+    assert by_name["a.pdf"]["error"] == "LLM provider is rate limiting; scored locally."
+    assert by_name["b.pdf"]["error"] == "Analysis failed; scored locally."
+    for name in ("a.pdf", "b.pdf"):
+        assert by_name[name]["score"] == by_name[name]["local_score"]["score"]
+        assert by_name[name]["score_source"] == "local"
+    assert by_name["c.pdf"]["error"] is None
+
+
+def test_embedding_failure_falls_back_to_the_local_prescore(monkeypatch):
+    resumes = {"a.pdf": "python fastapi kubernetes", "b.pdf": "java excel"}
+
+    class DownEmbeddings(FakeEmbeddings):
+        async def aembed_documents(self, texts):
+            raise TimeoutError("cohere timed out")
+
+    monkeypatch.setattr(clients, "_embeddings", DownEmbeddings())
+
+    async def extract(data):
+        return resumes[data.decode()]
+
+    async def analyze(text, job_description):
+        return {"analysis": "ok", "score": 80}
+
+    ranked = asyncio.run(batch.rank_resumes(
+        [(name, name.encode()) for name in resumes],
+        "python fastapi kubernetes",
+        top_k=1,
+        extract=extract,
+        analyze=analyze,
+    ))
+
+    assert [entry["filename"] for entry in ranked] == ["a.pdf", "b.pdf"]
+    for entry in ranked:
+        assert entry["prescore"] == entry["local_score"]["score"]
+        assert entry["error"] == "Embedding pre-score unavailable; pre-scored locally."
+    assert ranked[0]["score_source"] == "llm"
+
+
+def test_endpoint_reports_the_top_k_it_used(monkeypatch):
+    used = []
+
+    async def rank_resumes(files, job_description, top_k, extract):
+        used.append(top_k)
+        return []
+
+    monkeypatch.setattr(main, "rank_resumes", rank_resumes)
+    client = TestClient(main.app)
+    files = [("resumes", (f"{i}.pdf", make_pdf(["Python"]), "application/pdf")) for i in range(2)]
+
+    response = client.post("/batch/rank", files=files, data={"job_description": "Python", "top_k": "50"})
+
+    assert response.json()["top_k"] == used[0] == 2
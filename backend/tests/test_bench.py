@@ -0,0 +1,80 @@
+import asyncio
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bench import make_corpus, stub_server
+import extract_embed
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setitem(stub_server.config, "latency", 0.0)
+    monkeypatch.setitem(stub_server.config, "jitter", 0.0)
+    monkeypatch.setitem(stub_server.config, "embed_latency", 0.0)
+    monkeypatch.setitem(stub_server.config, "search_latency", 0.0)
+    monkeypatch.setitem(stub_server.config, "token_delay", 0.0)
+    monkeypatch.setitem(stub_server.config, "embed_dim", 8)
+    return TestClient(stub_server.app)
+
+
+def test_chat_completion_returns_canned_parse(stub):
+    response = stub.post("/v1/chat/completions", json={
+        "model": "m",
+        "messages": [{"role": "user", "content": "You are a resume parser."}],
+    })
+
+    assert response.status_code == 200
+    content = response.json()["choices"][0]["message"]["content"]
+    assert json.loads(content)["name"] == "Jane Doe"
+
+
+def test_chat_completion_streams_chunks(stub):
+    response = stub.post("/v1/chat/completions", json={
+        "model": "m",
+        "stream": True,
+        "messages": [{"role": "user", "content": "You are an experienced HR recruiter."}],
+    })
+
+    events = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    text = "".join(json.loads(event)["choices"][0]["delta"].get("content", "") for event in events[:-1])
+    assert json.loads(text)["score"] == stub_server.ANALYSIS["score"]
+
+
+def test_embed_is_deterministic(stub):
+    first = stub.post("/v1/embed", json={"texts": ["a", "b"]}).json()["embeddings"]
+    second = stub.post("/v1/embed", json={"texts": ["a"]}).json()["embeddings"]
+
+    assert len(first) == 2 and len(first[0]) == 8
+    assert first[0] == second[0]
+
+
+def test_search_returns_requested_results(stub):
+    body = stub.post("/search", json={"query": "learn docker", "max_results": 3}).json()
+
+    assert [result["url"].rsplit("/", 1)[1] for result in body["results"]] == ["0", "1", "2"]
+
+
+def test_error_rate_answers_with_upstream_errors(stub, monkeypatch):
+    monkeypatch.setitem(stub_server.config, "error_rate", 1.0)
+
+    response = stub.post("/v1/embed", json={"texts": ["a"]})
+
+    assert response.status_code in (429, 500)
+
+
+def test_corpus_pdf_is_readable(tmp_path):
+    lines = make_corpus.resume_lines(random.Random(0), pages=2)
+    path = tmp_path / "resume.pdf"
+
+    make_corpus.write_pdf(str(path), lines, lines_per_page=len(lines) // 2 + 1)
+    try:
+        text = asyncio.run(extract_embed.extract_text_from_bytes(path.read_bytes()))
+    finally:
+        extract_embed.shutdown_extract_pool()
+
+    assert lines[0] in text
+    assert lines[-1].strip() in text
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import cache as cache_module
+from cache import MemoryTier, ResultCache, jd_key, pair_key, resume_key
+
+
+def test_keys_are_content_addressed():
+    assert resume_key(b"%PDF-a") == resume_key(b"%PDF-a") != resume_key(b"%PDF-b")
+    # Case and whitespace do not change what a JD asks for
+    assert jd_key("Python  Developer\n") == jd_key("python developer")
+    assert pair_key("r", "j") == "r:j"
+
+
+def test_memory_tier_evicts_least_recently_used_by_count_and_size():
+    tier = MemoryTier(max_entries=2, max_bytes=10)
+    expires = time.time() + 60
+    tier.set("a", "1", expires)
+    tier.set("b", "2", expires)
+    tier.get("a")
+    tier.set("c", "3", expires)
+    assert tier.get("b") is None and tier.get("a") == "1"
+
+    tier.set("big", "x" * 10, expires)
+    assert len(tier) == 1 and tier.size == 10
+    # Larger than the whole tier: not stored at all
+    tier.set("huge", "x" * 11, expires)
+    assert tier.get("huge") is None
+
+
+def test_entries_expire():
+    cache = ResultCache(ttl_seconds=60)
+
+    async def run():
+        await cache.set("parsed", "k", {"name": "x"}, ttl=0.05)
+        assert await cache.get("parsed", "k") == {"name": "x"}
+        await asyncio.sleep(0.06)
+        return await cache.get("parsed", "k")
+
+    assert asyncio.run(run()) is None
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer, reader = ResultCache(db_path=path), ResultCache(db_path=path)
+
+    async def run():
+        await writer.set("analysis", "k", {"score": 70})
+        return await reader.get("analysis", "k")
+
+    assert asyncio.run(run()) == {"score": 70}
+    assert reader.stats()["namespaces"]["analysis"] == {"memory_hits": 0, "disk_hits": 1, "misses": 0}
+
+
+def test_get_or_compute_stores_only_what_store_if_accepts():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"score": None} if len(calls) == 1 else {"score": 80}
+
+    def valid(value):
+        return value["score"] is not None
+
+    async def run():
+        first = await cache.get_or_compute("analysis", "k", compute, store_if=valid)
+        second = await cache.get_or_compute("analysis", "k", compute, store_if=valid)
+        third = await cache.get_or_compute("analysis", "k", compute, store_if=valid)
+        return first, second, third
+
+    assert asyncio.run(run()) == ({"score": None}, {"score": 80}, {"score": 80})
+    assert len(calls) == 2
+
+
+def test_bumping_a_namespace_version_hides_old_entries(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    monkeypatch.setattr(cache_module, "CACHE_SCHEMA_VERSIONS", {"text": 1})
+
+    async def write():
+        await ResultCache(db_path=path).set("text", "r", "page one")
+
+    async def read():
+        return await ResultCache(db_path=path).get("text", "r")
+
+    asyncio.run(write())
+    assert asyncio.run(read()) == "page one"
+
+    monkeypatch.setattr(cache_module, "CACHE_SCHEMA_VERSIONS", {"text": 2})
+    assert asyncio.run(read()) is None
+    assert cache_module.cache_key("text", "r") == "text:v2:r"
+    assert cache_module.cache_key("parsed", "r") == "parsed:v1:r"
+
+
+def test_parses_from_before_the_local_parser_fix_are_not_served():
+    assert cache_module.cache_key("parsed", "r") == "parsed:v2:r"
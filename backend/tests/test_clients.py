@@ -0,0 +1,25 @@
+import asyncio
+
+import clients
+
+
+def test_llms_are_created_once_per_model_and_share_one_pool():
+    try:
+        first = clients.get_llm("vendor/model-a")
+        assert clients.get_llm("vendor/model-a") is first
+        other = clients.get_llm("vendor/model-b")
+        assert other is not first
+        assert first.http_async_client is other.http_async_client is clients.get_async_http_client()
+    finally:
+        asyncio.run(clients.aclose())
+
+
+def test_aclose_closes_the_pool_and_forgets_clients():
+    llm = clients.get_llm("vendor/model-a")
+    pool = clients.get_async_http_client()
+
+    asyncio.run(clients.aclose())
+
+    assert pool.is_closed
+    assert clients.get_llm("vendor/model-a") is not llm
+    asyncio.run(clients.aclose())
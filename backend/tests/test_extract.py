@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+import extract_embed
+from pdf_helpers import make_pdf
+
+
+@pytest.fixture(autouse=True)
+def extract_pool():
+    yield
+    extract_embed.shutdown_extract_pool()
+
+
+def extract(data):
+    return asyncio.run(extract_embed.extract_text_from_bytes(data))
+
+
+def test_long_pdfs_are_extracted_in_page_order(monkeypatch):
+    monkeypatch.setattr(extract_embed, "PDF_PAGES_PER_CHUNK", 2)
+    pages = [f"Page number {index}" for index in range(7)]
+
+    text = extract(make_pdf(pages))
+
+    positions = [text.index(page) for page in pages]
+    assert positions == sorted(positions)
+
+
+def test_limits_are_enforced(monkeypatch):
+    monkeypatch.setattr(extract_embed, "PDF_MAX_PAGES", 3)
+    with pytest.raises(ValueError, match="pages"):
+        extract(make_pdf(["one", "two", "three", "four"]))
+
+    monkeypatch.setattr(extract_embed, "PDF_MAX_BYTES", 100)
+    with pytest.raises(ValueError, match="bytes"):
+        extract(make_pdf(["one"]))
+
+
+def test_unreadable_pdf_is_a_value_error():
+    with pytest.raises(ValueError, match="Failed to parse PDF"):
+        extract(b"%PDF-1.4 this is not really a pdf")
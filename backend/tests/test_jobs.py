@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from jobs import JobQueue, QueueFull
+
+
+def run_with_queue(runner, body, **kwargs):
+    async def run(tmp_dir):
+        queue = JobQueue(runner, upload_dir=tmp_dir, **kwargs)
+        queue.start()
+        try:
+            return await body(queue)
+        finally:
+            await queue.stop()
+    return run
+
+
+async def wait_until_finished(queue, job_id):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_reports_stages_and_result(tmp_path):
+    async def runner(resume_data, job_description, on_stage):
+        on_stage("parse", {"bytes": len(resume_data)})
+        return {"score": 75, "jd": job_description}
+
+    async def body(queue):
+        job = await queue.submit(b"%PDF-1.4", "Python developer")
+        assert job["status"] == "queued"
+        return await wait_until_finished(queue, job["id"])
+
+    job = asyncio.run(run_with_queue(runner, body)(str(tmp_path)))
+
+    assert job["status"] == "done"
+    assert job["stages"] == {"parse": {"bytes": 8}}
+    assert job["result"] == {"score": 75, "jd": "Python developer"}
+    # The spooled upload is removed once the job ran
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_job_keeps_a_client_safe_error(tmp_path):
+    async def runner(resume_data, job_description, on_stage):
+        raise RuntimeError("secret stack details")
+
+    async def body(queue):
+        job = await queue.submit(b"%PDF-1.4", "jd")
+        return await wait_until_finished(queue, job["id"])
+
+    job = asyncio.run(run_with_queue(runner, body)(str(tmp_path)))
+    assert job["status"] == "failed"
+    assert "secret" not in job["error"]
+
+
+def test_full_queue_rejects_new_jobs(tmp_path):
+    release = asyncio.Event()
+
+    async def runner(resume_data, job_description, on_stage):
+        await release.wait()
+        return {}
+
+    async def body(queue):
+        # One job runs, one waits in the queue; the third does not fit
+        await queue.submit(b"1", "jd")
+        await asyncio.sleep(0.01)
+        await queue.submit(b"2", "jd")
+        with pytest.raises(QueueFull):
+            await queue.submit(b"3", "jd")
+        assert queue.depth() == 1
+        release.set()
+
+    asyncio.run(run_with_queue(runner, body, workers=1, max_queue=1)(str(tmp_path)))
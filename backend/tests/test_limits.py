@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+
+import limits
+from shared_state import SQLiteState
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_token_bucket_paces_once_drained():
+    async def scenario():
+        bucket = limits.TokenBucket(per_minute=600)
+        await bucket.acquire(600)
+        start = time.monotonic()
+        await bucket.acquire(1)
+        return time.monotonic() - start
+
+    assert 0.05 < asyncio.run(scenario()) < 0.5
+
+
+def test_oversized_acquire_is_capped_to_capacity():
+    async def scenario():
+        bucket = limits.TokenBucket(per_minute=60)
+        await asyncio.wait_for(bucket.acquire(1000), timeout=0.5)
+        return bucket.tokens
+
+    assert asyncio.run(scenario()) < 1
+
+
+def test_waiting_requests_are_served_round_robin():
+    order = []
+
+    async def scenario():
+        limiter = limits.UpstreamLimiter("test", max_inflight=1)
+
+        async def call(request_id, label):
+            with limits.request_scope(request_id):
+                async def work():
+                    order.append(label)
+                    await asyncio.sleep(0.01)
+                await limiter.call(work)
+
+        tasks = [asyncio.create_task(call("a", f"a{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("b", "b0")))
+        await asyncio.gather(*tasks)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert order == ["a0", "a1", "b0", "a2"]
+    assert stats["inflight"] == 0 and stats["queued"] == 0
+
+
+def test_rate_limit_is_retried_after_retry_after(monkeypatch):
+    monkeypatch.setattr(limits, "backoff_delay", lambda attempt: pytest.fail("Retry-After was ignored"))
+    attempts = []
+
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise UpstreamError(429, {"retry-after": "0.05"})
+        return "ok"
+
+    limiter = limits.UpstreamLimiter("test", max_inflight=2)
+
+    assert asyncio.run(limiter.call(flaky)) == "ok"
+    assert attempts[1] - attempts[0] >= 0.04
+
+
+def test_persistent_rate_limit_raises_rate_limited(monkeypatch):
+    monkeypatch.setattr(limits, "RATE_LIMIT_MAX_RETRIES", 2)
+    monkeypatch.setattr(limits, "backoff_delay", lambda attempt: 0)
+    attempts = []
+
+    async def always_limited():
+        attempts.append(1)
+        raise UpstreamError(429)
+
+    with pytest.raises(limits.RateLimited):
+        asyncio.run(limits.UpstreamLimiter("test", max_inflight=1).call(always_limited))
+    assert len(attempts) == 3
+
+
+def test_other_errors_are_not_retried():
+    attempts = []
+
+    async def broken():
+        attempts.append(1)
+        raise UpstreamError(400)
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(limits.UpstreamLimiter("test", max_inflight=1).call(broken))
+    assert attempts == [1]
+
+
+def test_retry_after_accepts_seconds_and_dates():
+    assert limits.retry_after_seconds(UpstreamError(429, {"Retry-After": "3"})) == 3
+    assert limits.retry_after_seconds(UpstreamError(429, {"retry-after": "Thu, 01 Jan 1970 00:00:00 GMT"})) == 0
+    assert limits.retry_after_seconds(UpstreamError(429)) is None
+
+
+def test_shared_window_is_one_budget_for_all_workers(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    # One window per worker, over the same SQLite file; the budget is 2 calls per window
+    first, second = (limits.SharedRateWindow(SQLiteState(path), "test", per_minute=600, window_seconds=0.2)
+                     for _ in range(2))
+
+    async def scenario():
+        # Start at a window boundary so the first two calls land in the same window
+        await asyncio.sleep(0.2 - time.time() % 0.2)
+        await first.acquire()
+        await second.acquire()
+        start = time.monotonic()
+        await second.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(scenario()) <= 0.25
+    assert first.waits == 0 and second.waits == 1
+
+
+def test_calls_waiting_for_rate_budget_hold_no_slot():
+    async def scenario():
+        limiter = limits.UpstreamLimiter("test", max_inflight=1, rpm=600)
+        await limiter.requests.acquire(600)
+        # The next request token is ~0.1s away; nobody may sit on the only slot meanwhile
+        paced = asyncio.create_task(limiter.call(lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0.02)
+        return limiter.stats()["inflight"], await asyncio.wait_for(paced, timeout=1)
+
+    inflight, _ = asyncio.run(scenario())
+
+    assert inflight == 0
+
+
+def test_a_bucket_outlives_its_event_loop():
+    # Module-level buckets see a new loop per asyncio.run (tests, reloaders)
+    bucket = limits.TokenBucket(6000)
+
+    async def contend():
+        bucket.tokens = 0
+        await asyncio.gather(bucket.acquire(), bucket.acquire())
+
+    asyncio.run(contend())
+    asyncio.run(contend())
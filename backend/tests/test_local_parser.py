@@ -0,0 +1,164 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import extract_embed
+from local_parser import local_parse, split_sections
+from preprocess import clean_text
+
+SAMPLE_PDF = Path(__file__).resolve().parents[1] / "uploads" / "SanchitResumeOld.pdf"
+
+RESUME = """Jane Doe
+jane.doe@example.com | +1 555 010 0000 | github.com/janedoe
+Skills
+Languages: Python, Go, SQL
+Tools: Docker, Kubernetes
+Experience
+Backend Engineer - Acme Corp Jan 2021 - Present
+- Built FastAPI services
+- Cut p95 latency by 40%
+Data Analyst, Globex 2019 - 2020
+- Reporting pipelines
+Education
+B.Tech Computer Science, Example University, 2019
+Projects
+Resume Analyzer - LLM powered resume scoring
+- Deployed on Render
+"""
+
+
+def test_sections_use_canonical_names():
+    sections = split_sections("Jane\nWork Experience\nAcme\nTech Stack\nPython", {"headings": ["Tech Stack"]})
+
+    assert sections == {"header": ["Jane"], "experience": ["Acme"], "skills": ["Python"]}
+
+
+def test_contact_fields():
+    data, confidence = local_parse(RESUME)
+
+    assert data["name"] == "Jane Doe"
+    assert data["email"] == "jane.doe@example.com"
+    assert data["phone"] == "+1 555 010 0000"
+    assert data["links"] == ["github.com/janedoe"]
+    assert confidence["email"] == 1.0 and confidence["phone"] == 0.95
+
+
+def test_layout_title_wins_for_the_name():
+    data, confidence = local_parse("JANE DOE\nSkills\nPython", {"title": "Jane Doe", "headings": []})
+
+    assert data["name"] == "Jane Doe"
+    assert confidence["name"] == 0.95
+
+
+def test_sections_are_parsed_into_the_schema():
+    data, confidence = local_parse(RESUME)
+
+    assert data["skills"] == ["Python", "Go", "SQL", "Docker", "Kubernetes"]
+    assert data["work_experience"] == [
+        {"role": "Backend Engineer", "company": "Acme Corp", "duration": "Jan 2021 - Present",
+         "description": "Built FastAPI services Cut p95 latency by 40%"},
+        {"role": "Data Analyst", "company": "Globex", "duration": "2019 - 2020",
+         "description": "Reporting pipelines"},
+    ]
+    assert data["education"] == [
+        {"degree": "B.Tech Computer Science", "institution": "Example University", "year": "2019"},
+    ]
+    assert data["projects"] == [
+        {"name": "Resume Analyzer", "description": "LLM powered resume scoring Deployed on Render"},
+    ]
+    assert min(confidence[field] for field in ("skills", "work_experience", "education", "projects")) >= 0.8
+
+
+def test_missing_sections_have_low_confidence():
+    data, confidence = local_parse("Jane Doe\njane@example.com")
+
+    assert data["skills"] == [] and confidence["skills"] == 0.0
+    assert confidence["work_experience"] < 0.5
+    assert confidence["education"] < 0.5
+
+
+def test_absent_optional_fields_are_left_to_the_llm():
+    _, confidence = local_parse("Jane Doe\nSkills\nPython, Go, SQL")
+
+    assert confidence["phone"] < 0.5
+    assert confidence["links"] < 0.5
+    assert confidence["projects"] < 0.5
+    assert confidence["certifications"] < 0.5
+
+
+def test_run_together_skills_are_split_with_lower_confidence():
+    data, confidence = local_parse("Jane Doe\nSkills\nPython, C++ HTML, CSS, JS Strong Communication")
+
+    assert data["skills"] == ["Python", "C++", "HTML", "CSS", "JS", "Strong Communication"]
+    assert confidence["skills"] < 0.7
+
+
+def test_wrapped_project_lines_join_the_project():
+    text = (
+        "Jane Doe\nProjects\n"
+        "Resume Analyzer: Built an LLM powered service that scores resumes against a job\n"
+        "description and suggests improvements.\n"
+        "Street Light - Arduino controller for street lights\n"
+    )
+
+    data, confidence = local_parse(text)
+
+    assert data["projects"] == [
+        {"name": "Resume Analyzer", "description": "Built an LLM powered service that scores resumes "
+                                                   "against a job description and suggests improvements."},
+        {"name": "Street Light", "description": "Arduino controller for street lights"},
+    ]
+    assert confidence["projects"] >= 0.8
+
+
+@pytest.fixture(scope="module")
+def sample():
+    data = SAMPLE_PDF.read_bytes()
+
+    async def extract():
+        return await extract_embed.extract_text_from_bytes(data), await extract_embed.extract_layout(data)
+
+    try:
+        text, layout = asyncio.run(extract())
+    finally:
+        extract_embed.shutdown_extract_pool()
+    return clean_text(text), layout
+
+
+@pytest.mark.parametrize("with_layout", [False, True])
+def test_sample_resume_projects(sample, with_layout):
+    text, layout = sample
+
+    data, confidence = local_parse(text, layout if with_layout else None)
+
+    assert [project["name"] for project in data["projects"]] == [
+        "AI-Based Heart Monitoring App with IoT Integration (Ongoing)",
+        "CO2 Emission Prediction Using Machine Learning",
+        "Movie Recommendation Chatbot",
+        "Alumni Website: Alum-Connect",
+        "Invictus Hackathon: CollabSphere",
+        "Smart Street Light System",
+    ]
+    assert data["projects"][1]["description"].endswith("and the number of cylinders.")
+    assert confidence["projects"] >= 0.8
+
+
+def test_sample_resume_skills_and_education(sample):
+    text, layout = sample
+
+    data, confidence = local_parse(text, layout)
+
+    assert data["skills"] == [
+        "Python", "JAVA", "C++", "HTML", "CSS", "JS", "Strong Communication",
+        "MERN Stack", "SQL", "PowerBI", "Team Management",
+    ]
+    assert data["education"] == [{
+        "degree": "B.E in Electronics & Computer Science",
+        "institution": "Vivekananda Education Society’s Institute of Technology, Mumbai Unversity",
+        "year": "2022",
+    }]
+    assert data["phone"] == "7021859548" and confidence["phone"] == 0.95
+    # Split skills and a guessed university are confirmed by the LLM, as are the absent sections
+    for field in ("skills", "education", "work_experience", "certifications", "links"):
+        assert confidence[field] < 0.7, field
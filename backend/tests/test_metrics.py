@@ -0,0 +1,91 @@
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from prometheus_client import REGISTRY
+
+import metrics
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_timed_steps_add_up_per_request():
+    timings = metrics.start_request_timings()
+
+    with metrics.timed("search"):
+        pass
+    with metrics.timed("search"):
+        pass
+    with metrics.timed("parse"):
+        pass
+
+    assert list(timings) == ["search", "parse"]
+    header = metrics.server_timing_header({"parse": 0.0123, "search": 1.5})
+    assert header == "parse;dur=12.3, search;dur=1500.0"
+
+
+def test_llm_callback_counts_tokens_and_cost(monkeypatch):
+    monkeypatch.setattr(metrics, "LLM_PRICES", {"test/model": [1.0, 2.0]})
+    labels = {"stage": "metrics-test", "model": "test/model"}
+    before = sample("resume_llm_cost_usd_total", **labels)
+    callback = metrics.LLMMetricsCallback()
+    run_id = uuid.uuid4()
+
+    callback.on_chat_model_start(
+        {}, [], run_id=run_id, metadata={"stage": "metrics-test", "ls_model_name": "test/model"}
+    )
+    message = AIMessage(
+        content="ok", usage_metadata={"input_tokens": 1000, "output_tokens": 500, "total_tokens": 1500}
+    )
+    callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+
+    assert sample("resume_llm_calls_total", outcome="ok", **labels) == 1
+    assert sample("resume_llm_tokens_total", kind="prompt", **labels) == 1000
+    assert sample("resume_llm_tokens_total", kind="completion", **labels) == 500
+    assert sample("resume_llm_cost_usd_total", **labels) - before == pytest.approx(0.002)
+
+
+def test_llm_errors_are_counted():
+    callback = metrics.llm_metrics_callback()
+    run_id = uuid.uuid4()
+
+    callback.on_chat_model_start({}, [], run_id=run_id, metadata={"stage": "metrics-error"})
+    callback.on_llm_error(RuntimeError("boom"), run_id=run_id)
+
+    assert sample("resume_llm_calls_total", stage="metrics-error", model="unknown", outcome="error") == 1
+
+
+def test_render_metrics_exposes_the_histograms():
+    with metrics.timed("render-test"):
+        pass
+    body, content_type = metrics.render_metrics()
+
+    assert content_type.startswith("text/plain")
+    assert b"resume_stage_seconds_bucket" in body
+
+
+def test_the_shared_callback_is_a_langchain_handler():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    callback = metrics.llm_metrics_callback()
+
+    assert isinstance(callback, BaseCallbackHandler) and callback.run_inline
+    assert metrics.llm_metrics_callback() is callback
+
+
+def test_importing_metrics_loads_neither_prometheus_nor_langchain():
+    code = (
+        "import sys, metrics; "
+        "print(any(name.startswith(('prometheus_client', 'langchain')) for name in sys.modules))"
+    )
+    backend = Path(__file__).resolve().parents[1]
+
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "False"
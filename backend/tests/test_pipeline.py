@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from pipeline import Stage, run_stages
+
+
+def test_independent_stages_overlap_and_deps_receive_results():
+    async def slow(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    async def combine(a, b):
+        return a + b
+
+    stages = [
+        Stage("a", lambda: slow(1)),
+        Stage("b", lambda: slow(2)),
+        Stage("sum", combine, deps=("a", "b")),
+    ]
+    start = time.perf_counter()
+    results, timings = asyncio.run(run_stages(stages))
+
+    assert results == {"a": 1, "b": 2, "sum": 3}
+    assert set(timings) == {"a", "b", "sum"}
+    # a and b ran side by side, not one after the other
+    assert time.perf_counter() - start < 0.19
+
+
+@pytest.mark.parametrize("stages, message", [
+    ([Stage("a", None), Stage("a", None)], "Duplicate"),
+    ([Stage("a", None, deps=("missing",))], "unknown stage"),
+    ([Stage("a", None, deps=("b",)), Stage("b", None, deps=("a",))], "Cycle"),
+])
+def test_invalid_graphs_are_rejected_before_running(stages, message):
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(run_stages(stages))
+
+
+def test_failure_cancels_siblings_and_is_raised():
+    cancelled = []
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def long_running():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    stages = [Stage("slow", long_running), Stage("bad", boom)]
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(run_stages(stages))
+
+    assert cancelled == [True]
+    assert time.perf_counter() - start < 1
+
+
+def test_the_first_failure_wins_over_stage_order():
+    async def fails_later():
+        await asyncio.sleep(0)
+        raise KeyError("later")
+
+    async def fails_first():
+        raise ValueError("first")
+
+    # Both fail before run_stages wakes up; the one listed first failed second
+    with pytest.raises(ValueError, match="first"):
+        asyncio.run(run_stages([Stage("later", fails_later), Stage("first", fails_first)]))
+
+
+def test_on_complete_fires_as_each_stage_finishes():
+    finished = []
+
+    async def value(result, delay):
+        await asyncio.sleep(delay)
+        return result
+
+    stages = [
+        Stage("slow", lambda: value("s", 0.05)),
+        Stage("fast", lambda: value("f", 0.0)),
+    ]
+    asyncio.run(run_stages(stages, on_complete=lambda name, result: finished.append((name, result))))
+
+    assert finished == [("fast", "f"), ("slow", "s")]
@@ -0,0 +1,74 @@
+import pytest
+
+import preprocess
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # One token per word keeps budgets readable and avoids downloading an encoding
+    monkeypatch.setattr(preprocess, "count_tokens", lambda text: len(text.split()))
+
+
+def test_clean_text_strips_page_furniture_and_rejoins_words():
+    pages = [
+        "Jane Doe Resume\nExperience\nBuilt a data pipe-\nline in Python\nPage 1 of 2",
+        "Jane Doe Resume\nSkills\nPython​  SQL\nPage 2 of 2",
+    ]
+
+    text = preprocess.clean_text(preprocess.PAGE_BREAK.join(pages))
+
+    assert text.splitlines() == [
+        "Experience", "Built a data pipeline in Python", "Skills", "Python SQL",
+    ]
+
+
+def test_compounds_split_at_a_line_break_keep_their_hyphen():
+    text = preprocess.clean_text("Integrated with a React-\nbased UI and a data-\ndriven model under develop-\nment")
+
+    assert text == "Integrated with a React-based UI and a data-driven model under development"
+
+
+def test_long_duplicate_lines_are_dropped():
+    line = "Designed and shipped the billing service end to end"
+    text = preprocess.clean_text(f"{line}\nshort\nshort\n{line}")
+
+    assert text.splitlines() == [line, "short", "short"]
+
+
+def test_segment_sections():
+    text = "Jane Doe\njane@example.com\nTechnical Skills:\nPython\nWork Experience\nAcme"
+
+    assert preprocess.segment_sections(text) == [
+        ("header", ["Jane Doe", "jane@example.com"]),
+        ("skills", ["Technical Skills:", "Python"]),
+        ("experience", ["Work Experience", "Acme"]),
+    ]
+
+
+def test_trim_keeps_priority_sections_in_original_order():
+    text = "\n".join([
+        "Jane Doe",
+        "Summary", "a long summary of many words that should go first",
+        "Experience", "Acme backend engineer",
+        "Skills", "Python SQL",
+    ])
+
+    trimmed = preprocess.trim_to_budget(text, 14)
+
+    assert trimmed.splitlines() == ["Jane Doe", "Experience", "Acme backend engineer", "Skills", "Python SQL"]
+
+
+def test_text_within_budget_is_untouched():
+    assert preprocess.trim_to_budget("Skills\nPython", 10) == "Skills\nPython"
+
+
+def test_job_description_is_cleaned_and_capped():
+    jd = "  We need   a backend engineer \n\n" + "\n".join(f"requirement {i}" for i in range(10))
+
+    assert preprocess.prepare_job_description(jd, budget=9).splitlines() == [
+        "We need a backend engineer", "requirement 0",
+    ]
+
+
+def test_compact_json_drops_empty_fields():
+    assert preprocess.compact_json({"a": 1, "b": [], "c": None, "d": "é"}) == '{"a":1,"d":"é"}'
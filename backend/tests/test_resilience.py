@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import resilience
+
+
+@pytest.fixture(autouse=True)
+def models(monkeypatch):
+    monkeypatch.setattr(resilience, "get_llm", lambda model: model)
+    monkeypatch.setattr(resilience, "STAGE_MODELS", {"parse": ["primary", "backup", "last"]})
+    monkeypatch.setattr(resilience, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(resilience, "_latencies", {})
+
+
+def test_nested_deadline_only_tightens():
+    with resilience.request_deadline(10):
+        with resilience.request_deadline(60):
+            assert resilience.remaining() <= 10
+        with resilience.request_deadline(0):
+            with pytest.raises(resilience.DeadlineExceeded):
+                resilience.stage_timeout("parse")
+    assert resilience.remaining() is None
+
+
+def test_stage_timeout_uses_its_share(monkeypatch):
+    monkeypatch.setattr(resilience, "LLM_CALL_TIMEOUT_SECONDS", 45)
+    with resilience.request_deadline(20):
+        assert 7.9 < resilience.stage_timeout("parse") <= 8.0
+    assert resilience.stage_timeout("parse") == 45
+
+
+def test_failed_model_falls_back_to_the_next():
+    calls = []
+
+    async def run(llm):
+        calls.append(llm)
+        if llm == "primary":
+            raise RuntimeError("429")
+        return f"answer from {llm}"
+
+    result = asyncio.run(resilience.call_llm("parse", run, hedge=False))
+
+    assert result == "answer from backup"
+    assert calls == ["primary", "backup"]
+
+
+def test_slow_primary_is_hedged_and_cancelled(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_DEFAULT_DELAY_SECONDS", 0.05)
+    cancelled = []
+
+    async def run(llm):
+        try:
+            await asyncio.sleep(1 if llm == "primary" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(llm)
+            raise
+        return llm
+
+    assert asyncio.run(resilience.call_llm("parse", run)) == "backup"
+    assert cancelled == ["primary"]
+
+
+def test_all_models_timing_out_is_a_deadline_error(monkeypatch):
+    monkeypatch.setattr(resilience, "LLM_CALL_TIMEOUT_SECONDS", 0.02)
+
+    async def run(llm):
+        await asyncio.sleep(1)
+
+    with pytest.raises(resilience.DeadlineExceeded):
+        asyncio.run(resilience.call_llm("parse", run, hedge=False))
+
+
+def test_no_fallback_once_streaming_started():
+    calls = []
+
+    async def run(llm):
+        calls.append(llm)
+        raise RuntimeError("stream broke")
+
+    with pytest.raises(RuntimeError, match="stream broke"):
+        asyncio.run(resilience.call_llm("parse", run, hedge=False, can_fallback=lambda: False))
+    assert calls == ["primary"]
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+import extract_embed
+
+RESUME = """Jane Doe
+jane@example.com
+Summary
+Backend engineer who likes queues.
+Experience
+Built payment APIs in Python and FastAPI.
+Ran Kubernetes clusters on AWS.
+Education
+B.Sc. Computer Science
+Skills
+Python, Go, PostgreSQL
+"""
+
+
+class FakeVectorDB:
+    """Chroma's surface as used by extract_embed, kept in a list."""
+
+    def __init__(self):
+        self.rows = []
+        self.adds = 0
+
+    def get(self, where=None, limit=None, include=None):
+        rows = [row for row in self.rows if where is None or row["metadata"]["resume_id"] == where["resume_id"]]
+        return {"ids": [row["id"] for row in rows][:limit], "metadatas": [row["metadata"] for row in rows][:limit]}
+
+    def delete(self, ids):
+        self.rows = [row for row in self.rows if row["id"] not in ids]
+
+    async def aadd_texts(self, texts, metadatas, ids):
+        self.adds += 1
+        self.rows += [{"id": i, "text": t, "metadata": m} for t, m, i in zip(texts, metadatas, ids)]
+
+    async def asimilarity_search(self, query, k, filter):
+        # "Relevance" is the number of query words in the chunk
+        words = set(query.lower().split())
+        rows = [row for row in self.rows if row["metadata"]["resume_id"] == filter["resume_id"]]
+        rows.sort(key=lambda row: -len(words & set(row["text"].lower().replace(",", " ").split())))
+        return [Document(page_content=row["text"], metadata=row["metadata"]) for row in rows[:k]]
+
+
+@pytest.fixture
+def vectordb(monkeypatch):
+    db = FakeVectorDB()
+    monkeypatch.setattr(extract_embed, "_vectordb", db)
+    return db
+
+
+def test_chunks_follow_sections_and_respect_the_size_cap(monkeypatch):
+    chunks = extract_embed.chunk_resume(RESUME)
+    assert [section for section, _ in chunks] == ["header", "summary", "experience", "education", "skills"]
+    assert chunks[2][1].startswith("Experience\nBuilt payment APIs")
+
+    monkeypatch.setattr(extract_embed, "RESUME_CHUNK_MAX_CHARS", 40)
+    small = extract_embed.chunk_resume(RESUME)
+    assert len(small) > len(chunks)
+    assert all(len(chunk) <= 40 or "\n" not in chunk for _, chunk in small)
+
+
+def test_short_resumes_are_sent_whole_without_embedding(vectordb):
+    context = asyncio.run(extract_embed.select_resume_context(RESUME, "Python engineer"))
+    assert context == RESUME
+    assert vectordb.adds == 0
+
+
+def test_long_resumes_are_reduced_to_relevant_chunks_in_resume_order(monkeypatch, vectordb):
+    monkeypatch.setattr(extract_embed, "RESUME_TOKEN_BUDGET", 40)
+
+    context = asyncio.run(extract_embed.select_resume_context(RESUME, "python fastapi kubernetes postgresql"))
+
+    # The least relevant sections are dropped; the rest keep their resume order
+    assert "Summary" not in context and "Education" not in context
+    assert context.index("Jane Doe") < context.index("Experience") < context.index("Skills")
+    # Embedding the same resume again reuses the stored chunks
+    asyncio.run(extract_embed.embed_resume(RESUME))
+    assert vectordb.adds == 1
+
+
+def test_old_and_surplus_resumes_are_pruned(monkeypatch, vectordb):
+    monkeypatch.setattr(extract_embed, "CHROMA_TTL_SECONDS", 3600)
+    monkeypatch.setattr(extract_embed, "CHROMA_MAX_RESUMES", 2)
+    now = time.time()
+    for resume_id, embedded_at in (("expired", now - 7200), ("oldest", now - 60), ("older", now - 30), ("new", now)):
+        vectordb.rows += [
+            {"id": f"{resume_id}:{i}", "text": "", "metadata": {"resume_id": resume_id, "embedded_at": embedded_at}}
+            for i in range(2)
+        ]
+    vectordb.rows.append({"id": "legacy:0", "text": "", "metadata": {"resume_id": "legacy"}})
+
+    assert extract_embed.prune_vectordb(vectordb) == 3
+    assert {row["metadata"]["resume_id"] for row in vectordb.rows} == {"older", "new"}
+
+
+def test_embedding_prunes_at_most_once_per_interval(monkeypatch, vectordb):
+    monkeypatch.setattr(extract_embed, "_pruned_at", 0.0)
+    pruned = []
+    monkeypatch.setattr(extract_embed, "prune_vectordb", lambda db: pruned.append(db))
+
+    asyncio.run(extract_embed.embed_resume(RESUME))
+    asyncio.run(extract_embed.embed_resume(RESUME + "Languages"))
+
+    assert pruned == [vectordb]
+    assert all("embedded_at" in row["metadata"] for row in vectordb.rows)
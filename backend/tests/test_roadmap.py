@@ -0,0 +1,54 @@
+import asyncio
+
+import clients
+import roadmap
+
+
+class FakeSearch:
+    def __init__(self, delay=0.05, result=None, error=None):
+        self.delay = delay
+        self.result = result if result is not None else [{"url": "https://example.com"}]
+        self.error = error
+        self.active = 0
+        self.peak = 0
+
+    async def ainvoke(self, query):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise self.error
+            return self.result
+        finally:
+            self.active -= 1
+
+
+def search_all(gaps, concurrency):
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(roadmap.search_learning_resources(gap, semaphore) for gap in gaps))
+    return asyncio.run(run())
+
+
+def test_searches_run_in_parallel_up_to_the_limit(monkeypatch):
+    fake = FakeSearch()
+    monkeypatch.setattr(clients, "_search_tool", fake)
+
+    results = search_all(["a", "b", "c", "d", "e"], concurrency=3)
+
+    assert results == [fake.result] * 5
+    assert fake.peak == 3
+
+
+def test_slow_or_failing_searches_return_no_links(monkeypatch):
+    monkeypatch.setattr(roadmap, "TAVILY_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(clients, "_search_tool", FakeSearch(delay=1))
+    assert search_all(["slow"], concurrency=1) == [[]]
+
+    monkeypatch.setattr(clients, "_search_tool", FakeSearch(error=RuntimeError("down")))
+    assert search_all(["broken"], concurrency=1) == [[]]
+
+    # Tavily reports some failures as a string instead of raising
+    monkeypatch.setattr(clients, "_search_tool", FakeSearch(result="error: quota"))
+    assert search_all(["quota"], concurrency=1) == [[]]
@@ -0,0 +1,39 @@
+import pytest
+
+import scoring
+from scoring import local_score, reconcile_score
+
+JD = "Backend engineer. Python and Kubernetes are required. Nice to have: Rust. You will build APIs and data pipelines."
+
+
+def test_better_match_scores_higher():
+    strong = local_score("Python engineer running Kubernetes, built APIs and data pipelines in Rust", JD)
+    weak = local_score("Graphic designer skilled in Photoshop and illustration", JD)
+
+    assert 0 <= weak["score"] < strong["score"] <= 100
+    assert strong["matched_skills"] == ["ETL", "Kubernetes", "Python", "Rust"]
+    assert weak["missing_skills"] == ["ETL", "Kubernetes", "Python", "Rust"]
+
+
+def test_unavailable_components_are_left_out():
+    result = local_score("Python and Kubernetes", JD)
+
+    assert result["breakdown"]["embedding"] is None
+    assert local_score("Python and Kubernetes", JD, embedding_cosine=0.65)["breakdown"]["embedding"] == 1.0
+    assert local_score("Python", "a great communicator")["breakdown"]["skills"] is None
+
+
+def test_score_is_deterministic():
+    assert local_score("Python developer", JD) == local_score("Python developer", JD)
+
+
+@pytest.mark.parametrize("llm_score, expected", [
+    (None, (50, "local")),
+    (70, (70, "llm")),
+    (95, (85, "llm_clamped")),
+    (5, (15, "llm_clamped")),
+])
+def test_reconcile_score(monkeypatch, llm_score, expected):
+    monkeypatch.setattr(scoring, "LOCAL_SCORE_MAX_DEVIATION", 35)
+
+    assert reconcile_score(llm_score, {"score": 50}) == expected
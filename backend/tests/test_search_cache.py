@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+import search_cache
+from search_cache import SearchCache
+
+
+@pytest.fixture(autouse=True)
+def memory_only(monkeypatch):
+    monkeypatch.setattr(search_cache, "SEARCH_CACHE_DB", "")
+
+
+def result(url, content="A course"):
+    return {"title": " Learn  it ", "url": url, "content": content, "score": 0.9, "raw_content": "x" * 1000}
+
+
+def test_skill_aliases_share_a_key():
+    assert search_cache.normalize_skill("k8s") == search_cache.normalize_skill(" Kubernetes. ") == "kubernetes"
+    assert search_cache.normalize_skill("Public  Speaking") == "public speaking"
+
+
+def test_urls_are_normalized_for_dedupe():
+    assert search_cache.normalize_url("HTTPS://Example.com/course/?utm_source=x&id=3") == "https://example.com/course?id=3"
+
+    deduped = search_cache.dedupe_results([
+        [{"url": "https://a.com/x"}, {"url": "https://b.com"}],
+        [{"url": "https://a.com/x/?ref=tavily"}, {"url": "https://c.com"}],
+    ])
+
+    assert deduped == [[{"url": "https://a.com/x"}, {"url": "https://b.com"}], [{"url": "https://c.com"}]]
+
+
+def test_results_are_trimmed(monkeypatch):
+    monkeypatch.setattr(search_cache, "SEARCH_SNIPPET_CHARS", 12)
+
+    trimmed = search_cache.trim_results([result("https://a.com", "one two three four"), "junk", {"title": "no url"}])
+
+    assert trimmed == [{"title": "Learn it", "url": "https://a.com", "snippet": "one two…"}]
+
+
+def fetcher(calls, results):
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return results
+    return fetch
+
+
+def test_lookup_caches_per_skill_and_coalesces():
+    cache = SearchCache(offline=False)
+    calls = []
+    fetch = fetcher(calls, [result("https://a.com")])
+
+    async def scenario():
+        first = await asyncio.gather(cache.lookup("k8s", fetch), cache.lookup("Kubernetes", fetch))
+        return first, await cache.lookup("kubernetes", fetch)
+
+    (first, second), third = asyncio.run(scenario())
+
+    assert first == second == third
+    assert calls == [1]
+
+
+def test_empty_results_are_not_cached():
+    cache = SearchCache(offline=False)
+    calls = []
+
+    asyncio.run(cache.lookup("Docker", fetcher(calls, [])))
+    asyncio.run(cache.lookup("Docker", fetcher(calls, [])))
+
+    assert len(calls) == 2
+
+
+def test_offline_mode_never_fetches():
+    cache = SearchCache(offline=True)
+    calls = []
+
+    assert asyncio.run(cache.lookup("Docker", fetcher(calls, [result("https://a.com")]))) == []
+    assert calls == []
+
+
+def test_stale_entries_are_refetched(monkeypatch):
+    monkeypatch.setattr(search_cache, "SEARCH_CACHE_TTL_SECONDS", 60)
+    cache = SearchCache(offline=False)
+    calls = []
+    stale = {"fetched_at": time.time() - 120, "results": [{"title": "", "url": "https://old.com", "snippet": ""}]}
+    asyncio.run(cache.store.set("search", "docker", stale))
+
+    fresh = asyncio.run(cache.lookup("Docker", fetcher(calls, [result("https://new.com")])))
+
+    assert [item["url"] for item in fresh] == ["https://new.com"]
+    assert calls == [1]
+
+
+
+def test_database_is_created_on_first_lookup(tmp_path, monkeypatch):
+    path = tmp_path / "search_cache.sqlite3"
+    monkeypatch.setattr(search_cache, "SEARCH_CACHE_DB", str(path))
+
+    cache = SearchCache(offline=True)
+    assert not path.exists()
+
+    assert asyncio.run(cache.lookup("Docker", fetcher([], []))) == []
+    assert path.exists()
+
+
+def test_database_directory_is_created(tmp_path, monkeypatch):
+    path = tmp_path / "fresh" / "chroma" / "search_cache.sqlite3"
+    monkeypatch.setattr(search_cache, "SEARCH_CACHE_DB", str(path))
+    cache = SearchCache(offline=False)
+    calls = []
+
+    first = asyncio.run(cache.lookup("Docker", fetcher(calls, [result("https://a.com")])))
+    again = asyncio.run(SearchCache(offline=True).lookup("Docker", fetcher(calls, [])))
+
+    assert path.exists()
+    assert first == again and len(calls) == 1
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import time
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache import ResultCache, resume_key
+from pdf_helpers import make_pdf
+from sessions import ResumeStore
+
+
+def test_put_is_keyed_by_content(tmp_path):
+    store = ResumeStore(str(tmp_path))
+
+    first = asyncio.run(store.put(b"%PDF resume"))
+    second = asyncio.run(store.put(b"%PDF resume"))
+
+    assert first == second == resume_key(b"%PDF resume")
+    assert asyncio.run(store.get(first)) == b"%PDF resume"
+    assert [entry.name for entry in os.scandir(tmp_path)] == [f"{first}.pdf"]
+
+
+def test_unknown_and_malformed_ids_are_not_found(tmp_path):
+    store = ResumeStore(str(tmp_path))
+
+    assert asyncio.run(store.get("0" * 64)) is None
+    assert asyncio.run(store.get("../../etc/passwd")) is None
+
+
+def test_resumes_expire_after_last_use(tmp_path):
+    store = ResumeStore(str(tmp_path), ttl_seconds=60)
+    old_id = asyncio.run(store.put(b"old"))
+    stale = time.time() - 120
+    os.utime(tmp_path / f"{old_id}.pdf", (stale, stale))
+
+    assert asyncio.run(store.get(old_id)) is None
+    assert not (tmp_path / f"{old_id}.pdf").exists()
+
+
+def test_uploads_prune_expired_resumes(tmp_path):
+    store = ResumeStore(str(tmp_path), ttl_seconds=60)
+    old_id = asyncio.run(store.put(b"old"))
+    stale = time.time() - 120
+    os.utime(tmp_path / f"{old_id}.pdf", (stale, stale))
+
+    new_id = asyncio.run(store.put(b"new"))
+
+    assert [entry.name for entry in os.scandir(tmp_path)] == [f"{new_id}.pdf"]
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """The app with every upstream stage faked and counted."""
+    calls = Counter()
+
+    async def extract(data):
+        calls["extract"] += 1
+        return "Jane Doe\nSkills\nPython, FastAPI, SQL"
+
+    async def parse(resume_text, resume_data, full_text=None):
+        calls["parse"] += 1
+        return {"name": "Jane Doe", "skills": ["Python", "FastAPI", "SQL"]}
+
+    async def suggest(resume_text, on_token=None):
+        calls["suggestions"] += 1
+        return "Quantify your impact."
+
+    async def analyze(resume_text, job_description):
+        calls["analysis"] += 1
+        return {"analysis": f"Fit for: {job_description}", "score": 70}
+
+    async def roadmap(parsed, analysis, job_description, score, on_token=None, resume_text=None):
+        calls["roadmap"] += 1
+        return f"Roadmap for {job_description}"
+
+    monkeypatch.setattr(main, "WARMUP_ENABLED", False)
+    monkeypatch.setattr(main, "result_cache", ResultCache(db_path=""))
+    monkeypatch.setattr(main, "resume_store", ResumeStore(str(tmp_path)))
+    monkeypatch.setattr(main, "extract_text_from_bytes", extract)
+    monkeypatch.setattr(main, "parse_resume_or_fail", parse)
+    monkeypatch.setattr(main, "suggest_resume_improvements", suggest)
+    monkeypatch.setattr(main, "analyze_resume", analyze)
+    monkeypatch.setattr(main, "generate_roadmap", roadmap)
+    with TestClient(main.app) as client:
+        yield client, calls
+
+
+def wait_for_warmups():
+    deadline = time.monotonic() + 5
+    while main._warmups and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_a_stored_resume_only_reruns_the_jd_stages(pipeline):
+    client, calls = pipeline
+
+    uploaded = client.post("/resumes", files={"resume": ("cv.pdf", make_pdf(["Jane Doe"]), "application/pdf")})
+    assert uploaded.status_code == 201
+    resume_id = uploaded.json()["resume_id"]
+    wait_for_warmups()
+    # Upload extracts right away and prepares parse and suggestions in the background
+    assert calls == {"extract": 1, "parse": 1, "suggestions": 1}
+
+    first = client.post(f"/analyze/{resume_id}", data={"job_description": "Python developer"})
+    second = client.post(f"/analyze/{resume_id}", data={"job_description": "Data engineer"})
+
+    assert first.status_code == second.status_code == 200
+    assert second.json()["resume_id"] == resume_id
+    assert second.json()["analysis"] == "Fit for: Data engineer"
+    assert second.json()["parsed"] == first.json()["parsed"]
+    assert calls == {"extract": 1, "parse": 1, "suggestions": 1, "analysis": 2, "roadmap": 2}
+
+
+def test_unknown_resume_ids_are_not_found(pipeline):
+    client, calls = pipeline
+
+    response = client.post(f"/analyze/{'0' * 64}", data={"job_description": "Python developer"})
+
+    assert response.status_code == 404
+    assert not calls
@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import singleflight
+from resilience import DeadlineExceeded, request_deadline
+from shared_state import MemoryState, SQLiteState
+from singleflight import SingleFlight
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteState(str(tmp_path / "state.sqlite3"))
+    return MemoryState()
+
+
+def test_values_are_copies(state):
+    async def scenario():
+        value = {"skills": ["Python"]}
+        await state.set("k", value)
+        value["skills"].append("Go")
+        stored = await state.get("k")
+        stored["skills"].append("Rust")
+        return stored, await state.get("k")
+
+    stored, again = asyncio.run(scenario())
+
+    assert stored == {"skills": ["Python", "Rust"]}
+    assert again == {"skills": ["Python"]}
+
+
+def test_ttl_and_add(state):
+    async def scenario():
+        first = await state.add("k", 1, ttl=0.05)
+        second = await state.add("k", 2, ttl=0.05)
+        value = await state.get("k")
+        await asyncio.sleep(0.06)
+        return first, second, value, await state.get("k"), await state.add("k", 3)
+
+    assert asyncio.run(scenario()) == (True, False, 1, None, True)
+
+
+def test_incr_keeps_the_first_expiry(state):
+    async def scenario():
+        totals = [await state.incr("n", 1, ttl=0.05), await state.incr("n", 2.5, ttl=60)]
+        await asyncio.sleep(0.06)
+        return totals, await state.get("n")
+
+    assert asyncio.run(scenario()) == ([1, 3.5], None)
+
+
+def test_leases_belong_to_their_holder(state):
+    async def scenario():
+        token = await state.acquire_lease("job", ttl=60)
+        taken = await state.acquire_lease("job", ttl=60)
+        renewed_by_other = await state.renew_lease("job", "not-the-token", ttl=60)
+        await state.release_lease("job", "not-the-token")
+        still_held = await state.lease_held("job")
+        renewed = await state.renew_lease("job", token, ttl=60)
+        await state.release_lease("job", token)
+        return token, taken, renewed_by_other, still_held, renewed, await state.lease_held("job")
+
+    token, taken, renewed_by_other, still_held, renewed, held = asyncio.run(scenario())
+
+    assert token and taken is None
+    assert not renewed_by_other and still_held
+    assert renewed and not held
+
+
+def test_sqlite_file_is_created_on_first_use(tmp_path):
+    path = tmp_path / "chroma" / "state.sqlite3"
+    state = SQLiteState(str(path))
+    assert not path.parent.exists()
+
+    asyncio.run(state.set("k", {"v": 1}))
+
+    assert path.exists()
+    assert asyncio.run(state.get("k")) == {"v": 1}
+
+
+def test_flights_are_shared_between_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(singleflight, "SHARED_FLIGHT_POLL_SECONDS", 0.01)
+    path = str(tmp_path / "state.sqlite3")
+    # Two SingleFlights with their own connections stand in for two workers
+    leader, follower = SingleFlight(SQLiteState(path)), SingleFlight(SQLiteState(path))
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        return {"score": 80}
+
+    async def scenario():
+        first = asyncio.create_task(leader.do("pair", work))
+        await asyncio.sleep(0.03)
+        return await asyncio.gather(first, follower.do("pair", work))
+
+    assert asyncio.run(scenario()) == [{"score": 80}, {"score": 80}]
+    assert runs == [1]
+    assert follower.stats()["coalesced_remote"] == 1
+
+
+def test_a_failed_flight_is_raised_in_the_waiting_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(singleflight, "SHARED_FLIGHT_POLL_SECONDS", 0.01)
+    path = str(tmp_path / "state.sqlite3")
+    leader, follower = SingleFlight(SQLiteState(path)), SingleFlight(SQLiteState(path))
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        raise HTTPException(422, "Not a resume")
+
+    async def scenario():
+        first = asyncio.create_task(leader.do("pair", work))
+        await asyncio.sleep(0.03)
+        return await asyncio.gather(first, follower.do("pair", work), return_exceptions=True)
+
+    led, followed = asyncio.run(scenario())
+
+    assert runs == [1]
+    assert (led.status_code, followed.status_code) == (422, 422)
+    assert followed.detail == "Not a resume"
+
+
+def test_waiting_on_another_worker_stops_at_the_deadline(tmp_path, monkeypatch):
+    monkeypatch.setattr(singleflight, "SHARED_FLIGHT_POLL_SECONDS", 0.01)
+    path = str(tmp_path / "state.sqlite3")
+    leader, follower = SingleFlight(SQLiteState(path)), SingleFlight(SQLiteState(path))
+
+    async def work():
+        await asyncio.sleep(1)
+        return {"score": 80}
+
+    async def follow():
+        with request_deadline(0.1):
+            return await follower.do("pair", work)
+
+    async def scenario():
+        first = asyncio.create_task(leader.do("pair", work))
+        await asyncio.sleep(0.03)
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            await follow()
+        waited = time.monotonic() - started
+        await first
+        return waited
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_memory_state_keeps_flights_local():
+    assert SingleFlight(MemoryState()).state is None
@@ -0,0 +1,60 @@
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"score": 1}
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"score": 1}] * 5
+    assert runs == [1]
+    assert flights.stats() == {"inflight": 0, "coalesced": 4, "coalesced_remote": 0}
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_work():
+    flights = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    async def run():
+        leaver = asyncio.create_task(flights.do("k", work))
+        stayer = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        return await stayer
+
+    assert asyncio.run(run()) == "done"
+    assert finished == [1]
+
+
+def test_errors_reach_every_waiter_and_release_the_key():
+    flights = SingleFlight()
+    attempts = []
+
+    async def work():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(flights.do("k", work), flights.do("k", work), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        return await flights.do("k", work)
+
+    assert asyncio.run(run()) == "ok"
+    assert len(attempts) == 2
@@ -0,0 +1,58 @@
+import asyncio
+
+import roadmap
+import skills
+from skills import SkillIndex
+
+TAXONOMY = {
+    "React": {"aliases": ["reactjs"]},
+    "React Native": {"aliases": []},
+    "Java": {"aliases": []},
+    "JavaScript": {"aliases": ["js"]},
+    "Go": {"aliases": ["golang"], "match_name": False},
+}
+
+
+def test_scan_prefers_longest_whole_word_matches():
+    index = SkillIndex(TAXONOMY)
+
+    matches = index.scan("React Native and ReactJS apps; JavaScript, not Java-script. Go home, Golang!")
+
+    assert [match.skill for match in matches] == ["React Native", "React", "JavaScript", "Java", "Go"]
+    assert index.skills("js, JS and java") == {"JavaScript": 2, "Java": 1}
+
+
+def test_gaps_are_weighted_by_how_the_jd_asks():
+    jd = "Nice to have: Rust\nKubernetes is required\nWe use Docker\nPython"
+
+    assert skills.find_skill_gaps("Python developer", jd, limit=3) == ["Kubernetes", "Docker", "Rust"]
+    assert skills.find_skill_gaps("Python developer", jd, limit=1) == ["Kubernetes"]
+
+
+def test_no_gaps_and_unknown_jd_are_different():
+    assert skills.find_skill_gaps("Python and Docker", "Python, Docker") == []
+    assert skills.find_skill_gaps("Python", "Looking for a great communicator") is None
+
+
+def test_llm_is_asked_only_when_the_index_cannot_tell(monkeypatch):
+    calls = []
+
+    async def run_prompt(stage, prompt, inputs):
+        calls.append(stage)
+        return "Negotiation, Public Speaking"
+
+    monkeypatch.setattr(roadmap, "run_prompt", run_prompt)
+
+    assert asyncio.run(roadmap.extract_skill_gaps("Python", "analysis", "Python, Docker")) == ["Docker"]
+    assert asyncio.run(roadmap.extract_skill_gaps("Python", "analysis", "Python")) == []
+    assert calls == []
+
+    gaps = asyncio.run(roadmap.extract_skill_gaps("Python", "analysis", "A great communicator"))
+    assert gaps == ["Negotiation", "Public Speaking"]
+    assert calls == ["skill_gaps"]
+
+
+def test_llm_fallback_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(roadmap, "SKILL_GAP_LLM_FALLBACK", False)
+
+    assert asyncio.run(roadmap.extract_skill_gaps("Python", "analysis", "A great communicator")) == []
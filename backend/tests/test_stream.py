@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from extract_embed import PDFExtractionError
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def post_stream(client):
+    return client.post(
+        "/analyze/stream",
+        files={"resume": ("cv.pdf", b"%PDF-1.4", "application/pdf")},
+        data={"job_description": "Python developer"},
+    )
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_stages_and_tokens_stream_before_done(monkeypatch, client):
+    async def fake_analysis(resume_data, job_description, on_stage=None, on_token=None, **kwargs):
+        on_stage("parse", {"name": "Jane"})
+        on_token("suggestions", "Use ")
+        on_token("suggestions", "numbers.")
+        return {"score": 80}
+
+    monkeypatch.setattr(main, "run_analysis", fake_analysis)
+    response = post_stream(client)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert parse_sse(response.text) == [
+        ("stage", {"stage": "parse", "result": {"name": "Jane"}}),
+        ("token", {"stage": "suggestions", "text": "Use "}),
+        ("token", {"stage": "suggestions", "text": "numbers."}),
+        ("done", {"score": 80}),
+    ]
+
+
+def test_failures_end_the_stream_with_an_error_event(monkeypatch, client):
+    async def unreadable(*args, **kwargs):
+        raise PDFExtractionError("Failed to parse PDF: broken")
+
+    monkeypatch.setattr(main, "run_analysis", unreadable)
+    assert parse_sse(post_stream(client).text) == [
+        ("error", {"status": 422, "detail": "Failed to parse PDF: broken"}),
+    ]
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+from langchain.prompts import PromptTemplate
+
+import structured
+from structured import ResumeAnalysis, StructuredOutputError, extract_json
+
+ANALYSIS = {
+    "strengths": ["Python"],
+    "improvements": ["Kubernetes"],
+    "matching_qualifications": "Backend work",
+    "missing_requirements": "Cloud",
+    "score": 70,
+    "final_assessment": "Shortlist",
+}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Sure! Here it is:\n```json\n{"a": {"b": [1, 2]}}\n```', {"a": {"b": [1, 2]}}),
+    ('{"text": "braces } inside { strings"}', {"text": "braces } inside { strings"}),
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ('Use {placeholder} like this: {"a": 1}', {"a": 1}),
+    ('{"a": 1, "b": {"c": "trunc', {"a": 1, "b": {"c": "trunc"}}),
+    ('{"a": 1, "b":', {"a": 1, "b": None}),
+])
+def test_extract_json(text, expected):
+    assert extract_json(text) == expected
+
+
+def test_extract_json_without_object_raises():
+    with pytest.raises(StructuredOutputError):
+        extract_json("I cannot help with that.")
+
+
+def test_lenient_fields_are_coerced():
+    data = {**ANALYSIS, "strengths": "Python, SQL", "score": "72/100"}
+
+    valid, failed = structured.validate_fields(ResumeAnalysis, data)
+
+    assert failed == {}
+    assert valid["strengths"] == ["Python", "SQL"]
+    assert valid["score"] == 72
+
+
+def test_failed_fields_are_separated_from_valid_ones():
+    valid, failed = structured.validate_fields(ResumeAnalysis, {**ANALYSIS, "score": "high", "strengths": None})
+
+    assert set(failed) == {"score", "strengths"}
+    assert valid["final_assessment"] == "Shortlist"
+    assert "score" not in valid
+
+
+def fake_llm(monkeypatch, answers):
+    calls = []
+
+    async def run_prompt(stage, prompt, inputs, response_format=None):
+        calls.append(inputs)
+        return answers.pop(0)
+
+    monkeypatch.setattr(structured, "run_prompt", run_prompt)
+    return calls
+
+
+PROMPT = PromptTemplate.from_template("Analyze {resume}")
+
+
+def test_only_failed_fields_are_reasked(monkeypatch):
+    broken = {**ANALYSIS, "score": "n/a"}
+    calls = fake_llm(monkeypatch, [json.dumps(broken), '{"score": 64, "strengths": ["ignored"]}'])
+
+    result = asyncio.run(structured.run_structured("analysis", PROMPT, {"resume": "r"}, ResumeAnalysis))
+
+    assert result["score"] == 64
+    assert result["strengths"] == ["Python"]
+    reask = calls[1]
+    assert reask["task"] == "Analyze r"
+    assert list(json.loads(reask["schema"])["properties"]) == ["score"]
+
+
+def test_reask_response_format_covers_only_failed_fields(monkeypatch):
+    monkeypatch.setattr(structured, "JSON_SCHEMA_MODELS", {"schema-model"})
+    answers = [json.dumps({**ANALYSIS, "score": "n/a"}), '{"score": 64}']
+    formats = []
+
+    async def run_prompt(stage, prompt, inputs, response_format=None):
+        formats.append(response_format("schema-model"))
+        return answers.pop(0)
+
+    monkeypatch.setattr(structured, "run_prompt", run_prompt)
+    asyncio.run(structured.run_structured("analysis", PROMPT, {"resume": "r"}, ResumeAnalysis))
+
+    first, reask = (f["json_schema"]["schema"] for f in formats)
+    assert set(first["properties"]) == set(ResumeAnalysis.model_fields)
+    assert list(reask["properties"]) == ["score"]
+    assert reask["required"] == ["score"]
+
+
+def test_required_fields_still_missing_raise(monkeypatch):
+    monkeypatch.setattr(structured, "STRUCTURED_REASKS", 1)
+    fake_llm(monkeypatch, ["not json", "still not json"])
+
+    with pytest.raises(StructuredOutputError) as info:
+        asyncio.run(structured.run_structured("analysis", PROMPT, {"resume": "r"}, ResumeAnalysis))
+    assert info.value.raw_output == "not json"
+
+
+def test_optional_fields_fall_back_to_defaults(monkeypatch):
+    parsed = {
+        "name": "Jane", "email": None, "phone": None, "education": [],
+        "work_experience": [], "skills": ["Python"], "projects": "oops",
+    }
+    fake_llm(monkeypatch, [json.dumps(parsed), "{}"])
+
+    result = asyncio.run(structured.run_structured("parse", PROMPT, {"resume": "r"}, structured.ParsedResume))
+
+    assert result["projects"] == []
+    assert result["skills"] == ["Python"]
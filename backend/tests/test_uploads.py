@@ -0,0 +1,99 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from starlette.formparsers import MultiPartParser
+
+import extract_embed
+from extract_embed import PDFExtractionError, PDFTooLarge, declared_page_count, preflight_pdf, read_pdf_upload
+from pdf_helpers import make_pdf
+from uploads import UploadLimitMiddleware, configure_spooling
+
+
+def test_declared_page_count():
+    assert declared_page_count(make_pdf(["one", "two", "three"])) == 3
+    assert declared_page_count(b"%PDF-1.7\n1 0 obj << /Linearized 1 /L 900 /N 42 >>") == 42
+    assert declared_page_count(b"%PDF-1.5\n1 0 obj << /Type /ObjStm /N 9 >>") is None
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"PK\x03\x04 a zip file", "not a PDF"),
+    (b"%PDF-1.4\n<< /Type /XObject /Subtype /Image >>", "no text layer"),
+])
+def test_preflight_rejects_unusable_files(data, message):
+    with pytest.raises(PDFExtractionError, match=message):
+        preflight_pdf(data)
+
+
+def test_preflight_rejects_too_many_pages(monkeypatch):
+    monkeypatch.setattr(extract_embed, "PDF_MAX_PAGES", 2)
+
+    with pytest.raises(PDFExtractionError, match="3 pages"):
+        preflight_pdf(make_pdf(["a", "b", "c"]))
+
+
+def upload(data: bytes) -> StarletteUploadFile:
+    return StarletteUploadFile(io.BytesIO(data), filename="resume.pdf")
+
+
+def test_read_pdf_upload_stops_at_the_limit(monkeypatch):
+    monkeypatch.setattr(extract_embed, "UPLOAD_READ_CHUNK_BYTES", 16)
+    data = make_pdf(["page"])
+
+    assert asyncio.run(read_pdf_upload(upload(data))) == data
+    with pytest.raises(PDFTooLarge):
+        asyncio.run(read_pdf_upload(upload(data), max_bytes=64))
+    with pytest.raises(PDFExtractionError, match="not a PDF"):
+        asyncio.run(read_pdf_upload(upload(b"GIF89a" + b"\0" * 100)))
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_bytes=1024, route_limits={"/big": 4096})
+
+    @app.post("/small")
+    async def small(resume: UploadFile = File(...)):
+        return {"size": len(await resume.read())}
+
+    @app.post("/big")
+    async def big(resume: UploadFile = File(...)):
+        return {"size": len(await resume.read())}
+
+    return TestClient(app)
+
+
+def test_bodies_over_the_route_limit_get_413(client):
+    files = {"resume": ("resume.pdf", b"x" * 2000, "application/pdf")}
+
+    assert client.post("/small", files=files).status_code == 413
+    assert client.post("/big", files=files).json() == {"size": 2000}
+
+
+def test_chunked_bodies_are_cut_off(client):
+    # No Content-Length: the middleware has to count the body as it streams in
+    head = (
+        b"--b\r\nContent-Disposition: form-data; name=\"resume\"; filename=\"resume.pdf\"\r\n"
+        b"Content-Type: application/pdf\r\n\r\n"
+    )
+
+    def body():
+        yield head
+        for _ in range(4):
+            yield b"x" * 400
+        yield b"\r\n--b--\r\n"
+
+    response = client.post("/small", content=body(), headers={"content-type": "multipart/form-data; boundary=b"})
+
+    assert response.status_code == 413
+
+
+def test_spool_size_is_configured_on_the_parser(monkeypatch):
+    monkeypatch.setattr(MultiPartParser, "spool_max_size", MultiPartParser.spool_max_size)
+
+    configure_spooling(4096)
+
+    assert MultiPartParser.spool_max_size == 4096
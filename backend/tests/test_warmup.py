@@ -0,0 +1,59 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import extract_embed
+import main
+import warmup
+
+
+def test_a_failing_step_does_not_stop_the_others(monkeypatch):
+    warmed = []
+
+    async def broken_pool():
+        raise OSError("cannot fork")
+
+    def broken_clients():
+        raise RuntimeError("no API key")
+
+    monkeypatch.setattr(warmup, "warm_extract_pool", broken_pool)
+    monkeypatch.setattr(warmup, "_warm_clients", broken_clients)
+    monkeypatch.setattr(warmup, "_warm_local", lambda: warmed.append("local"))
+
+    timings = asyncio.run(warmup.warm_up())
+
+    assert set(timings) == {"extract_pool", "local", "clients"}
+    assert warmed == ["local"]
+
+
+def test_local_warmup_runs_offline():
+    warmup._warm_local()
+
+
+def test_startup_does_not_wait_for_warmup(monkeypatch):
+    cancelled = []
+
+    async def slow_warm_up():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    monkeypatch.setattr(main, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(main, "warm_up", slow_warm_up)
+
+    with TestClient(main.app) as client:
+        assert client.get("/limits/stats").status_code == 200
+
+    assert cancelled == [True]
+
+
+def test_every_extraction_worker_is_started(monkeypatch):
+    extract_embed.shutdown_extract_pool()
+    monkeypatch.setattr(extract_embed, "PDF_EXTRACT_WORKERS", 3)
+
+    try:
+        assert asyncio.run(extract_embed.warm_extract_pool()) == 3
+    finally:
+        extract_embed.shutdown_extract_pool()
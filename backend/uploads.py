@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from starlette.formparsers import MultiPartParser
+
+from extract_embed import PDF_MAX_BYTES
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# Whole request body, per route; room on top of the PDF for the form fields
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES") or PDF_MAX_BYTES + 256 * 1024)
+BATCH_UPLOAD_MAX_BYTES = int(os.getenv("BATCH_UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+# Uploaded files stay in memory up to this size, then spill to a temp file.
+# Together with PDF_MAX_BYTES this bounds the memory one upload can pin.
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(1024 * 1024)))
+
+
+def configure_spooling(max_bytes: int = UPLOAD_SPOOL_MAX_BYTES) -> None:
+    """
+    Sets the in-memory size of uploaded files. Starlette takes no per-request
+    option for it (request.form() only limits files, fields and non-file part
+    sizes), so this sets the class attribute of MultiPartParser, present in
+    the pinned starlette 0.47.x. Called once when the app is built.
+    """
+    if not hasattr(MultiPartParser, "spool_max_size"):
+        logger.warning("⚠️ This Starlette has no MultiPartParser.spool_max_size; UPLOAD_SPOOL_MAX_BYTES is ignored")
+        return
+    MultiPartParser.spool_max_size = max_bytes
+
+
+class UploadTooLarge(HTTPException):
+    """
+    Raised from inside `receive`. It is an HTTPException so FastAPI's form
+    parsing re-raises it as is instead of turning it into a 400.
+    """
+
+    def __init__(self, limit: int):
+        super().__init__(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"Upload is larger than the {limit} byte limit.",
+        )
+        self.limit = limit
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that caps request bodies while they arrive. A declared
+    Content-Length over the cap is refused before any byte is read; a
+    chunked or lying client is cut off as soon as the running total passes it.
+    """
+
+    def __init__(self, app, max_bytes: int = UPLOAD_MAX_BYTES, route_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.route_limits = route_limits if route_limits is not None else {"/batch/rank": BATCH_UPLOAD_MAX_BYTES}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.route_limits.get(scope["path"], self.max_bytes)
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            logger.warning("🚫 Refused %s: Content-Length %s over %d", scope["path"], declared.decode(), limit)
+            await self._reject(send, limit)
+            return
+
+        received = 0
+        response_started = False
+
+        async def capped_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning("🚫 Cut off %s after %d bytes (limit %d)", scope["path"], received, limit)
+                    raise UploadTooLarge(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, capped_receive, tracking_send)
+        except UploadTooLarge:
+            # Raised outside a FastAPI route (e.g. by another middleware)
+            if response_started:
+                raise
+            await self._reject(send, limit)
+
+    async def _reject(self, send, limit: int) -> None:
+        body = json.dumps({"detail": f"Upload is larger than the {limit} byte limit."}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict
+
+from dotenv import load_dotenv
+
+import clients
+from extract_embed import warm_extract_pool
+from preprocess import count_tokens
+from resilience import STAGE_MODELS
+from scoring import local_score
+
+load_dotenv()
+
+logger = logging.getLogger("resume-analyzer")
+
+# Pay for lazy imports, worker processes and indexes at startup instead of on
+# the first request. Turn off where memory matters more than first-request latency.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def _warm_local() -> None:
+    # Skill index, tokenizer and NumPy scoring path
+    count_tokens("warm up")
+    local_score("Python developer", "Looking for a Python developer")
+
+
+def _warm_clients() -> None:
+    for model in sorted({model for models in STAGE_MODELS.values() for model in models}):
+        clients.get_llm(model)
+    clients.get_embeddings()
+    clients.get_search_tool()
+
+
+async def warm_up() -> Dict[str, float]:
+    """
+    Runs every warmup step concurrently. A failing step is logged and
+    skipped; it never blocks startup. Returns seconds per step.
+    """
+    steps: Dict[str, Callable[[], Awaitable[None]]] = {
+        "extract_pool": warm_extract_pool,
+        "local": lambda: asyncio.to_thread(_warm_local),
+        "clients": lambda: asyncio.to_thread(_warm_clients),
+    }
+    timings: Dict[str, float] = {}
+
+    async def run(name: str, step: Callable[[], Awaitable[None]]) -> None:
+        start = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            logger.warning("⚠️ Warmup step %s failed: %s", name, e)
+        timings[name] = time.perf_counter() - start
+
+    await asyncio.gather(*(run(name, step) for name, step in steps.items()))
+    logger.info(
+        "🔥 Warmup done: %s",
+        ", ".join(f"{name}={seconds:.2f}s" for name, seconds in timings.items())
+    )
+    return timings